@@ -0,0 +1,66 @@
+"""
+@FileName: bench_extract.py
+@Description: 变量提取表达式微基准，对比旧的提取方式与 expr_util 编译缓存的耗时。
+运行方式（项目根目录）: python -m benchmarks.bench_extract
+"""
+import argparse
+import json
+import re
+import timeit
+
+import jsonpath
+
+from commons.expr_util import compile_jsonpath, compile_regex
+
+
+def build_payload(items):
+    """
+    构造一个接近真实接口的响应数据。
+
+    :param items: 列表中的元素个数
+    :return: (字典, 原始 JSON 文本)
+    """
+    data = {
+        "status": 20000,
+        "msg": "success",
+        "data": {
+            "token": "abc123",
+            "list": [{"id": i, "name": f"商品{i}", "sku": {"code": f"SKU{i}", "stock": i * 3}} for i in range(items)],
+        },
+    }
+    return data, json.dumps(data, ensure_ascii=False)
+
+
+CASES = [
+    ("jsonpath", "$.msg"),
+    ("jsonpath", "$.data.token"),
+    ("jsonpath", "$.data.list[0].id"),
+    ("jsonpath", "$.data.list[*].sku.code"),
+    ("jsonpath", "$..stock"),
+    ("regex", r"token\W+(\w+)"),
+]
+
+
+def run(items, number):
+    data, text = build_payload(items)
+    print(f"数据规模: {items} 条，每个表达式执行 {number} 次")
+    print(f"{'类型':<10}{'表达式':<28}{'旧方式(ms)':>12}{'新方式(ms)':>12}{'加速比':>10}")
+    for kind, expr in CASES:
+        if kind == "jsonpath":
+            old = lambda: jsonpath.jsonpath(dict(data), expr)
+            new = lambda: compile_jsonpath(expr)(data)
+        else:
+            old = lambda: re.findall(expr, str(data))
+            new = lambda: compile_regex(expr)(text)
+        assert (old() or []) == new(), f"{expr} 提取结果不一致"
+        old_ms = timeit.timeit(old, number=number) * 1000
+        new_ms = timeit.timeit(new, number=number) * 1000
+        print(f"{kind:<10}{expr:<28}{old_ms:>12.2f}{new_ms:>12.2f}{old_ms / new_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="变量提取表达式微基准")
+    parser.add_argument("--items", type=int, default=200, help="响应数据中列表的长度")
+    parser.add_argument("--number", type=int, default=200, help="每个表达式的执行次数")
+    args = parser.parse_args()
+    run(args.items, args.number)
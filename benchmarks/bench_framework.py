@@ -0,0 +1,259 @@
+"""
+@FileName: bench_framework.py
+@Description: 框架开销基准。启动进程内桩服务，生成不同规模的 yaml 用例集，
+按真实流程（read_testcase -> compile_case -> verify_yaml -> stand_case_flow）执行，
+统计每秒用例数、单个用例的框架开销（总耗时减去 send 阶段）以及峰值内存。
+每个场景在独立的子进程中运行，峰值内存互不影响；结果按 git 提交保存，便于不同提交之间对比。
+运行方式（项目根目录）:
+    python -m benchmarks.bench_framework
+    python -m benchmarks.bench_framework --sizes 20,200 --payloads small,nested
+    python -m benchmarks.bench_framework --compare reports/bench/<提交>.json
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+import yaml
+
+REPORT_DIR = Path("reports/bench")
+
+# 不同数据类型使用的提取表达式，覆盖普通路径、列表下标和递归查找
+EXTRACT_EXPR = {
+    "small": "$.data.token",
+    "1mb": "$.data.items[0].sku.code",
+    "nested": "$..leaf",
+}
+
+
+def generate_suite(directory, size, payload, base_url):
+    """
+    生成 size 个 yaml 文件，每个文件是一个两步的流程用例：
+    第一步请求并提取变量，第二步在请求中引用提取的变量并断言。
+
+    :param directory: 输出目录
+    :param size: yaml 文件个数
+    :param payload: 桩服务返回的数据类型
+    :param base_url: 桩服务地址
+    :return: yaml 文件路径列表
+    """
+    paths = []
+    url = f"{base_url}/payload/{payload}"
+    for i in range(size):
+        steps = [
+            {
+                "feature": "基准测试",
+                "story": payload,
+                "title": f"{payload}-{i}-提取",
+                "request": {
+                    "method": "GET",
+                    "url": url,
+                    "params": {"seq": i, "name": "${random_name()}"},
+                },
+                "extract": {
+                    "token": ["json", "$.data.token", 0],
+                    "value": ["json", EXTRACT_EXPR[payload], 0],
+                },
+                "validate": {"equals": {"状态码为200": [200, "status_code"]}},
+            },
+            {
+                "feature": "基准测试",
+                "story": payload,
+                "title": f"{payload}-{i}-引用",
+                "request": {
+                    "method": "POST",
+                    "url": url,
+                    "headers": {"Authorization": "Bearer ${read_yaml(token)}"},
+                    "json": {"mobile": "${random_mobile()}", "value": "${read_yaml(value)}"},
+                },
+                "extract": {
+                    "status": ["json", "$.status", 0],
+                    "msg": ["json", "$.msg", 0],
+                },
+                "validate": {
+                    "equals": {"业务状态码为20000": [20000, "${read_yaml(status)}"]},
+                    "contains": {"响应信息包含success": ["success", "${read_yaml(msg)}"]},
+                },
+            },
+        ]
+        path = Path(directory) / f"bench_{i:04d}.yaml"
+        with open(path, "w", encoding="utf-8") as f:
+            yaml.safe_dump(steps, f, allow_unicode=True)
+        paths.append(path)
+    return paths
+
+
+def peak_rss_mb():
+    """
+    获取当前进程的峰值内存（MB），不支持的平台返回 None。
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 单位为字节
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 2)
+
+
+def run_scenario(size, payload, log_level):
+    """
+    在当前进程中执行一个场景并返回结果字典，由子进程调用。
+    """
+    # logs_util 导入时会配置根日志器，之后再调整日志级别
+    import commons.logs_util
+    logging.getLogger().setLevel(log_level)
+    from config import setting
+    # 基准测试不落盘中间变量和计时文件，只统计阶段耗时汇总
+    setting.extract_flush_interval = 0
+    setting.timing_file = None
+    setting.timing_enabled = True
+
+    from benchmarks.stub_server import StubServer
+    from commons import timing_util
+    from commons.ddt_util import read_testcase
+    from commons.main_util import stand_case_flow
+    from commons.model_util import verify_yaml
+    from commons.template_util import compile_case
+
+    with StubServer() as server, tempfile.TemporaryDirectory() as directory:
+        paths = generate_suite(directory, size, payload, server.base_url)
+
+        # 预热：热加载函数、Faker、连接等一次性开销不计入结果
+        warmup = read_testcase(paths[0])
+        for caseinfo in warmup:
+            compile_case(caseinfo)
+            for case in caseinfo:
+                stand_case_flow(verify_yaml(case, paths[0].stem))
+        timing_util.reset()
+
+        load_start = time.perf_counter()
+        suites = []
+        for path in paths:
+            caseinfo_list = read_testcase(path)
+            for caseinfo in caseinfo_list:
+                compile_case(caseinfo)
+            suites.append((path.stem, caseinfo_list))
+        load_ms = (time.perf_counter() - load_start) * 1000
+
+        cases = failures = 0
+        run_start = time.perf_counter()
+        for stem, caseinfo_list in suites:
+            for caseinfo in caseinfo_list:
+                for case in caseinfo:
+                    cases += 1
+                    try:
+                        if stand_case_flow(verify_yaml(case, stem)) is None:
+                            failures += 1
+                    except (Exception, pytest.fail.Exception):
+                        failures += 1
+        run_ms = (time.perf_counter() - run_start) * 1000
+
+    _, phases = timing_util.summary()
+    phase_avg = {phase["phase"]: round(phase["total_ms"] / cases, 4) for phase in phases}
+    return {
+        "payload": payload,
+        "size": size,
+        "cases": cases,
+        "failures": failures,
+        "load_ms": round(load_ms, 3),
+        "run_ms": round(run_ms, 3),
+        "cases_per_sec": round(cases / run_ms * 1000, 2),
+        "per_case_ms": round(run_ms / cases, 4),
+        "overhead_per_case_ms": round((run_ms - phase_avg.get("send", 0.0) * cases) / cases, 4),
+        "phase_avg_ms": phase_avg,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_all(sizes, payloads, log_level):
+    results = []
+    for payload in payloads:
+        for size in sizes:
+            # 每个场景使用独立子进程，峰值内存和进程内缓存互不影响；
+            # 日志输出写入临时文件而不是管道，避免主进程缓存大量日志后子进程继承过高的峰值内存
+            with tempfile.TemporaryFile(mode="w+", encoding="utf-8") as stderr:
+                completed = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_framework", "--child",
+                     "--sizes", str(size), "--payloads", payload, "--log-level", log_level],
+                    stdout=subprocess.PIPE, stderr=stderr, text=True,
+                )
+                if completed.returncode != 0:
+                    stderr.seek(0)
+                    raise RuntimeError(f"场景 {payload}/{size} 执行失败:\n{stderr.read()[-5000:]}")
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            results.append(result)
+            print(
+                f"{payload:<8}{size:>6}{result['cases']:>8}{result['failures']:>6}"
+                f"{result['cases_per_sec']:>12}{result['overhead_per_case_ms']:>14}{result['peak_rss_mb']:>12}"
+            )
+    return results
+
+
+def compare(current, baseline_path):
+    """
+    与基准结果文件对比，打印每个场景每秒用例数和单用例开销的变化。
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(r["payload"], r["size"]): r for r in baseline["results"]}
+    print(f"\n对比基准: {baseline['commit']} ({baseline_path})")
+    print(f"{'数据':<8}{'用例数':>6}{'用例/秒':>18}{'开销(ms)':>20}{'峰值内存(MB)':>20}")
+    for result in current["results"]:
+        old = previous.get((result["payload"], result["size"]))
+        if old is None:
+            continue
+        change = (result["cases_per_sec"] - old["cases_per_sec"]) / old["cases_per_sec"] * 100
+        print(
+            f"{result['payload']:<8}{result['size']:>6}"
+            f"{old['cases_per_sec']:>9}->{result['cases_per_sec']:<7}"
+            f"{old['overhead_per_case_ms']:>10}->{result['overhead_per_case_ms']:<9}"
+            f"{old['peak_rss_mb']!s:>10}->{result['peak_rss_mb']!s:<9}{change:+.1f}%"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="框架开销基准")
+    parser.add_argument("--sizes", default="10,100", help="yaml 文件个数，逗号分隔，每个文件包含两个用例步骤")
+    parser.add_argument("--payloads", default=",".join(EXTRACT_EXPR), help="响应数据类型，逗号分隔")
+    parser.add_argument("--log-level", default="WARNING", help="框架日志级别，默认 WARNING，避免终端输出影响结果")
+    parser.add_argument("--output", default=None, help="结果文件路径，默认 reports/bench/<git 提交>.json")
+    parser.add_argument("--compare", default=None, help="与指定的结果文件对比")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    payloads = args.payloads.split(",")
+    if args.child:
+        print(json.dumps(run_scenario(sizes[0], payloads[0], args.log_level)))
+        sys.exit(0)
+
+    print(f"{'数据':<8}{'文件数':>6}{'用例数':>8}{'失败':>6}{'用例/秒':>12}{'开销(ms)':>14}{'峰值(MB)':>12}")
+    report = {
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": sys.version.split()[0],
+        "results": run_all(sizes, payloads, args.log_level),
+    }
+    output = Path(args.output) if args.output else REPORT_DIR / f"{report['commit']}.json"
+    os.makedirs(output.parent, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已写入: {output}")
+    if args.compare:
+        compare(report, args.compare)
@@ -0,0 +1,107 @@
+"""
+@FileName: bench_http2.py
+@Description: HTTP/2 与 HTTP/1.1 对比基准。分别启动 h2c 和 HTTP/1.1 桩服务（返回相同数据），
+按压测模式的真实流程（load_util.run_load -> 每个虚拟用户独立的 RequestUtil -> stand_case_flow）执行同一个用例，
+对比新建连接数、迭代延迟（p50/p95）和吞吐量。
+两种协议使用相同的 [http_pool:<别名>] 配置（pool_maxsize、pool_block），只有 http2 不同，写入临时的 pytest.ini。
+需要安装 h2。运行方式（项目根目录）:
+    python -m benchmarks.bench_http2
+    python -m benchmarks.bench_http2 --users 32 --duration 5 --delay 20 --connect-delay 30
+"""
+import argparse
+import logging
+import os
+import tempfile
+
+from benchmarks.stub_server import H2StubServer, StubServer
+
+
+def write_config(directory, base_url, protocol, args):
+    """
+    生成压测使用的 pytest.ini，桩服务地址配置为 [base_url] 中的 stub，连接池配置写在 [http_pool:stub] 中。
+
+    :return: 配置文件路径
+    """
+    path = os.path.join(directory, f"pytest_{protocol}.ini")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(
+            f"[base_url]\nstub = {base_url}\n\n"
+            f"[http_pool:stub]\npool_maxsize : {args.pool_maxsize}\npool_block : {str(args.pool_block).lower()}\n"
+            f"http2 : {str(protocol == 'http2').lower()}\n"
+        )
+    return path
+
+
+def run_protocol(protocol, args, directory):
+    """
+    启动对应协议的桩服务，以闭环模型压测 duration 秒。
+
+    :param protocol: http1.1 或 http2
+    :param args: 命令行参数
+    :param directory: 临时目录，存放配置文件和压测报告
+    :return: 统计结果字典
+    """
+    from config import setting
+    from commons import base_url, load_util, pool_util
+    from commons.model_util import verify_yaml
+
+    server_class = H2StubServer if protocol == "http2" else StubServer
+    with server_class(delay=args.delay / 1000, connect_delay=args.connect_delay / 1000) as server:
+        setting.base_url_config = write_config(directory, server.base_url, protocol, args)
+        base_url.load_base_url(setting.base_url_config)
+        case_obj = verify_yaml({
+            "feature": "基准测试",
+            "story": protocol,
+            "title": f"{protocol}-{args.payload}",
+            "request": {"method": "GET", "url": f"{server.base_url}/payload/{args.payload}"},
+            "validate": {"equals": {"状态码为200": [200, "status_code"]}},
+        }, f"bench_{protocol}")
+
+        pool_util._stats.clear()
+        load_util.configure(users=args.users, duration=args.duration)
+        report = load_util.run_load([case_obj], f"bench_{protocol}")
+        if protocol == "http2":
+            from commons.http2_util import close_transports
+            close_transports()
+
+    stats = pool_util.pool_stats()
+    return {
+        "protocol": protocol,
+        "iterations": report["iterations"],
+        "errors": report["errors"],
+        "sessions": report["sessions"]["count"],
+        "connections": sum(item["connections"] for item in stats),
+        "p50_ms": report["latency"]["p50_ms"],
+        "p95_ms": report["latency"]["p95_ms"],
+        "rps": report["throughput_per_s"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTTP/2 与 HTTP/1.1 对比基准")
+    parser.add_argument("--users", type=int, default=16, help="虚拟用户数，每个虚拟用户使用独立的 RequestUtil")
+    parser.add_argument("--duration", type=float, default=5, help="每种协议的压测秒数")
+    parser.add_argument("--payload", default="small", help="响应数据类型: small、1mb、nested")
+    parser.add_argument("--delay", type=float, default=10, help="服务端处理耗时（毫秒）")
+    parser.add_argument("--connect-delay", type=float, default=20, help="新建连接的握手耗时（毫秒）")
+    parser.add_argument("--pool-maxsize", type=int, default=10, help="连接池大小")
+    parser.add_argument("--pool-block", action="store_true", help="连接池满时等待空闲连接，不新建连接")
+    parser.add_argument("--log-level", default="WARNING", help="框架日志级别，默认 WARNING，避免终端输出影响结果")
+    args = parser.parse_args()
+
+    # logs_util 导入时会配置根日志器，之后再调整日志级别
+    import commons.logs_util
+    logging.getLogger().setLevel(args.log_level)
+    from config import setting
+
+    print(f"{args.users} 虚拟用户 x {args.duration} 秒，数据 {args.payload}，处理耗时 {args.delay}ms，"
+          f"握手耗时 {args.connect_delay}ms，连接池 {args.pool_maxsize}{'（阻塞）' if args.pool_block else ''}")
+    print(f"{'协议':<10}{'迭代数':>8}{'失败':>6}{'Session':>9}{'新建连接':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'迭代/秒':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        setting.load_report_dir = directory
+        for protocol in ("http1.1", "http2"):
+            result = run_protocol(protocol, args, directory)
+            print(
+                f"{result['protocol']:<10}{result['iterations']:>8}{result['errors']:>6}{result['sessions']:>9}"
+                f"{result['connections']:>10}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['rps']:>10.1f}"
+            )
@@ -0,0 +1,242 @@
+"""
+@FileName: stub_server.py
+@Description: 基准测试使用的进程内 HTTP 桩服务，按路径返回预先生成的 JSON 数据，不访问外部网络。
+路径格式: /payload/<small|1mb|nested>，GET 和 POST 均可，请求体会被读取后丢弃。
+StubServer 使用 HTTP/1.1，H2StubServer 使用 h2c（HTTP/2 prior knowledge，需要安装 h2），返回相同的数据；
+delay 模拟服务端处理耗时，connect_delay 模拟新建连接的握手耗时（每个连接的第一个响应额外等待）。
+"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def build_payload(kind):
+    """
+    生成指定类型的响应数据，所有类型都包含 status、msg 和 data.token，便于统一提取和断言。
+
+    :param kind: small 小数据；1mb 约 1MB 的列表；nested 深层嵌套结构
+    :return: JSON 字节串
+    """
+    data = {"status": 20000, "msg": "success", "data": {"token": "bench-token"}}
+    if kind == "1mb":
+        items = []
+        size = 0
+        while size < 1024 * 1024:
+            item = {"id": len(items), "name": f"商品{len(items)}", "sku": {"code": f"SKU{len(items)}", "stock": 3}}
+            items.append(item)
+            size += len(json.dumps(item, ensure_ascii=False).encode("utf-8"))
+        data["data"]["items"] = items
+    elif kind == "nested":
+        node = {"leaf": "bottom", "values": list(range(5))}
+        for depth in range(60):
+            node = {"level": depth, "child": node, "siblings": [{"id": i} for i in range(3)]}
+        data["data"]["tree"] = node
+    elif kind != "small":
+        raise ValueError(f"未知的数据类型: {kind}")
+    return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+
+PAYLOAD_KINDS = ("small", "1mb", "nested")
+
+
+def _payloads():
+    return {kind: build_payload(kind) for kind in PAYLOAD_KINDS}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 响应头和响应体分两次写出，关闭 Nagle 算法避免与客户端的延迟确认叠加产生约 40ms 的等待
+    disable_nagle_algorithm = True
+    payloads = {}
+    delay = 0.0
+    connect_delay = 0.0
+
+    def setup(self):
+        super().setup()
+        if self.connect_delay:
+            time.sleep(self.connect_delay)
+
+    def _send(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        if self.delay:
+            time.sleep(self.delay)
+        kind = self.path.split("?", 1)[0].rsplit("/", 1)[-1]
+        body = self.payloads.get(kind)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _send
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """
+    在后台线程中运行的桩服务，支持 with 语句。
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, delay=0.0, connect_delay=0.0):
+        attrs = {"payloads": _payloads(), "delay": delay, "connect_delay": connect_delay}
+        handler = type("Handler", (_Handler,), attrs)
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class _H2Protocol(asyncio.Protocol):
+    """
+    一个 h2c 连接。每个请求流在收到完整请求后独立响应，同一连接上的请求并发处理。
+    """
+
+    def __init__(self, server):
+        import h2.config
+        import h2.connection
+
+        self.server = server
+        self.conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False, header_encoding="utf-8"))
+        self.transport = None
+        self.paths = {}
+        self.window_updated = None
+        self.handshake = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.server.connections.add(transport)
+        self.window_updated = asyncio.Event()
+        self.handshake = asyncio.ensure_future(asyncio.sleep(self.server.connect_delay))
+        self.conn.initiate_connection()
+        transport.write(self.conn.data_to_send())
+
+    def data_received(self, data):
+        import h2.events
+        import h2.exceptions
+
+        try:
+            events = self.conn.receive_data(data)
+        except h2.exceptions.ProtocolError:
+            self.transport.write(self.conn.data_to_send())
+            self.transport.close()
+            return
+        for event in events:
+            if isinstance(event, h2.events.RequestReceived):
+                self.paths[event.stream_id] = dict(event.headers).get(":path", "/")
+            elif isinstance(event, h2.events.DataReceived):
+                self.conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+            elif isinstance(event, h2.events.StreamEnded):
+                asyncio.ensure_future(self._respond(event.stream_id))
+            elif isinstance(event, (h2.events.WindowUpdated, h2.events.RemoteSettingsChanged)):
+                self.window_updated.set()
+            elif isinstance(event, h2.events.ConnectionTerminated):
+                self.transport.close()
+        self.transport.write(self.conn.data_to_send())
+
+    def connection_lost(self, exc):
+        self.server.connections.discard(self.transport)
+        self.window_updated.set()
+
+    async def _respond(self, stream_id):
+        await self.handshake
+        if self.server.delay:
+            await asyncio.sleep(self.server.delay)
+        kind = self.paths.pop(stream_id).split("?", 1)[0].rsplit("/", 1)[-1]
+        body = self.server.payloads.get(kind)
+        if body is None:
+            self.conn.send_headers(stream_id, [(":status", "404"), ("content-length", "0")], end_stream=True)
+            self.transport.write(self.conn.data_to_send())
+            return
+        self.conn.send_headers(stream_id, [
+            (":status", "200"),
+            ("content-type", "application/json; charset=utf-8"),
+            ("content-length", str(len(body))),
+        ])
+        # 按流量控制窗口分块发送，窗口用完时等待客户端的 WINDOW_UPDATE
+        while body:
+            if self.transport.is_closing():
+                return
+            size = min(self.conn.local_flow_control_window(stream_id), self.conn.max_outbound_frame_size, len(body))
+            if size <= 0:
+                self.window_updated.clear()
+                await self.window_updated.wait()
+                continue
+            self.conn.send_data(stream_id, body[:size], end_stream=size == len(body))
+            body = body[size:]
+            self.transport.write(self.conn.data_to_send())
+
+
+class H2StubServer:
+    """
+    在后台线程的事件循环中运行的 h2c 桩服务，接口与 StubServer 相同。
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, delay=0.0, connect_delay=0.0):
+        import h2  # noqa: F401  未安装 h2 时在创建时报错
+
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.connect_delay = connect_delay
+        self.payloads = _payloads()
+        self.connections = set()
+        self._loop = asyncio.new_event_loop()
+        self._server = None
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        create = self._loop.create_server(lambda: _H2Protocol(self), self.host, self.port)
+        self._server = asyncio.run_coroutine_threadsafe(create, self._loop).result()
+        return self
+
+    def stop(self):
+        async def close():
+            self._server.close()
+            for transport in list(self.connections):
+                transport.close()
+            await self._server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(close(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
@@ -1,77 +1,119 @@
-import copy
-import pymysql
 import pytest
-import requests
 
-from config import setting
-from commons.logs_util import logger
+from commons import db_util
+from commons.expr_util import compile_jsonpath
+from commons.logs_util import LogBody, logger
+from commons.response_util import ResponseView
+from commons.stream_util import BODY_ASSERT_TYPES, BODY_PROPERTIES
+
+# 需要查询数据库的断言类型
+DB_ASSERT_TYPES = ["db_equals", "db_contains", "db_rows_equals"]
 
-class AssertUtil:
-    def __init__(self):
-        # 初始化数据库连接配置
-        self.db_config = {
-            'user': setting.db_username,
-            'password': setting.db_password,
-            'host': setting.db_host,
-            'database': setting.db_database,
-            'port': setting.db_port
-        }
-
-    def _connect_database(self):
-        """
-        建立数据库连接
-        :return: 数据库连接对象
-        """
-        logger.info("尝试建立数据库连接")
-        try:
-            connection = pymysql.connect(**self.db_config)
-            logger.info("数据库连接成功")
-            return connection
-        except pymysql.Error as e:
-            error_msg = f"数据库连接失败: {e}"
-            logger.error(error_msg)
-            raise Exception(error_msg)
 
-    def _execute_sql(self, sql):
+class AssertUtil:
+    def _execute_sql(self, sql, fetch="one"):
         """
-        执行 SQL 语句并返回查询结果
+        通过连接池执行 SQL 语句并返回查询结果
         :param sql: SQL 语句
+        :param fetch: one 返回第一行，all 返回所有行
         :return: 查询结果
         """
-        logger.info(f"准备执行 SQL 语句: {sql}")
-        with self._connect_database() as conn:
-            with conn.cursor() as cs:
-                try:
-                    cs.execute(sql)
-                    result = cs.fetchone()
-                    logger.info(f"SQL 语句执行成功，查询结果: {result}")
-                    return result
-                except pymysql.Error as e:
-                    error_msg = f"执行 SQL 语句失败: {sql}, 错误信息: {e}"
-                    logger.error(error_msg)
-                    raise Exception(error_msg)
+        return db_util.execute(sql, fetch)
+
+    def prepare_db_assertions(self, validate):
+        """
+        收集 validate 中所有数据库断言的 SQL，合并为一次数据库往返预先查询
+        :param validate: 替换变量后的 validate 字典
+        """
+        sqls = [
+            yq_and_sj_data[0]
+            for assert_type, value in validate.items() if assert_type in DB_ASSERT_TYPES
+            for yq_and_sj_data in value.values()
+            if isinstance(yq_and_sj_data[0], str)
+        ]
+        if sqls:
+            db_util.execute_batch(sqls)
+
+    def _normalize_rows(self, rows):
+        """
+        把 fetchall 的结果转换为列表：单列结果转换为值列表，多列结果转换为列表的列表
+        :param rows: fetchall 结果
+        :return: 列表
+        """
+        rows = rows or ()
+        if all(len(row) == 1 for row in rows):
+            return [row[0] for row in rows]
+        return [list(row) for row in rows]
+
+    def _rows_equal(self, db_rows, actual):
+        """
+        比较数据库结果集和响应中的数组，逐行逐列比较，数据库类型（Decimal、datetime 等）按字符串比较
+        """
+        if not isinstance(actual, list):
+            return False
+        return self._cell_equal(db_rows, actual)
+
+    def _cell_equal(self, expected, actual):
+        """
+        比较一个单元格的值，行（列表）逐个比较其中的单元格，单个值相等或字符串形式相等即视为相等
+        """
+        if isinstance(expected, (list, tuple)) or isinstance(actual, (list, tuple)):
+            if not isinstance(expected, (list, tuple)) or not isinstance(actual, (list, tuple)):
+                return False
+            return len(expected) == len(actual) and all(self._cell_equal(a, b) for a, b in zip(expected, actual))
+        return expected == actual or str(expected) == str(actual)
+
+    def _select_json(self, res, expr):
+        """
+        用 jsonpath 从响应 JSON 中选取数组；表达式直接指向数组时返回该数组本身
+        :param res: 响应视图对象
+        :param expr: jsonpath 表达式
+        :return: 选取到的列表
+        """
+        values = compile_jsonpath(expr)(res.json) if res.json is not None else []
+        if len(values) == 1 and isinstance(values[0], list):
+            return values[0]
+        return values
+
+    def _get_body_value(self, res, sj):
+        """
+        获取流式读取结果中的属性值，例如 size、md5、sha256、content_type、detected_type
+        :param res: 响应视图对象
+        :param sj: 属性名
+        :return: 属性值
+        """
+        if sj not in BODY_PROPERTIES:
+            raise ValueError(f"流式响应体没有属性 {sj}，支持的属性有 {list(BODY_PROPERTIES)}")
+        body = res.body if isinstance(res, ResponseView) else None
+        if body is None:
+            raise ValueError("响应没有流式读取，无法执行 body 断言，请在用例中配置 stream")
+        value = getattr(body, sj)
+        if value is None:
+            raise ValueError(f"流式读取时没有计算 {sj}，请在 stream 的 hash 中配置")
+        logger.info("成功获取流式响应体的 |%s| 值: |%s|", sj, value)
+        return value
 
     def _get_response_value(self, res, sj):
         """
         根据 sj 的情况查找响应对象中对应的值
-        :param res: 响应对象（可能是 requests 响应对象或字典）
+        :param res: 响应视图对象 ResponseView 或字典
         :param sj: 要查找的值或键
         :return: 对应的属性值或键，如果未找到则返回 sj 本身
         """
-        logger.info(f"尝试查找响应对象中与 |{sj}| 对应的属性值或键")
+        logger.info("尝试查找响应对象中与 |%s| 对应的属性值或键", sj)
 
         # 将 sj 转换为字符串用于 hasattr 检查
         sj_str = str(sj)
 
-        # 检查 sj 是否为 requests 响应对象的属性名
-        if isinstance(res, requests.models.Response) and hasattr(res, sj_str):
+        # 检查 sj 是否为响应视图对象的属性名
+        if isinstance(res, ResponseView) and hasattr(res, sj_str):
             try:
                 # 尝试使用 getattr 获取响应对象的属性值
                 value = getattr(res, sj_str)
-                logger.info(f"成功获取响应对象的 |{sj_str}| 属性值: |{value}|")
+                logger.info("成功获取响应对象的 |%s| 属性值: |%s|", sj_str, LogBody(value))
                 return value
             except AttributeError:
-                logger.warning(f"获取响应对象的 |{sj_str}| 属性时出错，继续查找字典中的值")
+                logger.warning("获取响应对象的 |%s| 属性时出错，继续查找字典中的值", sj_str)
 
         # 检查 res 是否为字典
         if isinstance(res, dict):
@@ -80,14 +122,14 @@ class AssertUtil:
                 try:
                     # 尝试将 value 转换为 sj 的类型进行比较
                     if type(sj)(value) == sj:
-                        logger.info(f"成功找到值为 |{sj}| 对应的键: |{key}|，返回该键")
+                        logger.info("成功找到值为 |%s| 对应的键: |%s|，返回该键", sj, key)
                         return key
                 except (ValueError, TypeError):
                     # 如果转换失败，直接比较原始值
                     if value == sj:
-                        logger.info(f"成功找到值为 |{sj}| 对应的键: |{key}|，返回该键")
+                        logger.info("成功找到值为 |%s| 对应的键: |%s|，返回该键", sj, key)
                         return key
-            logger.warning(f"响应对象中没有值为 |{sj}| 对应的键，返回值本身")
+            logger.warning("响应对象中没有值为 |%s| 对应的键，返回值本身", sj)
         else:
             logger.warning("响应对象不是字典，无法进行查找，返回值本身")
 
@@ -101,17 +143,17 @@ class AssertUtil:
         :param sj_value: 实际值
         :param msg: 断言失败时的提示信息
         """
-        supported_assert_types = ["equals", "contains", "db_equals", "db_contains"]
+        supported_assert_types = ["equals", "contains"] + DB_ASSERT_TYPES + BODY_ASSERT_TYPES
         if assert_type not in supported_assert_types:
             error_msg = f"不支持的断言类型: {assert_type}，支持的类型有 {supported_assert_types}"
             logger.error(error_msg)
             raise ValueError(error_msg)
 
-        logger.info(f"开始执行 {assert_type} 断言，预期值: {yq}，实际值: {sj_value}")
+        logger.info("开始执行 %s 断言，预期值: %s，实际值: %s", assert_type, yq, sj_value)
         if assert_type == "equals":
             try:
                 assert yq == sj_value, msg
-                logger.info(f"{msg} 断言成功，预期值: {yq}，实际值: {sj_value}")
+                logger.info("%s 断言成功，预期值: %s，实际值: %s", msg, yq, sj_value)
             except AssertionError:
                 error_msg = f"{msg} 断言失败，预期值：{yq}，实际值：{sj_value}"
                 logger.error(error_msg)
@@ -119,7 +161,7 @@ class AssertUtil:
         elif assert_type == "contains":
             try:
                 assert yq in sj_value, msg
-                logger.info(f"{msg} 断言成功，预期值: {yq}，实际值: {sj_value}")
+                logger.info("%s 断言成功，预期值: %s，实际值: %s", msg, yq, sj_value)
             except AssertionError:
                 error_msg = f"{msg} 断言失败，预期值：{yq}，实际值：{sj_value}"
                 logger.error(error_msg)
@@ -128,7 +170,7 @@ class AssertUtil:
             yq_value = self._execute_sql(yq)
             try:
                 assert yq_value[0] in sj_value, msg
-                logger.info(f"{msg} 断言成功，数据库查询值: {yq_value[0]}，实际值: {sj_value}")
+                logger.info("%s 断言成功，数据库查询值: %s，实际值: %s", msg, yq_value[0], sj_value)
             except AssertionError:
                 error_msg = f"{msg} 断言失败，数据库查询值：{yq_value[0]}，实际值：{sj_value}"
                 logger.error(error_msg)
@@ -137,33 +179,70 @@ class AssertUtil:
             yq_value = self._execute_sql(yq)
             try:
                 assert yq_value[0] in sj_value, msg
-                logger.info(f"{msg} 断言成功，数据库查询值: {yq_value[0]}，实际值: {sj_value}")
+                logger.info("%s 断言成功，数据库查询值: %s，实际值: %s", msg, yq_value[0], sj_value)
             except AssertionError:
                 error_msg = f"{msg} 断言失败，数据库查询值：{yq_value[0]}，实际值：{sj_value}"
                 logger.error(error_msg)
                 raise AssertionError(error_msg)
+        elif assert_type == "db_rows_equals":
+            yq_value = self._normalize_rows(self._execute_sql(yq, "all"))
+            try:
+                assert self._rows_equal(yq_value, sj_value), msg
+                logger.info("%s 断言成功，数据库查询结果: %s，实际值: %s", msg, yq_value, sj_value)
+            except AssertionError:
+                error_msg = f"{msg} 断言失败，数据库查询结果：{yq_value}，实际值：{sj_value}"
+                logger.error(error_msg)
+                raise AssertionError(error_msg)
+
+        elif assert_type == "body_equals":
+            # 哈希不区分大小写，大小按数值比较
+            expected = str(yq).lower() if isinstance(sj_value, str) else yq
+            try:
+                assert expected == sj_value, msg
+                logger.info("%s 断言成功，预期值: %s，实际值: %s", msg, yq, sj_value)
+            except AssertionError:
+                error_msg = f"{msg} 断言失败，预期值：{yq}，实际值：{sj_value}"
+                logger.error(error_msg)
+                raise AssertionError(error_msg)
+        elif assert_type == "body_contains":
+            try:
+                assert str(yq) in str(sj_value), msg
+                logger.info("%s 断言成功，预期值: %s，实际值: %s", msg, yq, sj_value)
+            except AssertionError:
+                error_msg = f"{msg} 断言失败，预期值：{yq}，实际值：{sj_value}"
+                logger.error(error_msg)
+                raise AssertionError(error_msg)
+        elif assert_type == "body_between":
+            # 预期值为 [最小值, 最大值]，任一端为 null 表示不限制
+            low, high = yq
+            try:
+                assert (low is None or sj_value >= low) and (high is None or sj_value <= high), msg
+                logger.info("%s 断言成功，预期范围: %s，实际值: %s", msg, yq, sj_value)
+            except AssertionError:
+                error_msg = f"{msg} 断言失败，预期范围：{yq}，实际值：{sj_value}"
+                logger.error(error_msg)
+                raise AssertionError(error_msg)
 
     def assert_all_case(self, res, assert_type, value):
         """
         执行所有断言用例
-        :param res: 响应对象
+        :param res: 响应视图对象，JSON 在视图中只解析一次，这里不再深拷贝
         :param assert_type: 断言类型
         :param value: 断言数据，包含预期值和实际值
         """
-        logger.info(f"开始执行 {assert_type} 断言用例")
-        new_res = copy.deepcopy(res)
-        try:
-            new_res.json = new_res.json()
-            logger.info("成功将响应内容转换为 JSON 格式")
-        except Exception:
-            new_res.json = {"msg": 'response not json data'}
-            error_msg = f"将响应内容转换为 JSON 格式时出错，当前已将响应 JSON 内容设为: |{new_res.json}|"
-            logger.error(error_msg)
-            raise Exception(error_msg)
-
+        logger.info("开始执行 %s 断言用例", assert_type)
         for msg, yq_and_sj_data in value.items():
             yq, sj = yq_and_sj_data[0], yq_and_sj_data[1]
-            sj_value = self._get_response_value(new_res, sj)
+            if assert_type == "db_rows_equals":
+                sj_value = self._select_json(res, sj)
+            elif assert_type in BODY_ASSERT_TYPES:
+                try:
+                    sj_value = self._get_body_value(res, sj)
+                except ValueError as e:
+                    logger.error("%s 断言失败，%s", msg, e)
+                    pytest.fail(f"{msg} 断言失败，{e}")
+            else:
+                sj_value = self._get_response_value(res, sj)
             try:
                 self._perform_assertion(assert_type, yq, sj_value, msg)
             except AssertionError as e:
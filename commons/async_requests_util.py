@@ -0,0 +1,194 @@
+import time
+
+import httpx
+
+from commons import logs_util, pool_util, rate_util, stream_util
+from commons.logs_util import logger
+from commons.requests_util import RequestUtil
+from commons.response_util import ResponseView
+
+
+class _PhaseTracer:
+    """
+    httpx 的 trace 回调，按事件记录 connect、tls、ttfb、download 阶段耗时。
+    并发请求共用一个线程，因此耗时记录在各自的响应上，而不是当前线程的用例步骤中。
+    """
+    _PHASES = {
+        "connection.connect_tcp": "connect",
+        "connection.start_tls": "tls",
+        "http11.send_request_body": "upload",
+        "http2.send_request_body": "upload",
+        "http11.receive_response_headers": "ttfb",
+        "http2.receive_response_headers": "ttfb",
+        "http11.receive_response_body": "download",
+        "http2.receive_response_body": "download",
+    }
+
+    def __init__(self):
+        self._started = {}
+        self._phases = {}
+
+    async def __call__(self, event_name, info):
+        name, _, state = event_name.rpartition(".")
+        phase = self._PHASES.get(name)
+        if phase is None:
+            return
+        if state == "started":
+            self._started[name] = time.perf_counter()
+        elif name in self._started:
+            cost_ms = (time.perf_counter() - self._started.pop(name)) * 1000
+            self._phases[phase] = self._phases.get(phase, 0.0) + cost_ms
+
+    def timings(self, send_ms):
+        return {"send": send_ms, **self._phases}
+
+
+class AsyncRequestUtil(RequestUtil):
+    """
+    基于 httpx.AsyncClient 的异步请求工具类。
+    接收与 RequestUtil.send_all_request 相同的 request 字典（params 合并 setting.global_args、files 上传等）
+    以及 stream_options、cache_ttl 参数，返回相同的 ResponseView，便于后续的提取和断言直接复用。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._pool_configs = pool_util.load_configs()
+        # 按 verify 参数和协议区分客户端，同一客户端内的请求共享连接池
+        self._clients = {}
+
+    def _get_client(self, verify=True, url=None):
+        """
+        获取请求地址对应的客户端。与同步请求一致，[http_pool:<别名>] 中配置了 http2 : true 的地址使用 HTTP/2，
+        https 地址通过 ALPN 协商，http 地址按 h2c 直接使用 HTTP/2；未安装 h2 时使用 HTTP/1.1
+        :param verify: 证书校验参数
+        :param url: 请求地址
+        :return: httpx.AsyncClient
+        """
+        config, prefix = pool_util.config_for(url or "", *self._pool_configs)
+        http2 = config["http2"]
+        prior_knowledge = http2 and bool(prefix) and prefix.lower().startswith("http://")
+        key = (verify, http2, prior_knowledge)
+        client = self._clients.get(key)
+        if client is None and http2:
+            try:
+                transport = httpx.AsyncHTTPTransport(verify=verify, http1=not prior_knowledge, http2=True)
+                client = self._clients[key] = httpx.AsyncClient(transport=transport)
+            except ImportError as e:
+                logger.error("%s 开启了 http2，但无法加载 HTTP/2 依赖，使用 HTTP/1.1: %s", prefix or "默认配置", e)
+        if client is None:
+            client = self._clients[key] = httpx.AsyncClient(verify=verify)
+        return client
+
+    def _encode_files(self, kwargs, parts, chunked):
+        """
+        httpx 本身会按块读取文件对象生成 multipart 请求体，这里只转换为 (文件名, 文件对象, 内容类型)，不支持 chunked
+        :param kwargs: 请求参数
+        :param parts: 上传内容列表
+        :param chunked: 是否使用分块传输编码
+        :return: 更新后的请求参数
+        """
+        kwargs = dict(kwargs)
+        kwargs["files"] = {part.name: (part.filename, part.fileobj, part.content_type) for part in parts}
+        return kwargs
+
+    def _to_httpx_kwargs(self, kwargs):
+        """
+        把 requests 风格的请求参数转换为 httpx 的请求参数
+        :param kwargs: requests 风格的请求参数
+        :return: (httpx 请求参数, verify 参数)
+        """
+        kwargs = dict(kwargs)
+        verify = kwargs.pop("verify", True)
+        kwargs["follow_redirects"] = kwargs.pop("allow_redirects", True)
+        data = kwargs.get("data")
+        if isinstance(data, (str, bytes)):
+            kwargs["content"] = kwargs.pop("data")
+        for key in ("proxies", "stream", "hooks", "cert"):
+            if kwargs.pop(key, None) is not None:
+                logger.warning("异步请求暂不支持参数 %s，已忽略", key)
+        return kwargs, verify
+
+    async def send_all_request(self, stream_options=None, cache_ttl=None, **kwargs):
+        """
+        异步发送所有类型的请求
+        :param stream_options: 流式读取配置（stream_util.parse_options 的返回值），None 表示一次性读取响应体
+        :param cache_ttl: 响应缓存有效期（秒，cache_util.parse_ttl 的返回值），None 表示不使用缓存
+        :param kwargs: 请求参数
+        :return: 响应视图对象 ResponseView，请求失败时返回 None
+        """
+        # 更新请求参数
+        kwargs = self._update_params(kwargs)
+        # 按采样比例决定本次请求的请求体和响应体是否输出到日志
+        sampled = logs_util.sample_body()
+        # 与同步请求共用本次运行的响应缓存，缓存键使用异步客户端的 Cookie
+        cookies = self._get_client(kwargs.get("verify", True), kwargs.get("url")).cookies.jar
+        cache, cache_key, cache_entry, response = self._lookup_cache(kwargs, stream_options, cache_ttl, cookies)
+        if response is not None:
+            self._log_response_info(response, sampled)
+            return response
+        # 打开文件
+        kwargs, file_objects = self._open_files(kwargs)
+        # 记录其他请求信息
+        self._log_request_info(kwargs, sampled)
+
+        try:
+            httpx_kwargs, verify = self._to_httpx_kwargs(kwargs)
+            limiter = rate_util.get_limiter(httpx_kwargs.get("url"))
+            attempts = 0
+            while True:
+                # 配置了 [rate_limit] 的主机先等待令牌，等待期间事件循环继续处理其他请求
+                wait = await limiter.acquire_async() if limiter is not None else 0.0
+                tracer = _PhaseTracer()
+                httpx_kwargs["extensions"] = {"trace": tracer}
+                start = time.perf_counter()
+                body = None
+                if stream_options is not None:
+                    async with self._get_client(verify, httpx_kwargs.get("url")).stream(**httpx_kwargs) as raw:
+                        body = await stream_util.consume_async(raw, stream_options)
+                else:
+                    raw = await self._get_client(verify, httpx_kwargs.get("url")).request(**httpx_kwargs)
+                timings = tracer.timings((time.perf_counter() - start) * 1000)
+                if wait > 0:
+                    timings["wait"] = wait * 1000
+                response = ResponseView(raw, timings, body)
+                throttled = limiter is not None and limiter.observe(response)
+                if not throttled:
+                    break
+                if file_objects or attempts >= limiter.config["throttle_retries"]:
+                    logger.warning("请求被限流: %s %s", kwargs.get("method"), kwargs.get("url"))
+                    break
+                attempts += 1
+                logger.warning("请求被限流，等待后第 %s 次重新发送: %s %s", attempts, kwargs.get("method"), kwargs.get("url"))
+            # 被限流的响应不写入缓存
+            if cache is not None and not throttled:
+                response = self._update_cache(cache, cache_key, cache_entry, response, cache_ttl)
+        except httpx.HTTPError as e:
+            logger.error("请求发生错误: %s", e)
+            response = None
+        finally:
+            # 关闭文件
+            for file in file_objects:
+                try:
+                    file.close()
+                except Exception as e:
+                    logger.error("关闭文件时发生错误: %s", e)
+
+        if response is not None:
+            # 记录响应信息
+            self._log_response_info(response, sampled)
+
+        return response
+
+    async def aclose(self):
+        """
+        关闭所有异步客户端
+        """
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
@@ -0,0 +1,94 @@
+import time
+
+from commons.lazy_util import lazy_import
+from commons.logs_util import logger
+from commons.template_util import get_template
+
+# 只有开启 --async-run 时才导入 asyncio
+asyncio = lazy_import("asyncio")
+
+# 预先并发发送的请求结果，键为用例 request 字典的 id，值为 (request 字典, ResponseView)
+_prefetched = {}
+
+# 依赖前序用例结果的热加载函数，使用了这些函数的请求不能提前发送
+DEPENDENT_FUNCTIONS = {"read_yaml"}
+# 可以提前发送的请求方法，提前发送有副作用的请求会改变前序用例看到的数据
+PREFETCH_METHODS = ("GET", "HEAD")
+
+
+def is_independent(caseinfo):
+    """
+    判断用例是否可以提前并发执行：配置了 prefetch: true 的单接口 GET/HEAD 用例，不流式读取响应体、不使用响应缓存，
+    且请求中不引用提取变量和响应属性。提前发送时还没有执行任何用例，没有登录状态，也看不到前序用例写入的数据，
+    因此只发送用例显式声明可以提前发送的请求。
+
+    :param caseinfo: read_testcase 返回的单个用例
+    :return: 可以并发执行返回 True
+    """
+    if not isinstance(caseinfo, dict) or not caseinfo.get("prefetch"):
+        return False
+    if not isinstance(caseinfo.get("request"), dict):
+        return False
+    if caseinfo.get("stream") or caseinfo.get("cache"):
+        return False
+    if str(caseinfo["request"].get("method", "")).upper() not in PREFETCH_METHODS:
+        return False
+    for placeholder in get_template(caseinfo["request"]).placeholders:
+        if placeholder.kind == "response" or placeholder.name in DEPENDENT_FUNCTIONS:
+            logger.warning("用例 %s 的请求引用了 %s，不能提前发送", caseinfo.get("title"), placeholder.raw)
+            return False
+    return True
+
+
+async def _send_all(requests, concurrency):
+    from commons.async_requests_util import AsyncRequestUtil
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with AsyncRequestUtil() as request_util:
+        async def send(new_request):
+            async with semaphore:
+                try:
+                    return await request_util.send_all_request(**new_request)
+                except Exception as e:
+                    logger.error(f"并发发送请求时发生错误: {e}")
+                    return None
+
+        return await asyncio.gather(*(send(new_request) for new_request in requests))
+
+
+def prefetch(caseinfo_list, extract_util, concurrency):
+    """
+    在一个事件循环中并发发送所有配置了 prefetch 的独立单接口用例的请求，结果在用例执行时通过 pop_prefetched 取出。
+    用例的变量提取和断言仍然在 pytest 执行该用例时按顺序进行。
+
+    :param caseinfo_list: 用例列表
+    :param extract_util: 用于渲染请求模板的 ExtractUtil 实例
+    :param concurrency: 最大并发数
+    :return: 提前发送的请求个数
+    """
+    cases = [caseinfo for caseinfo in caseinfo_list if is_independent(caseinfo)]
+    if not cases:
+        return 0
+    requests = [extract_util.change(caseinfo["request"]) for caseinfo in cases]
+    start = time.perf_counter()
+    responses = asyncio.run(_send_all(requests, max(1, concurrency)))
+    for caseinfo, response in zip(cases, responses):
+        if response is not None:
+            _prefetched[id(caseinfo["request"])] = (caseinfo["request"], response)
+    logger.info(f"并发执行 {len(cases)} 个独立单接口用例请求，并发数 {concurrency}，耗时 {time.perf_counter() - start:.3f} 秒")
+    return len(cases)
+
+
+def pop_prefetched(request_data):
+    """
+    取出用例已经提前发送的响应，没有时返回 None。
+
+    :param request_data: 用例的 request 字典
+    :return: ResponseView 或 None
+    """
+    item = _prefetched.pop(id(request_data), None)
+    if item is None or item[0] is not request_data:
+        return None
+    logger.info("使用并发预执行的响应结果")
+    return item[1]
@@ -1,26 +1,36 @@
 import logging
+import os
+import threading
+
 from iniconfig import IniConfig
+from config import setting
 from commons.logs_util import logger
 
-def read_ini(config_file_path="./pytest.ini"):
+# base_url 配置快照，会话内只解析一次 pytest.ini，之后的查找都是字典读取
+_snapshot = {"path": None, "profile": None, "mtime": None, "values": None}
+_lock = threading.Lock()
+
+
+def read_ini(config_file_path="./pytest.ini", section="base_url"):
     """
-    读取 INI 配置文件中的 `base_url` 部分。
+    读取 INI 配置文件中的指定部分，默认读取 `base_url` 部分。
 
     :param config_file_path: 配置文件的路径，默认为 "./pytest.ini"
-    :return: 如果 `base_url` 部分存在，返回其配置项的字典；否则返回空字典
+    :param section: 要读取的部分名称，默认为 "base_url"
+    :return: 如果该部分存在，返回其配置项的字典；否则返回空字典
     """
     try:
         # 尝试读取配置文件
         ini = IniConfig(config_file_path)
-        # 检查配置文件中是否存在 base_url 部分
-        if "base_url" in ini:
-            # 若存在，将 base_url 部分的配置项转换为字典并返回
-            base_url_config = dict(ini["base_url"].items())
-            # logging.info(f"成功读取到 base_url 配置: {base_url_config}")
+        # 检查配置文件中是否存在该部分
+        if section in ini:
+            # 若存在，将该部分的配置项转换为字典并返回
+            base_url_config = dict(ini[section].items())
+            # logging.info(f"成功读取到 {section} 配置: {base_url_config}")
             return base_url_config
         else:
             # 若不存在，记录信息并返回空字典
-            logging.info("配置文件中未找到 base_url 部分，返回空字典。")
+            logging.info(f"配置文件中未找到 {section} 部分，返回空字典。")
             return {}
     except FileNotFoundError:
         # 处理文件未找到的异常，记录错误信息并返回空字典
@@ -29,4 +39,69 @@ def read_ini(config_file_path="./pytest.ini"):
     except Exception as e:
         # 处理其他异常，记录错误信息并返回空字典
         logging.error(f"读取配置文件时出现未知错误: {e}")
-        return {}
\ No newline at end of file
+        return {}
+
+
+def _get_mtime(config_file_path):
+    try:
+        return os.stat(config_file_path).st_mtime
+    except OSError:
+        return None
+
+
+def load_base_url(config_file_path=None, profile=None):
+    """
+    解析 pytest.ini 并生成 base_url 快照。
+    选择了环境 profile 时，用 [base_url:<profile>] 中的配置覆盖 [base_url] 中的同名项。
+
+    :param config_file_path: 配置文件路径，默认为 setting.base_url_config
+    :param profile: 环境名称，例如 dev、staging、prod，为 None 时只读取 [base_url]
+    :return: 合并后的 base_url 字典
+    """
+    config_file_path = config_file_path or setting.base_url_config
+    values = read_ini(config_file_path)
+    if profile:
+        profile_values = read_ini(config_file_path, f"base_url:{profile}")
+        if not profile_values:
+            logger.warning(f"配置文件中未找到环境 {profile} 对应的 [base_url:{profile}] 部分，使用默认 [base_url] 配置。")
+        values.update(profile_values)
+    with _lock:
+        _snapshot.update(path=config_file_path, profile=profile, mtime=_get_mtime(config_file_path), values=values)
+    logger.info(f"加载 base_url 配置完成，环境: {profile or 'default'}，配置: {values}")
+    return values
+
+
+def set_profile(profile):
+    """
+    切换环境 profile 并重新加载快照，通常在 pytest_configure 中根据命令行参数调用。
+
+    :param profile: 环境名称
+    """
+    load_base_url(_snapshot["path"], profile)
+
+
+def get_profile():
+    """
+    获取当前使用的环境 profile。
+
+    :return: 环境名称，只使用 [base_url] 时为 None
+    """
+    if _snapshot["values"] is None:
+        get_base_url()
+    return _snapshot["profile"]
+
+
+def get_base_url():
+    """
+    获取 base_url 快照。首次调用时加载；开启 setting.base_url_auto_reload 时，
+    配置文件修改时间变化后会自动重新加载。
+
+    :return: base_url 字典
+    """
+    values = _snapshot["values"]
+    if values is None:
+        return load_base_url(profile=setting.base_url_profile)
+    if setting.base_url_auto_reload and _get_mtime(_snapshot["path"]) != _snapshot["mtime"]:
+        logger.info(f"检测到配置文件 {_snapshot['path']} 已修改，重新加载 base_url 配置。")
+        return load_base_url(_snapshot["path"], _snapshot["profile"])
+    return values
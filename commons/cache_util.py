@@ -0,0 +1,197 @@
+"""
+@FileName: cache_util.py
+@Description: 本次运行内的响应缓存。用例配置 cache 后，相同的 GET/HEAD 请求在有效期内直接返回缓存的响应，不访问网络；
+过期后如果缓存的响应带有 ETag 或 Last-Modified，发送条件请求，服务端返回 304 时继续使用缓存并刷新有效期。
+缓存按最近使用顺序淘汰，最多保留 setting.response_cache_max_entries 个响应，会话结束时输出命中率。
+
+cache: 300s      # 有效期，支持 s、m、h 单位，纯数字为秒
+cache: true      # 使用 setting.response_cache_ttl
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from config import setting
+from commons.cassette_util import request_key
+from commons.logs_util import logger
+
+# 可以缓存的请求方法
+CACHEABLE_METHODS = ("GET", "HEAD")
+
+_TTL_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smh]?)\s*$", re.IGNORECASE)
+_TTL_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_ttl(cache):
+    """
+    解析用例中的 cache 配置。
+
+    :param cache: yaml 中 cache 字段的值：true、秒数或带单位的字符串，例如 300s、5m、1h
+    :return: 有效期秒数，未开启时返回 None
+    """
+    if cache is None or cache is False:
+        return None
+    if cache is True:
+        return float(setting.response_cache_ttl)
+    if isinstance(cache, (int, float)):
+        ttl = float(cache)
+    else:
+        match = _TTL_PATTERN.match(str(cache))
+        if not match:
+            raise ValueError(f"无法解析的缓存有效期: {cache}，示例: 300、300s、5m、1h")
+        number, unit = match.groups()
+        ttl = float(number) * _TTL_UNITS[unit.lower()]
+    if ttl <= 0:
+        raise ValueError(f"缓存有效期必须大于 0: {cache}")
+    return ttl
+
+
+def cache_key(kwargs, cookies=None):
+    """
+    计算请求的缓存键：与请求磁带相同的归一化请求，再加上会话中的 Cookie，
+    不同登录状态下的相同请求不会命中同一个缓存。
+
+    :param kwargs: 请求参数
+    :param cookies: 会话的 CookieJar
+    :return: (键, 归一化后的请求)
+    """
+    key, normalized = request_key(kwargs)
+    if cookies:
+        jar = sorted(f"{cookie.domain}{cookie.path}{cookie.name}={cookie.value}" for cookie in cookies)
+        key = hashlib.sha1(f"{key}|{';'.join(jar)}".encode("utf-8")).hexdigest()
+    return key, normalized
+
+
+class CacheEntry:
+    """
+    一个缓存的响应，保存完整读取后的 requests.Response 以及验证信息。
+    """
+    __slots__ = ("response", "expires_at", "etag", "last_modified")
+
+    def __init__(self, response, ttl):
+        self.response = response
+        self.expires_at = time.monotonic() + ttl
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+
+    @property
+    def fresh(self):
+        return time.monotonic() < self.expires_at
+
+    def refresh(self, ttl):
+        self.expires_at = time.monotonic() + ttl
+
+    def conditional_headers(self):
+        """
+        过期后发送条件请求需要的请求头，没有验证信息时返回空字典。
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def storable(response):
+    """
+    判断响应是否可以缓存：状态码 200，且服务端没有声明 Cache-Control: no-store。
+    """
+    if response.status_code != 200:
+        return False
+    return "no-store" not in response.headers.get("Cache-Control", "").lower()
+
+
+class ResponseCache:
+    """
+    按最近使用顺序淘汰的响应缓存，线程安全。过期的响应保留到被淘汰为止，用于发送条件请求。
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "revalidated": 0, "stores": 0, "evictions": 0}
+
+    def get(self, key):
+        """
+        获取缓存的响应，不区分是否过期，调用方根据 fresh 决定直接使用还是发送条件请求。
+
+        :param key: 缓存键
+        :return: CacheEntry 对象，没有缓存时返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, response, ttl):
+        """
+        缓存响应，超出容量时淘汰最久未使用的响应。
+
+        :param key: 缓存键
+        :param response: 已读取响应体的 requests.Response
+        :param ttl: 有效期秒数
+        """
+        entry = CacheEntry(response, ttl)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def count(self, counter):
+        with self._lock:
+            self._stats[counter] += 1
+
+    def stats(self):
+        """
+        获取缓存统计，命中率为命中（包括 304 重新验证）的请求占比。
+
+        :return: 统计字典
+        """
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries))
+        lookups = stats["hits"] + stats["revalidated"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["revalidated"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    获取本次运行的响应缓存，第一次使用时创建。
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(setting.response_cache_max_entries)
+    return _cache
+
+
+def cache_stats():
+    """
+    获取响应缓存统计，没有用例使用缓存时返回 None。
+    """
+    return _cache.stats() if _cache is not None else None
+
+
+def report():
+    """
+    把缓存统计写入日志，并行运行时每个 worker 各自输出。
+    """
+    stats = cache_stats()
+    if stats:
+        logger.info(
+            "响应缓存统计: 命中 %s 次，304 重新验证 %s 次，未命中 %s 次，命中率 %s，缓存 %s 个，淘汰 %s 个",
+            stats["hits"], stats["revalidated"], stats["misses"], stats["hit_ratio"], stats["entries"], stats["evictions"],
+        )
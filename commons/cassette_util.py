@@ -0,0 +1,241 @@
+import base64
+import glob
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import timedelta
+
+from commons import hotload_util
+from commons.lazy_util import lazy_import
+from commons.logs_util import logger
+from commons.worker_util import is_worker, worker_file
+
+# 只有回放磁带中的响应时才导入 requests，cache_util 等只用到 request_key 的模块导入本模块时不加载 requests
+requests = lazy_import("requests")
+
+# 录制/回放模式
+# record: 全部发送真实请求并写入磁带；replay: 只从磁带读取，未录制的请求直接失败；
+# auto: 已录制的请求回放，未录制的发送真实请求并补录
+RECORD_MODES = ("record", "replay", "auto")
+
+# 屏蔽易变字段后使用的占位文本
+_MASK = "<volatile>"
+
+
+def _mask(value, volatile):
+    """
+    递归替换请求参数中易变函数生成的值，字典按键排序以保证键稳定。
+    """
+    if isinstance(value, dict):
+        return {str(k): _mask(v, volatile) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_mask(v, volatile) for v in value]
+    if isinstance(value, bytes):
+        value = value.decode("utf-8", errors="replace")
+    if isinstance(value, str):
+        for item in volatile:
+            if item:
+                value = value.replace(item, _MASK)
+        return value
+    if value is not None and not isinstance(value, bool) and str(value) in volatile:
+        return _MASK
+    return value
+
+
+def request_key(kwargs, volatile=()):
+    """
+    计算请求的归一化键：方法大写，参数按键排序，random_name() 等易变函数生成的值替换为占位文本。
+
+    :param kwargs: 请求参数
+    :param volatile: 本次请求渲染时易变函数的返回值
+    :return: (键, 归一化后的请求)
+    """
+    volatile = [str(v) for v in volatile if v is not None and v != ""]
+    normalized = {
+        "method": str(kwargs.get("method", "")).upper(),
+        "url": _mask(kwargs.get("url", ""), volatile),
+    }
+    for field in ("params", "headers", "data", "json", "files"):
+        if kwargs.get(field) is not None:
+            normalized[field] = _mask(kwargs[field], volatile)
+    text = json.dumps(normalized, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest(), normalized
+
+
+class Cassette:
+    """
+    请求/响应磁带。同一个键可以对应多次录制的响应，回放时按顺序返回，用完后重复返回最后一个。
+    文件为 gzip 压缩的 JSON，响应体能按 UTF-8 解码时保存文本，否则保存 base64。
+    """
+
+    def __init__(self, path, mode):
+        self.path = path
+        self.mode = mode
+        self.interactions = {}
+        self._cursor = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        if mode != "record":
+            self._load(path)
+
+    @property
+    def recording(self):
+        return self.mode in ("record", "auto")
+
+    @property
+    def replaying(self):
+        return self.mode in ("replay", "auto")
+
+    def _load(self, path):
+        if os.path.exists(path):
+            self.interactions = _read(path)
+            logger.info(f"加载请求磁带 {path}，共 {len(self.interactions)} 个请求")
+
+    def play(self, key):
+        """
+        获取键对应的下一个录制响应。
+
+        :param key: 请求键
+        :return: requests.Response 对象，未录制时返回 None
+        """
+        with self._lock:
+            records = self.interactions.get(key)
+            if not records:
+                return None
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            return _build_response(records[min(index, len(records) - 1)])
+
+    def record(self, key, normalized, response):
+        """
+        录制一次请求的响应。
+
+        :param key: 请求键
+        :param normalized: 归一化后的请求，保存 method 和 url 便于查看
+        :param response: 响应视图对象
+        """
+        content = response.content or b""
+        try:
+            body, encoding = content.decode("utf-8"), "text"
+        except UnicodeDecodeError:
+            body, encoding = base64.b64encode(content).decode("ascii"), "base64"
+        record = {
+            "request": f"{normalized['method']} {normalized['url']}",
+            "status_code": response.status_code,
+            "reason": getattr(response, "reason", ""),
+            "url": str(response.url),
+            "headers": dict(response.headers),
+            "cookies": dict(response.cookies),
+            "elapsed_ms": round(response.elapsed.total_seconds() * 1000, 3),
+            "body": body,
+            "encoding": encoding,
+        }
+        with self._lock:
+            if self.mode == "record" and key not in self._cursor:
+                # record 模式下第一次遇到的键覆盖旧的录制
+                self.interactions[key] = []
+                self._cursor[key] = 0
+            self.interactions.setdefault(key, []).append(record)
+            self._dirty = True
+
+    def save(self):
+        """
+        把磁带写入文件，并行运行时每个 worker 写入独立的文件，由主进程合并。
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            path = worker_file(self.path)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with gzip.open(path, "wt", encoding="utf-8") as f:
+                json.dump({"version": 1, "interactions": self.interactions}, f, ensure_ascii=False,
+                          separators=(",", ":"))
+            self._dirty = False
+        logger.info(f"请求磁带已写入: {path}，共 {len(self.interactions)} 个请求")
+
+
+def _read(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f).get("interactions", {})
+
+
+def _worker_pattern(path):
+    root, ext = os.path.splitext(path[:-3] if path.endswith(".gz") else path)
+    suffix = ext + (".gz" if path.endswith(".gz") else "")
+    return f"{root}_gw*{suffix}"
+
+
+def _build_response(record):
+    """
+    根据录制内容构造 requests.Response，之后同真实响应一样包装为 ResponseView。
+    """
+    response = requests.Response()
+    response.status_code = record["status_code"]
+    response.reason = record.get("reason", "")
+    response.url = record.get("url", "")
+    response.headers = requests.structures.CaseInsensitiveDict(record.get("headers", {}))
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.cookies = requests.cookies.cookiejar_from_dict(record.get("cookies", {}))
+    response.elapsed = timedelta(milliseconds=record.get("elapsed_ms", 0))
+    body = record.get("body", "")
+    response._content = base64.b64decode(body) if record.get("encoding") == "base64" else body.encode("utf-8")
+    return response
+
+
+_cassette = None
+
+
+def configure(path=None, mode=None):
+    """
+    开启录制/回放模式，mode 为 None 时关闭。
+
+    :param path: 磁带文件路径
+    :param mode: record、replay 或 auto
+    """
+    global _cassette
+    if not mode:
+        _cassette = None
+        hotload_util.track_volatile(False)
+        return
+    if mode not in RECORD_MODES:
+        raise ValueError(f"不支持的录制模式: {mode}，可选值: {RECORD_MODES}")
+    _cassette = Cassette(path, mode)
+    hotload_util.track_volatile(True)
+    logger.info(f"开启请求录制/回放，模式: {mode}，磁带: {path}")
+
+
+def get_cassette():
+    """
+    获取当前的磁带，未开启录制/回放时返回 None。
+    """
+    return _cassette
+
+
+def save():
+    """
+    保存当前磁带。主进程在并行录制结束后把各 worker 的磁带合并到主文件。
+    """
+    if _cassette is None:
+        return
+    _cassette.save()
+    if not is_worker() and _cassette.recording:
+        _merge_worker_files(_cassette.path)
+
+
+def _merge_worker_files(path):
+    files = sorted(glob.glob(_worker_pattern(path)))
+    if not files:
+        return
+    # auto 模式下每个 worker 的磁带都包含启动时加载的旧记录，同一个键取记录最多的一份
+    merged = Cassette(path, "record")
+    for file in files:
+        for key, records in _read(file).items():
+            if len(records) > len(merged.interactions.get(key, [])):
+                merged.interactions[key] = records
+    merged._dirty = True
+    merged.save()
+    for file in files:
+        os.remove(file)
+    logger.info(f"已合并 {len(files)} 个 worker 的请求磁带到 {path}")
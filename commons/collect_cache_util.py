@@ -0,0 +1,177 @@
+"""
+@FileName: collect_cache_util.py
+@Description: 用例收集缓存。保存 read_testcase 解析并展开数据驱动后的用例，
+键为 yaml 文件路径，mtime、大小和内容哈希都未变化、引用的数据文件也未修改时直接复用，只有修改过的文件重新解析。
+预先构建缓存（例如在 CI 中）: python -m commons.collect_cache_util [用例目录]
+"""
+import hashlib
+import os
+import pickle
+import sys
+import threading
+import time
+from pathlib import Path
+
+from config import setting
+from commons import ddt_util, template_util
+from commons.logs_util import logger
+
+# 缓存格式版本，结构变化时修改
+CACHE_VERSION = 2
+
+
+def _file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+class CollectCache:
+    """
+    用例收集缓存。数据驱动的展开逻辑（ddt_util.py、template_util.py）变化时整个缓存失效。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._seen = set()
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._parser_hash = _file_hash(ddt_util.__file__) + _file_hash(template_util.__file__)
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "rb") as f:
+                data = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"用例收集缓存 {self.path} 无法读取，将重新构建: {e}")
+            return
+        if data.get("version") != CACHE_VERSION or data.get("parser") != self._parser_hash:
+            logger.info("用例收集缓存版本或数据驱动逻辑已变化，将重新构建")
+            self._dirty = True
+            return
+        self.entries = data.get("entries", {})
+
+    def load_testcase(self, yaml_path):
+        """
+        获取 yaml 文件解析后的用例列表，与 read_testcase 的返回值一致。
+
+        :param yaml_path: yaml 文件路径
+        :return: 用例列表
+        """
+        key = os.path.abspath(yaml_path)
+        stat = os.stat(yaml_path)
+        with self._lock:
+            self._seen.add(key)
+            entry = self.entries.get(key)
+            # 数据驱动引用的 CSV/JSONL 文件修改后需要重新建立行索引
+            if entry is not None and not all(source.is_fresh() for source in ddt_util.data_sources(entry["cases"])):
+                entry = None
+            if entry is not None and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                self.hits += 1
+                return entry["cases"]
+        # mtime 或大小变化时再比较内容哈希，例如重新检出但内容未变的文件
+        content_hash = _file_hash(yaml_path)
+        if entry is not None and entry["hash"] == content_hash:
+            cases = entry["cases"]
+            self.hits += 1
+        else:
+            cases = ddt_util.read_testcase(yaml_path)
+            self.misses += 1
+        with self._lock:
+            self.entries[key] = {
+                "mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "hash": content_hash, "cases": cases,
+            }
+            self._dirty = True
+        return cases
+
+    def save(self):
+        """
+        写入缓存文件，同时移除本次没有收集到的（已删除的）文件。先写临时文件再替换，避免并行进程读到半个文件。
+        """
+        with self._lock:
+            stale = set(self.entries) - self._seen
+            for key in stale:
+                del self.entries[key]
+            if not self._dirty and not stale:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as f:
+                pickle.dump(
+                    {"version": CACHE_VERSION, "parser": self._parser_hash, "entries": self.entries},
+                    f, protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            os.replace(temp_path, self.path)
+            self._dirty = False
+        logger.info(f"用例收集缓存已写入: {self.path}，共 {len(self.entries)} 个文件")
+
+
+_cache = None
+
+
+def get_cache():
+    """
+    获取当前进程的用例收集缓存，首次调用时从 setting.collect_cache_file 加载。
+
+    :return: CollectCache 对象
+    """
+    global _cache
+    if _cache is None:
+        _cache = CollectCache(setting.collect_cache_file)
+    return _cache
+
+
+def load_testcase(yaml_path):
+    """
+    读取 yaml 用例。开启 setting.collect_cache 时使用收集缓存，否则直接解析。
+
+    :param yaml_path: yaml 文件路径
+    :return: 用例列表
+    """
+    if not setting.collect_cache:
+        return ddt_util.read_testcase(yaml_path)
+    try:
+        return get_cache().load_testcase(yaml_path)
+    except OSError as e:
+        logger.warning(f"使用用例收集缓存读取 {yaml_path} 失败，直接解析: {e}")
+        return ddt_util.read_testcase(yaml_path)
+
+
+def save_cache():
+    """
+    保存用例收集缓存，收集结束时调用。
+    """
+    if _cache is None:
+        return
+    try:
+        _cache.save()
+    except OSError as e:
+        logger.warning(f"写入用例收集缓存失败: {e}")
+
+
+def build(testcase_dir="testcases"):
+    """
+    扫描用例目录并构建收集缓存。
+
+    :param testcase_dir: 用例目录
+    :return: CollectCache 对象
+    """
+    start = time.perf_counter()
+    cache = get_cache()
+    for yaml_path in sorted(Path(testcase_dir).glob("**/*.yaml")):
+        cache.load_testcase(yaml_path)
+    cache.save()
+    print(
+        f"用例收集缓存构建完成: {len(cache.entries)} 个文件，复用 {cache.hits} 个，重新解析 {cache.misses} 个，"
+        f"耗时 {(time.perf_counter() - start) * 1000:.1f} ms，缓存文件: {cache.path}"
+    )
+    return cache
+
+
+if __name__ == "__main__":
+    build(sys.argv[1] if len(sys.argv) > 1 else "testcases")
@@ -0,0 +1,313 @@
+import heapq
+import itertools
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from config import setting
+from commons import timing_util
+from commons.lazy_util import lazy_import
+from commons.logs_util import logger
+
+# 只有用到数据库断言时才导入 pymysql
+pymysql = lazy_import("pymysql")
+
+
+class ConnectionPool:
+    """
+    数据库连接池。连接按需创建，最多 size 个，用完归还复用；
+    空闲超过 setting.db_pool_ping_interval 秒的连接在取出时先 ping 检查，断开则自动重连。
+    """
+
+    def __init__(self, db_config, size, timeout, ping_interval):
+        self.db_config = db_config
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _create(self):
+        logger.info("尝试建立数据库连接")
+        try:
+            connection = pymysql.connect(**self.db_config)
+            logger.info("数据库连接成功")
+            return connection
+        except pymysql.Error as e:
+            with self._lock:
+                self._created -= 1
+            error_msg = f"数据库连接失败: {e}"
+            logger.error(error_msg)
+            raise Exception(error_msg)
+
+    def acquire(self):
+        """
+        从连接池获取一个连接，池满时最多等待 timeout 秒。
+
+        :return: 数据库连接对象
+        """
+        try:
+            connection, last_used = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                return self._create()
+            try:
+                connection, last_used = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                error_msg = f"获取数据库连接超时，连接池大小: {self.size}"
+                logger.error(error_msg)
+                raise Exception(error_msg)
+        if time.monotonic() - last_used > self.ping_interval:
+            try:
+                connection.ping(reconnect=True)
+            except pymysql.Error as e:
+                logger.warning(f"数据库连接健康检查失败，重新建立连接: {e}")
+                self._discard(connection)
+                with self._lock:
+                    self._created += 1
+                return self._create()
+        return connection
+
+    def release(self, connection):
+        """
+        归还连接到连接池。
+
+        :param connection: 数据库连接对象
+        """
+        self._idle.put((connection, time.monotonic()))
+
+    def _discard(self, connection):
+        with self._lock:
+            self._created -= 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """
+        以上下文管理器的方式借用连接，出现数据库错误时丢弃该连接。
+        """
+        connection = self.acquire()
+        broken = False
+        try:
+            yield connection
+        except pymysql.Error:
+            broken = True
+            raise
+        finally:
+            if broken:
+                self._discard(connection)
+            else:
+                self.release(connection)
+
+    def close_all(self):
+        """
+        关闭连接池中的所有空闲连接。
+        """
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(connection)
+
+
+# 每个进程（每个 xdist worker）各自持有一个连接池
+_pools = {}
+_pools_lock = threading.Lock()
+
+# 用例内的查询缓存和当前用例批量预查询的结果（键为 SQL，值为 fetchall 结果），每个用例开始时清空。
+# 按线程保存，压测时多个虚拟用户并发执行用例，互不读取和清空对方的结果
+_case_local = threading.local()
+# SQL 执行统计：只保留耗时最长的 setting.timing_summary_size 条记录（小顶堆），其余只计入总数
+_query_slowest = []
+_query_totals = {"count": 0, "cached": 0, "total_ms": 0.0}
+_query_seq = itertools.count()
+_query_stats_lock = threading.Lock()
+
+
+def get_pool(multi_statements=False):
+    """
+    获取当前进程的数据库连接池，首次调用时根据 config/setting.py 创建。
+
+    :param multi_statements: 是否获取允许一次发送多条语句的连接池，只用于批量执行断言 SQL，普通查询使用的连接不开启该选项
+    :return: ConnectionPool 对象
+    """
+    key = (os.getpid(), multi_statements)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                db_config = {
+                    'user': setting.db_username,
+                    'password': setting.db_password,
+                    'host': setting.db_host,
+                    'database': setting.db_database,
+                    'port': setting.db_port,
+                    # 连接会被复用，自动提交保证每次查询都能读到最新数据
+                    'autocommit': True
+                }
+                if multi_statements:
+                    db_config['client_flag'] = pymysql.constants.CLIENT.MULTI_STATEMENTS
+                pool = ConnectionPool(db_config, setting.db_pool_size, setting.db_pool_timeout,
+                                      setting.db_pool_ping_interval)
+                _pools[key] = pool
+    return pool
+
+
+def close_pool():
+    """
+    关闭当前进程的数据库连接池。
+    """
+    pid = os.getpid()
+    for multi_statements in (False, True):
+        pool = _pools.pop((pid, multi_statements), None)
+        if pool is not None:
+            pool.close_all()
+
+
+def _case_state():
+    """
+    获取当前线程的用例内查询缓存和批量预查询结果。
+
+    :return: (查询缓存字典, 批量预查询结果字典)
+    """
+    state = getattr(_case_local, "state", None)
+    if state is None:
+        state = _case_local.state = ({}, {})
+    return state
+
+
+def clear_query_cache():
+    """
+    清空当前线程用例内的查询缓存和批量预查询结果，在每个用例开始时调用。
+    """
+    _case_local.state = ({}, {})
+
+
+def _record_query(sql, cost_ms, cached):
+    """
+    记录一次 SQL 执行，堆满时替换掉耗时最短的记录。
+    """
+    entry = (cost_ms, next(_query_seq), {"sql": sql, "ms": cost_ms, "cached": cached})
+    with _query_stats_lock:
+        _query_totals["count"] += 1
+        _query_totals["cached"] += cached
+        _query_totals["total_ms"] += cost_ms
+        if len(_query_slowest) < setting.timing_summary_size:
+            heapq.heappush(_query_slowest, entry)
+        elif entry[:2] > _query_slowest[0][:2]:
+            heapq.heapreplace(_query_slowest, entry)
+
+
+def _is_select(sql):
+    return sql.lstrip().lower().startswith("select")
+
+
+def execute(sql, fetch="one"):
+    """
+    使用连接池执行 SQL 语句。开启 setting.db_query_cache 时，同一用例内相同的 SELECT 只查询一次。
+
+    :param sql: SQL 语句
+    :param fetch: one 返回第一行，all 返回所有行
+    :return: 查询结果
+    """
+    query_cache, batch_results = _case_state()
+    if sql in batch_results:
+        rows = batch_results[sql]
+        logger.info(f"SQL 语句使用批量预查询结果: {sql}")
+        if fetch == "one":
+            return rows[0] if rows else None
+        return rows
+
+    cache_key = (sql, fetch)
+    cacheable = setting.db_query_cache and _is_select(sql)
+    if cacheable and cache_key in query_cache:
+        _record_query(sql, 0.0, True)
+        logger.info(f"SQL 语句命中查询缓存: {sql}")
+        return query_cache[cache_key]
+
+    logger.info(f"准备执行 SQL 语句: {sql}")
+    start = time.perf_counter()
+    try:
+        with get_pool().connection() as conn:
+            with conn.cursor() as cs:
+                cs.execute(sql)
+                result = cs.fetchone() if fetch == "one" else cs.fetchall()
+    except pymysql.Error as e:
+        error_msg = f"执行 SQL 语句失败: {sql}, 错误信息: {e}"
+        logger.error(error_msg)
+        raise Exception(error_msg)
+    cost_ms = round((time.perf_counter() - start) * 1000, 3)
+    timing_util.record("db", cost_ms)
+    _record_query(sql, cost_ms, False)
+    logger.info(f"SQL 语句执行成功，耗时 {cost_ms} ms，查询结果: {result}")
+    if cacheable:
+        query_cache[cache_key] = result
+    return result
+
+
+def execute_batch(sqls):
+    """
+    把一个用例 validate 中的所有 SELECT 合并为一次多语句请求，在一个往返内取回全部结果集，
+    结果保存在当前用例内，随后的 execute 直接使用。批量执行失败时回退为逐条执行。
+
+    :param sqls: SQL 语句列表
+    :return: 以 SQL 为键、fetchall 结果为值的字典
+    """
+    batch_results = _case_state()[1]
+    sqls = [sql for sql in dict.fromkeys(sqls) if _is_select(sql) and sql not in batch_results]
+    if not setting.db_batch_queries or len(sqls) < 2:
+        return {}
+    batch_sql = ";\n".join(sql.strip().rstrip(";") for sql in sqls)
+    logger.info(f"准备批量执行 {len(sqls)} 条 SQL 语句: {batch_sql}")
+    start = time.perf_counter()
+    results = {}
+    try:
+        with get_pool(multi_statements=True).connection() as conn:
+            with conn.cursor() as cs:
+                cs.execute(batch_sql)
+                results[sqls[0]] = cs.fetchall()
+                for sql in sqls[1:]:
+                    cs.nextset()
+                    results[sql] = cs.fetchall()
+    except pymysql.Error as e:
+        logger.warning(f"批量执行 SQL 语句失败，改为逐条执行: {e}")
+        return {}
+    cost_ms = round((time.perf_counter() - start) * 1000, 3)
+    timing_util.record("db", cost_ms)
+    _record_query(batch_sql, cost_ms, False)
+    logger.info(f"批量执行 SQL 语句成功，耗时 {cost_ms} ms")
+    batch_results.update(results)
+    return results
+
+
+def query_stats():
+    """
+    获取耗时最长的 SQL 执行记录，最多 setting.timing_summary_size 条，按耗时倒序排列。
+
+    :return: 耗时记录列表
+    """
+    with _query_stats_lock:
+        slowest = sorted(_query_slowest, reverse=True)
+    return [record for _, _, record in slowest]
+
+
+def query_totals():
+    """
+    获取 SQL 执行总数、命中缓存数和总耗时。
+
+    :return: 统计字典
+    """
+    with _query_stats_lock:
+        return dict(_query_totals, total_ms=round(_query_totals["total_ms"], 3))
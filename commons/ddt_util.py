@@ -1,5 +1,17 @@
+import csv
+import json
+import os
+import re
+from array import array
+
 import yaml
 from commons.logs_util import logger
+from commons.template_util import Placeholder, Template
+
+# 匹配数据驱动占位符 $ddt{name}
+DDT_PATTERN = re.compile(r"\$ddt\{(\w+)\}")
+# parametrize 引用外部数据文件时支持的格式
+DDT_FORMATS = ("csv", "jsonl")
 
 
 # 读取测试用例
@@ -28,7 +40,7 @@ def read_testcase(yaml_path):
                 case_dict = case_list[0]
                 if "parametrize" in case_dict:
                     logger.info(f"YAML 文件中有数据驱动用例，进行数据驱动处理: {yaml_path}")
-                    new_caseinfo = ddts(case_dict)
+                    new_caseinfo = ddts(case_dict, os.path.dirname(os.path.abspath(yaml_path)))
                     return new_caseinfo
                 logger.info(f"YAML 文件中只有一个非数据驱动用例，返回该用例: {yaml_path}")
                 return case_list
@@ -61,30 +73,220 @@ def is_valid_parametrize(data_list):
             return False
     return True
 
-def ddts(caseinfo: dict):
+def parse_ddt(match):
+    """
+    把 DDT_PATTERN 的匹配结果解析为 Placeholder 对象。
+
+    :param match: 正则匹配对象
+    :return: Placeholder 对象
+    """
+    return Placeholder(match.group(0), "ddt", match.group(1))
+
+
+def compile_ddt(caseinfo: dict):
+    """
+    把数据驱动用例编译为模板，每行数据直接代入结构的副本，不再经过 yaml 序列化和字符串替换。
+
+    :param caseinfo: 包含 'parametrize' 字段的测试用例字典
+    :return: Template 对象
+    """
+    case = {key: value for key, value in caseinfo.items() if key != "parametrize"}
+    return Template(case, pattern=DDT_PATTERN, parse=parse_ddt)
+
+
+def render_row(template: Template, row: dict):
+    """
+    用一行参数渲染数据驱动用例。整个值只有一个 $ddt{} 时保留参数的原始类型，没有对应参数的占位符保持原样。
+
+    :param template: compile_ddt 返回的模板
+    :param row: 参数名到参数值的字典
+    :return: 渲染后的用例字典
+    """
+    return template.render(lambda placeholder: row.get(placeholder.name, placeholder.raw))
+
+
+def ddts(caseinfo: dict, base_dir=None):
     """
     处理数据驱动用例，将参数化数据应用到测试用例中。
+    parametrize 为表格（第一行是参数名）时直接展开；为 {file: 路径} 时引用 CSV/JSONL 文件，
+    收集阶段只记录每行数据的文件偏移，执行时才读取该行并渲染，见 DdtSource。
 
     :param caseinfo: 包含 'parametrize' 字段的测试用例字典
-    :return: 处理后的测试用例列表
+    :param base_dir: yaml 文件所在目录，数据文件的相对路径相对于该目录
+    :return: 处理后的测试用例列表，引用数据文件时为 DdtCase 列表
     """
     data_list = caseinfo.get("parametrize")
+    if isinstance(data_list, dict):
+        source = DdtSource.from_spec(data_list, caseinfo, base_dir)
+        logger.info(f"数据驱动用例引用数据文件 {source.path}，共 {len(source)} 行")
+        return [DdtCase(source, index) for index in range(len(source))]
     if not is_valid_parametrize(data_list):
         error_msg = f"parametrize 字段不是有效的列表或参数长度不一致: {data_list}"
         logger.error(error_msg)
         return []
 
-    str_caseinfo = yaml.dump(caseinfo)
-    new_caseinfo = []
-    for x in range(1, len(data_list)):
-        raw_caseinfo = str_caseinfo
-        for y in range(len(data_list[0])):
-            param_value = data_list[x][y]
-            if isinstance(param_value, str) and param_value.isdigit():
-                param_value = f"'{param_value}'"
-            raw_caseinfo = raw_caseinfo.replace(f"$ddt{{{data_list[0][y]}}}", str(param_value))
-        case_dict = yaml.safe_load(raw_caseinfo)
-        case_dict.pop("parametrize", None)
-        new_caseinfo.append(case_dict)
+    template = compile_ddt(caseinfo)
+    names = data_list[0]
+    new_caseinfo = [render_row(template, dict(zip(names, values))) for values in data_list[1:]]
     logger.info("数据驱动用例处理完成")
-    return new_caseinfo
\ No newline at end of file
+    return new_caseinfo
+
+
+def _read_record(f):
+    """
+    从二进制文件的当前位置读取一条 CSV 记录，引号内的换行属于同一条记录。
+
+    :param f: 二进制文件对象
+    :return: 记录的字节串，文件结束时返回 b""
+    """
+    record = f.readline()
+    while record.count(b'"') % 2 == 1:
+        line = f.readline()
+        if not line:
+            break
+        record += line
+    return record
+
+
+class DdtSource:
+    """
+    数据驱动用例引用的 CSV/JSONL 文件。收集阶段扫描一遍文件，只保存每行数据的字节偏移，
+    执行时按偏移读取单行，10 万行的数据文件在收集阶段也只占用约 800KB 内存。
+    CSV 第一行为参数名，值均为字符串；JSONL 每行一个 JSON 对象，保留数字、布尔等类型。
+    """
+
+    def __init__(self, path, fmt, caseinfo):
+        if fmt not in DDT_FORMATS:
+            raise ValueError(f"不支持的数据文件格式 {fmt}，支持的格式有 {list(DDT_FORMATS)}")
+        self.path = path
+        self.format = fmt
+        self.caseinfo = {key: value for key, value in caseinfo.items() if key != "parametrize"}
+        self.columns = None
+        self.offsets = array("q")
+        stat = os.stat(path)
+        self.mtime_ns = stat.st_mtime_ns
+        self.size = stat.st_size
+        self._template = None
+        self._index()
+
+    @classmethod
+    def from_spec(cls, spec, caseinfo, base_dir=None):
+        """
+        根据 parametrize 中的文件引用创建数据源。
+
+        parametrize:
+          file: data/users.csv     # 相对于 yaml 文件所在目录
+          format: csv              # 可选，默认按扩展名判断
+
+        :param spec: parametrize 字段的值
+        :param caseinfo: 用例字典
+        :param base_dir: yaml 文件所在目录
+        :return: DdtSource 对象
+        """
+        path = spec.get("file")
+        if not path:
+            raise ValueError(f"parametrize 引用数据文件时必须配置 file: {spec}")
+        if base_dir and not os.path.isabs(path):
+            path = os.path.join(base_dir, path)
+        fmt = spec.get("format") or os.path.splitext(path)[1].lstrip(".").lower()
+        return cls(os.path.normpath(path), fmt, caseinfo)
+
+    def _index(self):
+        with open(self.path, "rb") as f:
+            if self.format == "csv":
+                header = _read_record(f)
+                self.columns = next(csv.reader([header.decode("utf-8-sig")]), [])
+            while True:
+                offset = f.tell()
+                record = _read_record(f) if self.format == "csv" else f.readline()
+                if not record:
+                    break
+                if record.strip():
+                    self.offsets.append(offset)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getstate__(self):
+        # 编译后的模板不写入收集缓存，使用时重新编译
+        state = self.__dict__.copy()
+        state["_template"] = None
+        return state
+
+    def is_fresh(self):
+        """
+        数据文件在建立索引之后是否没有被修改。
+
+        :return: 未修改返回 True
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return stat.st_mtime_ns == self.mtime_ns and stat.st_size == self.size
+
+    def row(self, index):
+        """
+        读取第 index 行数据。
+
+        :param index: 行号，从 0 开始，不含 CSV 表头
+        :return: 参数名到参数值的字典
+        """
+        with open(self.path, "rb") as f:
+            f.seek(self.offsets[index])
+            if self.format == "jsonl":
+                row = json.loads(f.readline())
+                if not isinstance(row, dict):
+                    raise ValueError(f"{self.path} 第 {index + 1} 行不是 JSON 对象")
+                return row
+            values = next(csv.reader([_read_record(f).decode("utf-8")]), [])
+        if len(values) != len(self.columns):
+            raise ValueError(f"{self.path} 第 {index + 1} 行数据的列数与表头不一致: {values}")
+        return dict(zip(self.columns, values))
+
+    def render(self, index):
+        """
+        读取第 index 行数据并渲染用例。
+
+        :param index: 行号
+        :return: 用例字典
+        """
+        if self._template is None:
+            self._template = compile_ddt(self.caseinfo)
+        return render_row(self._template, self.row(index))
+
+
+class DdtCase:
+    """
+    引用数据文件中某一行的数据驱动用例，作为 pytest 的参数只保存数据源和行号，执行时调用 load 得到用例字典。
+    """
+    __slots__ = ("source", "index")
+
+    def __init__(self, source: DdtSource, index: int):
+        self.source = source
+        self.index = index
+
+    def load(self):
+        """
+        读取该行数据并渲染用例。
+
+        :return: 用例字典
+        """
+        return self.source.render(self.index)
+
+    def __repr__(self):
+        return f"DdtCase({os.path.basename(self.source.path)}#{self.index + 1})"
+
+
+def data_sources(cases):
+    """
+    获取用例列表引用的数据文件。
+
+    :param cases: read_testcase 返回的用例列表
+    :return: DdtSource 列表
+    """
+    sources = {}
+    for case in cases:
+        if isinstance(case, DdtCase):
+            sources[id(case.source)] = case.source
+    return list(sources.values())
@@ -0,0 +1,109 @@
+import functools
+import re
+
+from commons.lazy_util import lazy_import
+from commons.logs_util import logger
+
+# 只有内置解析器不支持的表达式才回退到 jsonpath 库
+jsonpath = lazy_import("jsonpath")
+
+# 可走快速通道的 jsonpath 片段: .key  ..key  [0]  [*]  .*
+_TOKEN_PATTERN = re.compile(r"\.\.([\w-]+)|\.([\w-]+)|\[(\d+)\]|\[\*\]|\.\*")
+
+
+def _descend(node, key, out):
+    """
+    按 jsonpath 库相同的先序顺序递归查找 key，对应 $..key。
+    """
+    if isinstance(node, dict):
+        if key in node:
+            out.append(node[key])
+        for value in node.values():
+            _descend(value, key, out)
+    elif isinstance(node, list):
+        for value in node:
+            _descend(value, key, out)
+
+
+def _children(node):
+    if isinstance(node, dict):
+        return list(node.values())
+    if isinstance(node, list):
+        return list(node)
+    return []
+
+
+def _tokenize(expr):
+    """
+    把简单的 jsonpath 表达式拆分为步骤列表，含不支持的语法时返回 None。
+
+    :param expr: jsonpath 表达式，例如 $.data.list[0].id
+    :return: 步骤列表，例如 [("key", "data"), ("key", "list"), ("index", 0), ("key", "id")]
+    """
+    steps = []
+    pos = 1
+    while pos < len(expr):
+        match = _TOKEN_PATTERN.match(expr, pos)
+        if match is None:
+            return None
+        descendant, key, index = match.groups()
+        if descendant is not None:
+            steps.append(("descendant", descendant))
+        elif key is not None:
+            steps.append(("key", key))
+        elif index is not None:
+            steps.append(("index", int(index)))
+        else:
+            steps.append(("wildcard", None))
+        pos = match.end()
+    return steps or None
+
+
+def _walk(data, steps):
+    nodes = [data]
+    for kind, arg in steps:
+        matched = []
+        for node in nodes:
+            if kind == "key":
+                if isinstance(node, dict) and arg in node:
+                    matched.append(node[arg])
+            elif kind == "index":
+                if isinstance(node, list) and arg < len(node):
+                    matched.append(node[arg])
+                elif isinstance(node, dict) and str(arg) in node:
+                    matched.append(node[str(arg)])
+            elif kind == "descendant":
+                _descend(node, arg, matched)
+            else:
+                matched.extend(_children(node))
+        if not matched:
+            return []
+        nodes = matched
+    return nodes
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_jsonpath(expr):
+    """
+    编译 jsonpath 表达式并按表达式字符串缓存。
+    $.a.b[0]、$..key、$.a[*].b 等常见写法直接遍历字典求值，其余写法交给 jsonpath 库。
+
+    :param expr: jsonpath 表达式
+    :return: 求值函数，入参为数据，返回匹配结果列表，未匹配时返回空列表
+    """
+    steps = _tokenize(expr) if expr.startswith("$") else None
+    if steps is None:
+        logger.debug(f"jsonpath 表达式 {expr} 不支持快速求值，使用 jsonpath 库")
+        return lambda data: jsonpath.jsonpath(data, expr) or []
+    return lambda data: _walk(data, steps)
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_regex(expr):
+    """
+    编译正则表达式并按表达式字符串缓存。
+
+    :param expr: 正则表达式
+    :return: 求值函数，入参为文本，返回 findall 结果列表
+    """
+    return re.compile(expr).findall
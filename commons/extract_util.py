@@ -1,14 +1,13 @@
-import copy
-import re
-import jsonpath
-import yaml
-from colorama import Fore
-
+from commons.expr_util import compile_jsonpath, compile_regex
+from commons.hotload_util import get_registry
+from commons.template_util import get_template
 from commons.yaml_util import write_yaml, read_all
-from hotload.debug_talk import DebugTalk
 
+from commons.lazy_util import lazy_import
 from commons.logs_util import logger
 
+colorama = lazy_import("colorama")
+
 class ExtractUtil:
     """
     专门用来接口关联的类，负责解析提取变量和替换变量值。
@@ -20,26 +19,21 @@ class ExtractUtil:
         """
         从请求返回结果中提取数据并更新到 YAML 文件。
 
-        :param res: 请求返回的结果
+        :param res: 响应视图对象 ResponseView
         :param var_name: yaml 中的 key，例如: csrf_token
         :param attr_name: 请求返回结果中提取数据的属性名，例如: json, text
         :param expr: 提取数据的表达式，例如: jsonpath 表达式或者正则表达式
         :param index: 提取数据的下标
         """
         try:
-            # 深拷贝 res 内容到 new_res 对象
-            new_res = copy.deepcopy(res)
-            # 处理 JSON 数据
-            if hasattr(new_res, 'json'):
-                try:
-                    new_res.json = new_res.json()
-                except (AttributeError, ValueError) as e:
-                    self._log_error(f"响应数据不是有效的 JSON 格式: {e}")
-                    return
-
-            # 通过反射获取属性的值
-            data = self._get_attribute(new_res, attr_name)
+            # 通过反射获取属性的值，json 由响应视图统一解析并缓存；
+            # 正则表达式提取 json 时直接匹配原始响应文本，不再把字典转成字符串
+            if attr_name == "json" and not expr.startswith("$"):
+                attr_name = "text"
+            data = self._get_attribute(res, attr_name)
             if data is None:
+                if attr_name == "json":
+                    self._log_error("响应数据不是有效的 JSON 格式")
                 return
 
             # 判断提取方式并提取数据
@@ -64,7 +58,7 @@ class ExtractUtil:
         """
         try:
             data = getattr(obj, attr_name)
-            self._log_info(f"获取到的 {attr_name} 数据是--------> {data}")
+            self._log_info("获取到的 %s 数据是--------> %s", attr_name, data)
             return data
         except AttributeError as e:
             self._log_error(f"对象没有 {attr_name} 属性: {e}")
@@ -72,19 +66,21 @@ class ExtractUtil:
 
     def _extract_data(self, data, expr):
         """
-        根据表达式类型（jsonpath 或正则表达式）提取数据。
+        根据表达式类型（jsonpath 或正则表达式）提取数据，表达式编译结果按字符串缓存。
 
-        :param data: 提取的对象
+        :param data: 提取的对象，正则表达式提取时为文本
         :param expr: 提取的表达式
         :return: 提取的数据列表
         """
         try:
             if expr.startswith("$"):
-                lis = jsonpath.jsonpath(dict(data), expr)
-                self._log_info(f"以 jsonpath 来提取数据: {lis}")
+                if not isinstance(data, (dict, list)):
+                    data = dict(data)
+                lis = compile_jsonpath(expr)(data)
+                self._log_info("以 jsonpath 来提取数据: %s", lis)
             else:
-                lis = re.findall(expr, str(data))
-                self._log_info(f"使用正则表达式来提取数据: {lis}")
+                lis = compile_regex(expr)(data if isinstance(data, str) else str(data))
+                self._log_info("使用正则表达式来提取数据: %s", lis)
             return lis or []
         except Exception as e:
             self._log_error(f"使用 {expr.startswith('$') and 'jsonpath' or '正则表达式'} 提取数据时出错: {e}")
@@ -99,79 +95,53 @@ class ExtractUtil:
         """
         try:
             write_yaml({var_name: value})
-            self._log_info(f"成功更新 YAML 文件，{var_name} 的值为: {value}")
+            self._log_info("成功更新 YAML 文件，%s 的值为: %s", var_name, value)
         except Exception as e:
             self._log_error(f"更新 YAML 文件时出错: {e}")
 
-    def change(self, request_data: dict):
+    def change(self, request_data: dict, response=None):
         """
         解析使用变量，把 ${access_token} 替换从 extract.yaml 里面提取的具体的值。
+        request_data 在首次使用时编译为模板并缓存，之后直接在结构副本上代入值，
+        函数返回的 int、bool 等类型会原样保留。
 
         :param request_data: 请求数据字典
+        :param response: 替换 ${response.xxx} 时使用的响应对象，默认使用 self.response
         :return: 替换后的请求数据字典
         """
-        # 1. 把字典转为字符串
-        data_str = yaml.safe_dump(request_data)
-        # 2. 字符串替换
-        new_request_dat = self.hotload_replace(data_str)
-        # 3. 把字符串还原成字典
-        data_dict = yaml.safe_load(new_request_dat)
-        return data_dict
+        response = response if response is not None else self.response
+        return get_template(request_data).render(lambda placeholder: self._resolve(placeholder, response))
 
-    def hotload_replace(self, data_str: str):
+    def _resolve(self, placeholder, response):
         """
-        热加载方法，替换字符串中的函数调用表达式。
+        计算单个占位符的值，出错时保留原始表达式。
 
-        :param data_str: 待替换的字符串
-        :return: 替换后的字符串
+        :param placeholder: 编译得到的占位符
+        :param response: 响应对象
+        :return: 替换后的值
         """
-        # 定义正则表达式匹配函数调用表达式
-        regexp = r"\$\{(.*?)\((.*?)\)\}"
-        # 定义正则表达式匹配 response 对象属性引用
-        response_regexp = r"\$\{response\.(\w+)\}"
-
-        # 通过正则表达式在 data_str 字符串中匹配，得到所有的表达式列表
-        fun_list = re.findall(regexp, data_str)
-        response_list = re.findall(response_regexp, data_str)
-
-        for f in fun_list:
+        if placeholder.kind == "response":
             try:
-                if f[1] == "":  # 没有参数
-                    new_value = getattr(DebugTalk(), f[0])()
-                else:  # 有参数, 1 - N 个参数
-                    new_value = getattr(DebugTalk(), f[0])(*f[1].split(","))
-
-                # 如果 value 是一个数字格式的字符串
-                if isinstance(new_value, str) and new_value.isdigit():
-                    new_value = f"'{new_value}'"
-
-                # 拼接旧的值
-                old_value = f"${{{f[0]}({f[1]})}}"
-                # 把旧的表达式替换成函数返回的新的值
-                data_str = data_str.replace(old_value, str(new_value))
+                if response is not None and hasattr(response, placeholder.name):
+                    return getattr(response, placeholder.name)
+                self._log_error(f"响应对象没有 |{placeholder.name}| 属性或响应对象未设置")
             except Exception as e:
-                self._log_error(f"热加载替换时调用 {f[0]} 函数出错: {e}")
-
-        for attr in response_list:
-            try:
-                if self.response and hasattr(self.response, attr):
-                    new_value = getattr(self.response, attr)
-                    old_value = f"${{response.{attr}}}"
-                    data_str = data_str.replace(old_value, str(new_value))
-                else:
-                    self._log_error(f"响应对象没有 |{attr}| 属性或响应对象未设置")
-            except Exception as e:
-                self._log_error(f"替换 response 对象属性 |{attr}| 时出错: {e}")
-
-        return data_str
+                self._log_error(f"替换 response 对象属性 |{placeholder.name}| 时出错: {e}")
+            return placeholder.raw
+        try:
+            return get_registry().call(placeholder.name, placeholder.args)
+        except Exception as e:
+            self._log_error(f"热加载替换时调用 {placeholder.name} 函数出错: {e}")
+        return placeholder.raw
 
-    def _log_info(self, message):
+    def _log_info(self, message, *args):
         """
-        记录信息日志。
+        记录信息日志。参数在输出时才格式化，关闭输出时不会为大响应体拼接字符串。
 
-        :param message: 日志信息
+        :param message: 日志信息，可以包含 %s 占位
+        :param args: 占位参数
         """
-        # print(f"{Fore.GREEN}{message}{Fore.RESET}")
+        # print(f"{colorama.Fore.GREEN}{message % args}{colorama.Fore.RESET}")
 
     def _log_error(self, message):
         """
@@ -179,4 +149,4 @@ class ExtractUtil:
 
         :param message: 日志信息
         """
-        print(f"{Fore.RED}{message}{Fore.RESET}")
\ No newline at end of file
+        print(f"{colorama.Fore.RED}{message}{colorama.Fore.RESET}")
\ No newline at end of file
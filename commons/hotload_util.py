@@ -0,0 +1,130 @@
+import threading
+import time
+
+from config import setting
+from hotload.debug_talk import DebugTalk
+from commons.logs_util import logger
+
+# 是否记录易变函数（setting.cassette_volatile_functions）的返回值，录制/回放模式下开启
+_track_volatile = False
+# 当前线程尚未被请求取走的易变函数返回值
+_volatile = threading.local()
+
+
+class HotloadRegistry:
+    """
+    热加载函数注册表。
+    每个进程（每个 xdist worker）只创建一次 DebugTalk 实例，并把其公开方法解析为分发表，
+    同时统计每个函数的调用次数和耗时。
+    """
+
+    def __init__(self, talk_class=DebugTalk):
+        self.instance = talk_class()
+        self.functions = {}
+        for name in dir(talk_class):
+            # 按类属性判断，避免访问 property（例如延迟创建的 Faker 实例）时提前触发初始化
+            if name.startswith("_") or not callable(getattr(talk_class, name)):
+                continue
+            self.functions[name] = getattr(self.instance, name)
+        self._stats = {}
+        self._lock = threading.Lock()
+        logger.info(f"热加载函数注册完成，共 {len(self.functions)} 个函数: {sorted(self.functions)}")
+
+    def call(self, name, args=()):
+        """
+        调用注册表中的函数并记录耗时。
+
+        :param name: 函数名
+        :param args: 编译阶段拆分好的参数元组
+        :return: 函数返回值
+        """
+        func = self.functions.get(name)
+        if func is None:
+            raise AttributeError(f"DebugTalk 中不存在函数: {name}")
+        start = time.perf_counter()
+        try:
+            result = func(*args)
+            if _track_volatile and name in setting.cassette_volatile_functions:
+                _volatile_values().append(result)
+            return result
+        finally:
+            cost = time.perf_counter() - start
+            with self._lock:
+                stat = self._stats.setdefault(name, [0, 0.0, 0.0])
+                stat[0] += 1
+                stat[1] += cost
+                stat[2] = max(stat[2], cost)
+
+    def stats(self):
+        """
+        获取函数调用统计，按总耗时倒序排列。
+
+        :return: 统计信息列表，每项包含函数名、调用次数、总耗时、平均耗时和最大耗时（毫秒）
+        """
+        with self._lock:
+            items = [(name, *stat) for name, stat in self._stats.items()]
+        return [
+            {
+                "name": name,
+                "count": count,
+                "total_ms": round(total * 1000, 3),
+                "avg_ms": round(total * 1000 / count, 3),
+                "max_ms": round(peak * 1000, 3),
+            }
+            for name, count, total, peak in sorted(items, key=lambda item: item[2], reverse=True)
+        ]
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """
+    获取当前进程的热加载注册表，首次调用时创建。
+
+    :return: HotloadRegistry 对象
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = HotloadRegistry()
+    return _registry
+
+
+def registry_stats():
+    """
+    获取热加载函数调用统计，注册表未创建时返回空列表。
+
+    :return: 统计信息列表
+    """
+    return _registry.stats() if _registry is not None else []
+
+
+def track_volatile(enabled=True):
+    """
+    开启或关闭易变函数返回值的记录。
+
+    :param enabled: 是否开启
+    """
+    global _track_volatile
+    _track_volatile = enabled
+
+
+def _volatile_values():
+    values = getattr(_volatile, "values", None)
+    if values is None:
+        values = _volatile.values = []
+    return values
+
+
+def take_volatile_values():
+    """
+    取走当前线程记录的易变函数返回值，例如 random_name() 生成的姓名，用于在请求中屏蔽随机字段。
+
+    :return: 返回值列表
+    """
+    values = _volatile_values()
+    _volatile.values = []
+    return values
@@ -0,0 +1,233 @@
+"""
+@FileName: http2_util.py
+@Description: 可选的 HTTP/2 传输。作为 requests 的传输适配器挂载到 [http_pool:<别名>] 中配置了 http2 : true 的地址上，
+内部使用 httpx.Client(http2=True)，同一进程内配置相同的适配器共用一个连接池（httpx 传输），所有 RequestUtil
+（包括压测中每个虚拟用户各自的 Session）对同一主机的并发请求在一个连接上多路复用；返回标准的 requests.Response，
+send_all_request 之后的日志、提取、断言、流式读取和录制回放都不需要区分协议。
+https 地址通过 ALPN 协商，服务端不支持时自动回落到 HTTP/1.1；http 地址按 h2c（prior knowledge）直接使用 HTTP/2。
+需要安装 h2: pip install h2
+"""
+import logging
+import os
+import threading
+import time
+
+import httpx
+from requests.adapters import BaseAdapter
+from requests.cookies import extract_cookies_to_jar
+from requests.exceptions import ConnectionError, ConnectTimeout, ReadTimeout, RequestException
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from commons import pool_util, timing_util
+
+# 请求和响应已由 RequestUtil 记录，不再输出 httpx 自身的每个请求日志
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# HTTP/2 禁止的逐跳头部，发送前移除
+_HOP_BY_HOP_HEADERS = ("connection", "keep-alive", "proxy-connection", "transfer-encoding", "upgrade")
+
+
+class _Trace:
+    """
+    httpx 的 trace 回调，把新建连接的 connect、tls 耗时记录到当前用例步骤，并计入连接池统计。
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._started = {}
+
+    def __call__(self, event_name, info):
+        name, _, state = event_name.rpartition(".")
+        if name not in ("connection.connect_tcp", "connection.start_tls"):
+            return
+        if state == "started":
+            self._started[name] = time.perf_counter()
+        elif name in self._started:
+            cost_ms = (time.perf_counter() - self._started.pop(name)) * 1000
+            if name == "connection.connect_tcp":
+                timing_util.record("connect", cost_ms)
+                pool_util.record("connections", self.host, self.port)
+            else:
+                timing_util.record("tls", cost_ms)
+
+
+class _Headers:
+    """提供 requests 提取 Set-Cookie 时需要的 get_all 方法"""
+
+    def __init__(self, headers):
+        self._headers = headers
+
+    def get_all(self, name, default=None):
+        values = self._headers.get_list(name)
+        return values or default
+
+
+class _OriginalResponse:
+    def __init__(self, headers):
+        self.msg = _Headers(headers)
+
+
+class _RawResponse:
+    """
+    把 httpx 响应包装成 requests.Response.raw 需要的接口：按块读取响应体、关闭连接。
+    """
+
+    def __init__(self, response):
+        self._response = response
+        self._original_response = _OriginalResponse(response.headers)
+
+    def stream(self, amt=None, decode_content=True):
+        iterator = self._response.iter_bytes(amt) if decode_content else self._response.iter_raw(amt)
+        yield from iterator
+
+    def read(self, amt=None, decode_content=True):
+        return b"".join(self.stream(amt, decode_content))
+
+    def close(self):
+        self._response.close()
+
+    def release_conn(self):
+        self._response.close()
+
+
+def _to_timeout(timeout, config):
+    """
+    把 requests 风格的 timeout（数字或 (connect, read) 元组）转换为 httpx.Timeout，未配置时使用连接池配置。
+    """
+    if timeout is None:
+        connect, read = config["connect_timeout"], config["read_timeout"]
+    elif isinstance(timeout, tuple):
+        connect, read = timeout
+    else:
+        connect = read = timeout
+    return httpx.Timeout(connect=connect, read=read, write=read, pool=connect)
+
+
+# 按 (进程号, 连接池配置, verify, cert) 共享的 httpx 传输，同一主机的请求共用一个 HTTP/2 连接；
+# 进程号区分 fork 出的子进程，子进程不会复用父进程的连接
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+def _shared_transport(config, prior_knowledge, verify, cert):
+    """
+    获取当前进程中与配置对应的共享传输，不存在时创建。
+
+    :param config: 连接池配置
+    :param prior_knowledge: 是否按 h2c 直接使用 HTTP/2
+    :param verify: 证书校验参数
+    :param cert: 客户端证书参数
+    :return: httpx.HTTPTransport
+    """
+    key = (os.getpid(), prior_knowledge, config["retries"], config["pool_maxsize"], config["pool_block"], verify,
+           tuple(cert) if isinstance(cert, list) else cert)
+    transport = _transports.get(key)
+    if transport is None:
+        with _transports_lock:
+            transport = _transports.get(key)
+            if transport is None:
+                transport = httpx.HTTPTransport(
+                    verify=verify,
+                    cert=cert,
+                    http1=not prior_knowledge,
+                    http2=True,
+                    retries=config["retries"],
+                    limits=httpx.Limits(
+                        max_connections=config["pool_maxsize"] if config["pool_block"] else None,
+                        max_keepalive_connections=config["pool_maxsize"],
+                    ),
+                )
+                _transports[key] = transport
+    return transport
+
+
+def close_transports():
+    """
+    关闭当前进程中所有共享的 HTTP/2 连接，测试会话结束时调用。
+    """
+    with _transports_lock:
+        pid = os.getpid()
+        keys = [key for key in _transports if key[0] == pid]
+        transports = [_transports.pop(key) for key in keys]
+    for transport in transports:
+        transport.close()
+
+
+class HTTP2Adapter(BaseAdapter):
+    """
+    基于 httpx 的 HTTP/2 传输适配器。连接由同一进程内配置相同的适配器共享（见 _shared_transport），
+    每个适配器按 verify、cert 参数创建自己的 httpx.Client，Cookie 互不共享。
+    """
+
+    def __init__(self, config=None, prior_knowledge=False):
+        super().__init__()
+        self.pool_config = config or dict(pool_util.DEFAULTS)
+        self.prior_knowledge = prior_knowledge
+        self._clients = {}
+        self._lock = threading.Lock()
+        # 创建时检查 h2 是否已安装，未安装时由调用方回落到 HTTP/1.1
+        httpx.Client(http2=True).close()
+
+    def _get_client(self, verify, cert):
+        key = (verify, cert if not isinstance(cert, list) else tuple(cert))
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    transport = _shared_transport(self.pool_config, self.prior_knowledge, verify, cert)
+                    client = httpx.Client(transport=transport)
+                    self._clients[key] = client
+        return client
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        client = self._get_client(verify, cert)
+        url = httpx.URL(request.url)
+        port = url.port or (443 if url.scheme == "https" else 80)
+        pool_util.record("requests", url.host, port)
+        headers = [(key, value) for key, value in request.headers.items() if key.lower() not in _HOP_BY_HOP_HEADERS]
+        httpx_request = client.build_request(
+            request.method, request.url, headers=headers, content=request.body,
+            timeout=_to_timeout(timeout, self.pool_config),
+            extensions={"trace": _Trace(url.host, port)},
+        )
+        try:
+            raw = client.send(httpx_request, stream=True)
+        except httpx.ConnectTimeout as e:
+            raise ConnectTimeout(e, request=request)
+        except httpx.ReadTimeout as e:
+            raise ReadTimeout(e, request=request)
+        except (httpx.ConnectError, httpx.RemoteProtocolError) as e:
+            raise ConnectionError(e, request=request)
+        except httpx.HTTPError as e:
+            raise RequestException(e, request=request)
+        return self.build_response(request, raw)
+
+    def build_response(self, request, raw):
+        """
+        把 httpx 响应转换为 requests.Response，响应体由 Session 按 stream 参数决定是否立即读取，
+        elapsed 由 Session 在收到响应头后设置。
+
+        :param request: requests 的 PreparedRequest
+        :param raw: httpx 响应，尚未读取响应体
+        :return: requests.Response 对象
+        """
+        response = Response()
+        response.status_code = raw.status_code
+        response.headers = CaseInsensitiveDict(raw.headers.items())
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = _RawResponse(raw)
+        response.reason = raw.reason_phrase
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        extract_cookies_to_jar(response.cookies, request, response.raw)
+        return response
+
+    def close(self):
+        # 连接由其他适配器共享，这里只释放客户端，连接在 close_transports 中关闭
+        with self._lock:
+            self._clients = {}
@@ -0,0 +1,246 @@
+"""
+@FileName: incremental_util.py
+@Description: 增量运行（--incremental）。每个用例上次的运行结果按 yaml 文件指纹保存在 setting.incremental_history_file 中，
+指纹由 yaml 文件内容、hotload/debug_talk.py、当前环境（profile 和 base_url）以及数据驱动引用的数据文件计算。
+指纹未变且上次通过的用例不再执行，按通过处理并在 Allure 中标记为沿用上次结果；修改过的、新增的、上次失败的用例重新执行。
+用例通过 ${read_yaml(key)} 读取其他 yaml 文件提取的变量时，提取该变量的用例也会一起重新执行，保证变量是本次运行的值。
+"""
+import glob
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from config import setting
+from commons.base_url import get_base_url, get_profile
+from commons.logs_util import logger
+from commons.worker_util import is_worker, worker_file
+
+# 历史文件格式版本，结构变化时修改
+HISTORY_VERSION = 1
+
+# 用例中读取其他用例提取变量的写法，例如 ${read_yaml(token)}
+_READ_YAML_PATTERN = re.compile(r"read_yaml\(\s*['\"]?(\w+)")
+
+_DEBUG_TALK_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "hotload", "debug_talk.py")
+
+
+def _file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _steps(caseinfo):
+    """
+    获取参数化用例中的所有步骤：流程用例为列表，单接口用例为字典，引用数据文件的用例取其模板。
+    """
+    source = getattr(caseinfo, "source", None)
+    if source is not None:
+        return [source.caseinfo]
+    return caseinfo if isinstance(caseinfo, list) else [caseinfo]
+
+
+class CaseFile:
+    """
+    一个 yaml 文件的增量信息：指纹、读取的其他用例变量和提取的变量。
+    """
+
+    def __init__(self, yaml_path, caseinfo_list, environment):
+        self.path = str(yaml_path)
+        with open(yaml_path, "rb") as f:
+            content = f.read()
+        self.reads = set(_READ_YAML_PATTERN.findall(content.decode("utf-8", errors="replace")))
+        self.writes = set()
+        sources = {}
+        for caseinfo in caseinfo_list:
+            source = getattr(caseinfo, "source", None)
+            if source is not None:
+                sources[source.path] = f"{source.path}:{source.mtime_ns}:{source.size}"
+            for step in _steps(caseinfo):
+                if isinstance(step, dict) and isinstance(step.get("extract"), dict):
+                    self.writes.update(step["extract"])
+        digest = hashlib.sha1(content)
+        digest.update(environment.encode("utf-8"))
+        for key in sorted(sources):
+            digest.update(sources[key].encode("utf-8"))
+        self.fingerprint = digest.hexdigest()
+
+
+class RunHistory:
+    """
+    用例运行历史，键为 pytest 的 nodeid，值为指纹、结果和时间。并行运行时每个 worker 写入独立的文件，由主进程合并。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._updated = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"增量运行历史 {self.path} 无法读取，所有用例都会执行: {e}")
+            return
+        if data.get("version") == HISTORY_VERSION:
+            self.entries = data.get("entries", {})
+
+    def passed(self, nodeid, fingerprint):
+        entry = self.entries.get(nodeid)
+        return entry is not None and entry["fingerprint"] == fingerprint and entry["outcome"] == "passed"
+
+    def record(self, nodeid, fingerprint, outcome, duration):
+        entry = {"fingerprint": fingerprint, "outcome": outcome, "duration": round(duration, 3), "time": int(time.time())}
+        with self._lock:
+            self.entries[nodeid] = entry
+            self._updated[nodeid] = entry
+
+    def save(self):
+        """
+        写入本次运行的结果；并行运行时主进程在 worker 结束后把各 worker 的结果合并到主文件。
+        """
+        with self._lock:
+            updated = dict(self._updated)
+            self._updated.clear()
+        if is_worker():
+            if updated:
+                _write(worker_file(self.path), updated)
+            return
+        entries = dict(self.entries)
+        entries.update(updated)
+        files = sorted(glob.glob(_worker_pattern(self.path)))
+        for file in files:
+            try:
+                with open(file, encoding="utf-8") as f:
+                    entries.update(json.load(f).get("entries", {}))
+            except Exception as e:
+                logger.warning(f"读取 worker 的增量运行历史 {file} 失败: {e}")
+        if updated or files:
+            _write(self.path, entries)
+        for file in files:
+            os.remove(file)
+
+
+def _write(path, entries):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": HISTORY_VERSION, "entries": entries}, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def _worker_pattern(path):
+    root, ext = os.path.splitext(path)
+    return f"{root}_gw*{ext}"
+
+
+_history = None
+# 本次运行中每个用例的指纹，以及沿用上次结果的用例 nodeid
+_fingerprints = {}
+_cached = set()
+
+
+def configure(enabled):
+    """
+    开启或关闭增量运行，开启时读取运行历史。
+
+    :param enabled: 是否开启
+    """
+    global _history
+    _history = RunHistory(setting.incremental_history_file) if enabled else None
+    _fingerprints.clear()
+    _cached.clear()
+
+
+def is_enabled():
+    return _history is not None
+
+
+def environment_key():
+    """
+    当前环境的标识：hotload/debug_talk.py 的内容、环境 profile 和解析后的 base_url。
+    """
+    base_urls = json.dumps(get_base_url(), sort_keys=True)
+    return f"{_file_hash(_DEBUG_TALK_PATH)}|{get_profile()}|{base_urls}"
+
+
+def select(items):
+    """
+    计算本次需要执行的用例，其余指纹未变且上次通过的用例标记为沿用上次结果。
+    需要执行的用例读取的变量如果由其他 yaml 文件提取，这些文件中的用例也需要执行。
+
+    :param items: pytest 收集到的测试项，通过 function.yaml_path 关联 yaml 文件
+    :return: (需要执行的个数, 沿用上次结果的个数)
+    """
+    environment = environment_key()
+    files = {}
+    item_files = {}
+    for item in items:
+        yaml_path = getattr(getattr(item, "function", None), "yaml_path", None)
+        if yaml_path is None:
+            continue
+        if yaml_path not in files:
+            caseinfo_list = getattr(item.function, "caseinfo_list", [])
+            try:
+                files[yaml_path] = CaseFile(yaml_path, caseinfo_list, environment)
+            except OSError as e:
+                logger.warning(f"计算 {yaml_path} 的增量指纹失败，该文件的用例会执行: {e}")
+                continue
+        item_files[item.nodeid] = files[yaml_path]
+        _fingerprints[item.nodeid] = files[yaml_path].fingerprint
+
+    pending = {nodeid for nodeid, case_file in item_files.items() if not _history.passed(nodeid, case_file.fingerprint)}
+    # 需要执行的用例读取的变量，由提取该变量的用例一起执行，直到不再增加
+    providers = {}
+    for nodeid, case_file in item_files.items():
+        for key in case_file.writes:
+            providers.setdefault(key, set()).add(nodeid)
+    queue = list(pending)
+    while queue:
+        for key in item_files[queue.pop()].reads:
+            for nodeid in providers.get(key, ()):
+                if nodeid not in pending:
+                    pending.add(nodeid)
+                    queue.append(nodeid)
+
+    _cached.update(nodeid for nodeid in item_files if nodeid not in pending)
+    return len(item_files) - len(_cached), len(_cached)
+
+
+def is_cached(nodeid):
+    """
+    判断用例是否沿用上次通过的结果。
+    """
+    return nodeid in _cached
+
+
+def last_run(nodeid):
+    """
+    获取用例上次运行的记录。
+    """
+    return _history.entries.get(nodeid) if _history is not None else None
+
+
+def record(nodeid, outcome, duration):
+    """
+    记录用例本次的运行结果，沿用上次结果的用例不更新。
+
+    :param nodeid: pytest 的 nodeid
+    :param outcome: passed 或 failed
+    :param duration: 耗时（秒）
+    """
+    if _history is None or nodeid in _cached or nodeid not in _fingerprints:
+        return
+    _history.record(nodeid, _fingerprints[nodeid], outcome, duration)
+
+
+def save():
+    if _history is not None:
+        _history.save()
@@ -0,0 +1,39 @@
+import importlib
+import threading
+
+
+class LazyModule:
+    """
+    延迟导入的模块代理，第一次访问属性时才真正导入，之后直接转发。
+    用于 pymysql、jsonpath、colorama 等只在部分用例中用到的较重依赖，缩短框架的启动时间。
+    线程安全，压测模式下多个线程同时首次访问也只导入一次。
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "已导入" if self._module is not None else "未导入"
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def lazy_import(name):
+    """
+    创建延迟导入的模块代理。
+
+    :param name: 模块名，例如 pymysql、pymysql.constants
+    :return: LazyModule 对象
+    """
+    return LazyModule(name)
@@ -0,0 +1,283 @@
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from config import setting
+from commons import yaml_util
+from commons.logs_util import logger
+from commons.main_util import drop_thread_instances, stand_case_flow, use_thread_instances
+
+# 压测参数，由 conftest 根据命令行参数设置
+_options = {"users": 0, "rate": 0.0, "duration": 0.0}
+
+
+def configure(users=0, rate=0.0, duration=None):
+    """
+    设置压测参数。users 和 rate 都为 0 时不开启压测模式。
+
+    :param users: 虚拟用户数（闭环模型），每个虚拟用户循环执行用例
+    :param rate: 每秒发起的迭代数（开环模型），不等待上一次迭代完成
+    :param duration: 压测持续秒数
+    """
+    _options.update(users=users or 0, rate=rate or 0.0, duration=duration or setting.load_duration)
+
+
+def is_enabled():
+    """
+    是否开启了压测模式。
+
+    :return: 开启返回 True
+    """
+    return bool(_options["users"] or _options["rate"])
+
+
+class LatencyHistogram:
+    """
+    对数分桶的延迟直方图，每个桶的相对精度约为 5%，内存占用与样本数量无关。
+    """
+    _BASE = math.log(1.05)
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, ms):
+        index = int(math.log(max(ms, 0.01) / 0.01) / self._BASE)
+        with self._lock:
+            self.buckets[index] = self.buckets.get(index, 0) + 1
+            self.count += 1
+            self.total += ms
+            self.max = max(self.max, ms)
+
+    def _upper(self, index):
+        return 0.01 * math.exp((index + 1) * self._BASE)
+
+    def percentile(self, p):
+        """
+        获取百分位延迟（毫秒），取所在桶的上界，且不超过最大值。
+
+        :param p: 百分位，例如 99
+        :return: 延迟毫秒数
+        """
+        if not self.count:
+            return 0.0
+        target = math.ceil(self.count * p / 100)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= target:
+                return round(min(self._upper(index), self.max), 3)
+        return round(self.max, 3)
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": round(self.max, 3),
+            "buckets": [
+                {"le_ms": round(self._upper(index), 3), "count": self.buckets[index]} for index in sorted(self.buckets)
+            ],
+        }
+
+
+class LoadResult:
+    """
+    压测结果，汇总延迟直方图以及每秒的吞吐量、错误数和丢弃数时间序列。
+    """
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.start = time.monotonic()
+        self.errors = 0
+        self.dropped = 0
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _point(self):
+        return self._series.setdefault(int(time.monotonic() - self.start), [0, 0, 0])
+
+    def record(self, ms, ok):
+        self.histogram.record(ms)
+        with self._lock:
+            point = self._point()
+            point[0] += 1
+            if not ok:
+                point[1] += 1
+                self.errors += 1
+
+    def record_dropped(self):
+        """
+        记录一次因为没有空闲工作线程、无法按计划时间发起而丢弃的迭代（开环模型）。
+        """
+        with self._lock:
+            self._point()[2] += 1
+            self.dropped += 1
+
+    def to_dict(self, name, mode):
+        elapsed = time.monotonic() - self.start
+        count = self.histogram.count
+        return {
+            "name": name,
+            "mode": mode,
+            "duration_s": round(elapsed, 3),
+            "iterations": count,
+            "errors": self.errors,
+            "error_rate": round(self.errors / count, 4) if count else 0.0,
+            "dropped": self.dropped,
+            "throughput_per_s": round(count / elapsed, 3) if elapsed else 0.0,
+            "latency": self.histogram.summary(),
+            "timeseries": [
+                {"second": second, "iterations": total, "errors": errors,
+                 "error_rate": round(errors / total, 4) if total else 0.0, "dropped": dropped}
+                for second, (total, errors, dropped) in sorted(self._series.items())
+            ],
+        }
+
+
+def _run_iteration(case_objs, result, scheduled=None):
+    """
+    执行一次完整的用例（流程用例按顺序执行所有步骤），包含热加载替换、变量提取和断言。
+    开环模型下延迟从计划发起时间开始计算，避免协调遗漏。
+    """
+    start = scheduled if scheduled is not None else time.perf_counter()
+    ok = True
+    try:
+        for case_obj in case_objs:
+            if stand_case_flow(case_obj) is None:
+                ok = False
+                break
+    except (Exception, pytest.fail.Exception) as e:
+        logger.error(f"压测迭代执行失败: {e}")
+        ok = False
+    result.record((time.perf_counter() - start) * 1000, ok)
+
+
+def _closed_model(case_objs, result, users, deadline):
+    """
+    闭环模型：每个虚拟用户一个线程，使用独立的变量命名空间和 Session，循环执行用例直到压测结束。
+
+    :return: 创建的 Session 个数
+    """
+    def virtual_user():
+        yaml_util.use_thread_namespace()
+        use_thread_instances()
+        try:
+            while time.perf_counter() < deadline:
+                _run_iteration(case_objs, result)
+        finally:
+            drop_thread_instances()
+            yaml_util.drop_thread_namespace()
+
+    threads = [threading.Thread(target=virtual_user, name=f"vu-{i}") for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return users
+
+
+def _open_model(case_objs, result, rate, deadline):
+    """
+    开环模型：按固定速率发起迭代，每个工作线程使用独立的 Session，每次迭代使用独立的变量命名空间。
+    同时执行的迭代最多 setting.load_max_workers 个，到计划时间没有空闲工作线程的迭代记为丢弃，不排队等待，
+    压测在持续时间结束后只等待正在执行的迭代完成。
+
+    :return: 创建的 Session 个数
+    """
+    slots = threading.BoundedSemaphore(setting.load_max_workers)
+
+    def iteration(scheduled):
+        yaml_util.use_thread_namespace()
+        try:
+            _run_iteration(case_objs, result, scheduled)
+        finally:
+            yaml_util.drop_thread_namespace()
+            slots.release()
+
+    # 每个工作线程创建一次独立的 Session，同一线程内的迭代复用连接，压测结束后统一关闭
+    request_utils = []
+    lock = threading.Lock()
+
+    def init_worker():
+        request_util = use_thread_instances()
+        with lock:
+            request_utils.append(request_util)
+
+    interval = 1.0 / rate
+    with ThreadPoolExecutor(max_workers=setting.load_max_workers, initializer=init_worker) as executor:
+        scheduled = time.perf_counter()
+        while scheduled < deadline:
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if slots.acquire(blocking=False):
+                executor.submit(iteration, scheduled)
+            else:
+                result.record_dropped()
+            scheduled += interval
+    for request_util in request_utils:
+        request_util.session.close()
+    return len(request_utils)
+
+
+def run_load(case_objs, name):
+    """
+    以压测模式执行一个 yaml 文件中的用例，并输出 JSON 报告和 Allure 附件。
+
+    :param case_objs: 校验后的用例对象列表，流程用例包含多个步骤
+    :param name: 用例名称，用于报告文件名
+    :return: 压测结果字典
+    """
+    users, rate, duration = _options["users"], _options["rate"], _options["duration"]
+    mode = f"open(rate={rate}/s)" if rate else f"closed(users={users})"
+    logger.info(f"开始压测 {name}，模式: {mode}，持续 {duration} 秒")
+    result = LoadResult()
+    deadline = time.perf_counter() + duration
+    if rate:
+        sessions = _open_model(case_objs, result, rate, deadline)
+    else:
+        sessions = _closed_model(case_objs, result, users, deadline)
+
+    report = result.to_dict(name, mode)
+    # 闭环模型每个虚拟用户、开环模型每个工作线程使用独立的 Session（Cookie 和连接池互不共享）
+    report["sessions"] = {"scope": "worker_thread" if rate else "virtual_user", "count": sessions}
+    latency = report["latency"]
+    logger.info(
+        f"压测 {name} 完成: 迭代 {report['iterations']} 次，吞吐量 {report['throughput_per_s']}/s，"
+        f"错误率 {report['error_rate']}，丢弃 {report['dropped']} 次，p50 {latency['p50_ms']}ms，p95 {latency['p95_ms']}ms，"
+        f"p99 {latency['p99_ms']}ms，max {latency['max_ms']}ms"
+    )
+    _write_report(report, name)
+    if setting.load_max_error_rate is not None and report["error_rate"] > setting.load_max_error_rate:
+        pytest.fail(f"压测 {name} 错误率 {report['error_rate']} 超过阈值 {setting.load_max_error_rate}")
+    return report
+
+
+_report_seq = 0
+
+
+def _write_report(report, name):
+    global _report_seq
+    _report_seq += 1
+    content = json.dumps(report, ensure_ascii=False, indent=2)
+    os.makedirs(setting.load_report_dir, exist_ok=True)
+    path = os.path.join(setting.load_report_dir, f"{name}_{time.strftime('%Y%m%d%H%M%S')}_{_report_seq}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    logger.info(f"压测报告已写入: {path}")
+    try:
+        import allure
+        allure.attach(content, name=f"压测报告-{name}", attachment_type=allure.attachment_type.JSON)
+    except Exception as e:
+        logger.warning(f"添加 Allure 压测报告附件失败: {e}")
@@ -3,8 +3,202 @@
 @Auther: s1mple
 @Description: ...
 """
+import atexit
+import collections
 import logging
+import logging.handlers
+import queue
+import random
+import threading
+
+from config import setting
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s -- %(levelname)s -- %(filename)s -- %(message)s')
-logger = logging.getLogger(__name__)
\ No newline at end of file
+logger = logging.getLogger(__name__)
+
+
+class LogBody:
+    """
+    日志中的请求/响应体。只有日志真正输出时才转换为字符串，超过 setting.log_body_max_size 的部分被截断；
+    未被采样的请求只输出长度。full=True 时输出完整内容，用于失败用例。
+    """
+    __slots__ = ("value", "sampled", "full")
+
+    def __init__(self, value, sampled=True, full=False):
+        self.value = value
+        self.sampled = sampled
+        self.full = full
+
+    def __str__(self):
+        text = self.value if isinstance(self.value, str) else str(self.value)
+        if self.full:
+            return text
+        if not self.sampled:
+            _volume.add_sampled_out(len(text))
+            return f"<未采样，共 {len(text)} 字符>"
+        limit = setting.log_body_max_size
+        if limit and len(text) > limit:
+            _volume.add_truncated(len(text) - limit)
+            return f"{text[:limit]}...<已截断，共 {len(text)} 字符>"
+        return text
+
+
+def sample_body():
+    """
+    按 setting.log_body_sample_rate 决定本次请求的请求体和响应体是否输出到日志。
+
+    :return: 输出返回 True
+    """
+    rate = setting.log_body_sample_rate
+    return rate >= 1 or random.random() < rate
+
+
+class _LogVolume:
+    """
+    日志量统计：按级别和来源文件统计条数和字符数，以及截断、未采样节省的字符数。
+    """
+
+    def __init__(self):
+        self.records = collections.Counter()
+        self.chars = collections.Counter()
+        self.by_file = collections.Counter()
+        self.truncated = 0
+        self.truncated_chars = 0
+        self.sampled_out = 0
+        self.sampled_out_chars = 0
+        self._lock = threading.Lock()
+
+    def add_record(self, record, size):
+        with self._lock:
+            self.records[record.levelname] += 1
+            self.chars[record.levelname] += size
+            self.by_file[record.filename] += size
+
+    def add_truncated(self, chars):
+        with self._lock:
+            self.truncated += 1
+            self.truncated_chars += chars
+
+    def add_sampled_out(self, chars):
+        with self._lock:
+            self.sampled_out += 1
+            self.sampled_out_chars += chars
+
+    def report(self, top=10):
+        with self._lock:
+            return {
+                "records": sum(self.records.values()),
+                "chars": sum(self.chars.values()),
+                "by_level": {level: [self.records[level], self.chars[level]] for level in self.records},
+                "top_files": self.by_file.most_common(top),
+                "truncated": [self.truncated, self.truncated_chars],
+                "sampled_out": [self.sampled_out, self.sampled_out_chars],
+            }
+
+
+_volume = _LogVolume()
+
+
+def log_volume():
+    """
+    获取本次运行的日志量统计。
+
+    :return: 统计字典
+    """
+    return _volume.report()
+
+
+class _RootForwarder(logging.Handler):
+    """
+    在后台线程中把日志记录交给根日志器的处理器（控制台、pytest 的 log_file 等），并统计日志量。
+    """
+
+    def emit(self, record):
+        root = logging.getLogger()
+        if root.isEnabledFor(record.levelno):
+            # 只格式化一次，根日志器的多个处理器共用结果
+            record.msg = record.getMessage()
+            record.args = None
+            _volume.add_record(record, len(record.msg))
+            root.handle(record)
+
+
+class _QueueFilter(logging.Filter):
+    """
+    日志器上的过滤器：把日志记录放入队列后返回 False，调用方不再同步写控制台和文件。
+    入队时不格式化消息，字符串拼接和请求体截断都在后台线程中完成。
+    日志器保持向上传递，pytest 不会把它当作独立日志器再挂一份 log_file 处理器，避免重复写入。
+    """
+
+    def filter(self, record):
+        _queue.put_nowait(record)
+        return False
+
+
+_queue = queue.Queue(-1)
+_listener = None
+
+
+def _start_pipeline():
+    """
+    开启后台日志写入：框架日志先进入队列，调用方只做级别判断和入队。
+    """
+    global _listener
+    _listener = logging.handlers.QueueListener(_queue, _RootForwarder())
+    _listener.start()
+    logger.addFilter(_QueueFilter())
+    atexit.register(flush)
+
+
+def flush():
+    """
+    等待队列中的日志全部写出，例如在每个测试结束、会话结束时调用。
+    """
+    if _listener is not None:
+        _queue.join()
+
+
+# 失败时输出完整内容的请求/响应体，每个线程只保留最近的若干个
+_bodies = threading.local()
+
+
+def remember_body(label, value):
+    """
+    记录完整的请求/响应体（只保存引用），用例失败时再完整输出。
+
+    :param label: 说明，例如 响应数据
+    :param value: 请求/响应体
+    """
+    if not setting.log_failure_bodies:
+        return
+    bodies = getattr(_bodies, "items", None)
+    if bodies is None:
+        bodies = _bodies.items = collections.deque(maxlen=setting.log_failure_bodies)
+    bodies.append((label, value))
+
+
+def clear_bodies():
+    """
+    清空当前线程记录的请求/响应体，在每个测试开始时调用。
+    """
+    bodies = getattr(_bodies, "items", None)
+    if bodies is not None:
+        bodies.clear()
+
+
+def dump_bodies():
+    """
+    用例失败时输出当前线程记录的完整请求/响应体。
+
+    :return: (说明, 完整内容) 列表
+    """
+    bodies = list(getattr(_bodies, "items", None) or ())
+    for label, value in bodies:
+        logger.error("用例失败，完整%s: %s", label, LogBody(value, full=True))
+    clear_bodies()
+    return [(label, str(LogBody(value, full=True))) for label, value in bodies]
+
+
+if setting.log_async:
+    _start_pipeline()
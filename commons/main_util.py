@@ -1,16 +1,96 @@
+import importlib
 import logging
-from commons.assert_util import AssertUtil
-from commons.extract_util import ExtractUtil
+import threading
+from typing import TYPE_CHECKING
+from commons import cache_util, db_util, stream_util, timing_util
+from commons.async_runner import pop_prefetched
 from commons.model_util import verify_yaml, CaseInfo
-from commons.requests_util import RequestUtil
 from commons.logs_util import logger
 
+if TYPE_CHECKING:
+    from commons.assert_util import AssertUtil
+    from commons.extract_util import ExtractUtil
+    from commons.requests_util import RequestUtil
+
+
+# 工具类实例在第一次使用时创建，导入 main_util 时不加载 requests、pytest 等依赖
+# 仍然可以通过 from commons.main_util import extract_util 的方式获取
+_INSTANCE_CLASSES = {
+    "extract_util": ("commons.extract_util", "ExtractUtil"),
+    "request_util": ("commons.requests_util", "RequestUtil"),
+    "assert_util": ("commons.assert_util", "AssertUtil"),
+}
+_instances = {}
+_instances_lock = threading.Lock()
+# 压测时每个虚拟用户线程使用独立的实例，各自持有 Session、Cookie 和连接池
+_local = threading.local()
+_THREAD_INSTANCE_NAMES = ("extract_util", "request_util")
+# 当前线程正在执行的测试中是否有步骤失败：请求失败或执行出错的步骤只记录日志，测试本身不会失败，
+# 增量运行和失败时输出完整请求/响应体需要根据该标记判断
+_case_state = threading.local()
+
+
+def _instance(name):
+    thread_instances = getattr(_local, "instances", None)
+    if thread_instances is not None and name in thread_instances:
+        return thread_instances[name]
+    instance = _instances.get(name)
+    if instance is None:
+        with _instances_lock:
+            instance = _instances.get(name)
+            if instance is None:
+                module_name, class_name = _INSTANCE_CLASSES[name]
+                instance = getattr(importlib.import_module(module_name), class_name)()
+                _instances[name] = instance
+    return instance
+
+
+def use_thread_instances():
+    """
+    为当前线程创建独立的 RequestUtil 和 ExtractUtil，之后当前线程的请求使用自己的 Session，不与其他线程共享 Cookie 和连接。
+
+    :return: 当前线程的 RequestUtil 对象
+    """
+    instances = {}
+    for name in _THREAD_INSTANCE_NAMES:
+        module_name, class_name = _INSTANCE_CLASSES[name]
+        instances[name] = getattr(importlib.import_module(module_name), class_name)()
+    _local.instances = instances
+    return instances["request_util"]
+
+
+def drop_thread_instances():
+    """
+    关闭当前线程的 Session，恢复使用共享的实例。
+    """
+    instances = getattr(_local, "instances", None) or {}
+    _local.instances = None
+    request_util = instances.get("request_util")
+    if request_util is not None:
+        request_util.session.close()
+
+
+def begin_case():
+    """
+    清除当前线程的步骤失败标记，每个测试开始前调用。
+    """
+    _case_state.failed = False
 
 
-# 初始化工具类实例
-extract_util = ExtractUtil()
-request_util = RequestUtil()
-assert_util = AssertUtil()
+def case_failed():
+    """
+    当前线程正在执行的测试中是否有步骤失败。
+
+    :return: 有步骤失败返回 True
+    """
+    return getattr(_case_state, "failed", False)
+
+
+def __getattr__(name):
+    if name in _INSTANCE_CLASSES:
+        return _instance(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def stand_case_flow(case_obj: CaseInfo):
     """
@@ -18,30 +98,44 @@ def stand_case_flow(case_obj: CaseInfo):
 
     :param case_obj: 用例信息对象，包含模块、接口、用例标题、请求信息、提取信息和断言信息等。
     """
+    # 记录本步骤各阶段的耗时
+    timing_util.start_step(case_obj.title)
     try:
         # 记录用例基本信息日志
         log_case_info(case_obj)
+        # 查询缓存只在单个用例内有效
+        db_util.clear_query_cache()
 
         # 校验 yaml 中的数据
         # 如果后续需要使用该功能，取消注释
         # case_obj = verify_yaml(case_obj)
 
-        # 使用提取的值，把 {} 替换成具体的值
-        new_request = extract_util.change(case_obj.request)
+        # 独立的单接口用例可能已经在会话开始时并发发送过
+        response = pop_prefetched(case_obj.request)
+        if response is not None:
+            timing_util.record_many(response.timings)
+        else:
+            # 使用提取的值，把 {} 替换成具体的值
+            with timing_util.span("render"):
+                new_request = _instance("extract_util").change(case_obj.request)
 
-        # 发送请求
-        response = send_request(new_request, request_util)
+            # 发送请求，配置了 stream 的用例流式读取响应体，配置了 cache 的用例优先使用缓存的响应
+            response = send_request(new_request, _instance("request_util"), stream_util.parse_options(case_obj.stream),
+                                    cache_util.parse_ttl(case_obj.cache))
         if response is None:
             logger.error(f"请求 {case_obj.title} 失败，无法继续执行后续操作。")
+            _case_state.failed = True
             return None
 
         # 请求之后得到响应后去提取变量
         if case_obj.extract:
-            extract_variables(response, case_obj.extract, extract_util)
+            with timing_util.span("extract"):
+                extract_variables(response, case_obj.extract, _instance("extract_util"))
 
         # 请求得到响应后，如果 validate 不为 None，则需要断言
         if case_obj.validate:
-            perform_assertions(response, case_obj.validate, extract_util, assert_util)
+            with timing_util.span("assert"):
+                perform_assertions(response, case_obj.validate, _instance("extract_util"), _instance("assert_util"))
         else:
             logger.info(f"用例 {case_obj.title} 未配置显式断言，将执行默认的 HTTP 状态码为 200 的断言检查。")
             # 检查 HTTP 响应状态码是否为 200
@@ -52,12 +146,19 @@ def stand_case_flow(case_obj: CaseInfo):
 
         return response
 
+    except AssertionError:
+        # 断言失败让测试失败，不在这里吞掉
+        _case_state.failed = True
+        raise
     except ValueError as e:
         logger.error(f"执行用例 {case_obj.title} 时发生值错误: {e}")
     except AttributeError as e:
         logger.error(f"执行用例 {case_obj.title} 时发生属性错误: {e}")
     except Exception as e:
         logger.error(f"执行用例 {case_obj.title} 时发生未知错误: {e}")
+    finally:
+        timing_util.finish_step()
+    _case_state.failed = True
     return None
 
 def log_case_info(case_obj: CaseInfo):
@@ -72,18 +173,20 @@ def log_case_info(case_obj: CaseInfo):
         f"用例: {case_obj.title}"
     )
 
-def send_request(new_request: dict, request_util: RequestUtil):
+def send_request(new_request: dict, request_util: "RequestUtil", stream_options=None, cache_ttl=None):
     """
     发送请求并记录响应信息。
 
     :param new_request: 处理后的请求信息
     :param request_util: 请求工具类实例
+    :param stream_options: 流式读取配置，None 表示一次性读取响应体
+    :param cache_ttl: 响应缓存有效期（秒），None 表示不使用缓存
     :return: 请求响应对象
     """
-    response = request_util.send_all_request(**new_request)
+    response = request_util.send_all_request(stream_options, cache_ttl, **new_request)
     return response
 
-def extract_variables(response, extract_info: dict, extract_util: ExtractUtil):
+def extract_variables(response, extract_info: dict, extract_util: "ExtractUtil"):
     """
     从响应中提取变量。
 
@@ -94,7 +197,7 @@ def extract_variables(response, extract_info: dict, extract_util: ExtractUtil):
     for key, value in extract_info.items():
         extract_util.extract(response, key, *value)
 
-def perform_assertions(response, validate_info: dict, extract_util: ExtractUtil, assert_util: AssertUtil):
+def perform_assertions(response, validate_info: dict, extract_util: "ExtractUtil", assert_util: "AssertUtil"):
     """
     执行断言操作。
 
@@ -103,5 +206,8 @@ def perform_assertions(response, validate_info: dict, extract_util: ExtractUtil,
     :param extract_util: 提取工具类实例
     :param assert_util: 断言工具类实例
     """
-    for assert_type, value in extract_util.change(validate_info).items():
+    validate = extract_util.change(validate_info, response)
+    # 数据库断言的 SQL 合并为一次往返预先查询
+    assert_util.prepare_db_assertions(validate)
+    for assert_type, value in validate.items():
         assert_util.assert_all_case(response, assert_type, value)
\ No newline at end of file
@@ -1,6 +1,9 @@
 from dataclasses import dataclass
 from typing import Optional
+from commons.async_runner import PREFETCH_METHODS
+from commons.cache_util import CACHEABLE_METHODS, parse_ttl
 from commons.logs_util import logger
+from commons.stream_util import BODY_ASSERT_TYPES, parse_options
 
 @dataclass
 class CaseInfo:
@@ -13,6 +16,12 @@ class CaseInfo:
     # 选填
     extract: Optional[dict] = None
     parametrize: Optional[list] = None
+    # 流式读取响应体：true 或配置字典，见 stream_util.parse_options
+    stream: Optional[dict] = None
+    # 本次运行内缓存响应的有效期：true 或 300s、5m 等，只对 GET/HEAD 请求生效，见 cache_util.parse_ttl
+    cache: Optional[str] = None
+    # 开启 --async-run 时是否在会话开始时提前并发发送，只用于不依赖登录状态和其他用例的 GET/HEAD 请求
+    prefetch: Optional[bool] = None
 
 def validate_extract(extract, yaml_name):
     """
@@ -30,7 +39,7 @@ def validate_validate(validate, yaml_name):
     校验 validate 字段
     """
     if validate:
-        valid_assert_types = ['equals', 'contains', 'db_equals', 'db_contains']
+        valid_assert_types = ['equals', 'contains', 'db_equals', 'db_contains', 'db_rows_equals'] + BODY_ASSERT_TYPES
         for assert_type, values in validate.items():
             if assert_type not in valid_assert_types:
                 error_msg = f"{yaml_name}.yaml测试用例不符合框架的规范！'validate' 字段中的断言类型 '{assert_type}' 必须是 {valid_assert_types} 之一。"
@@ -42,6 +51,59 @@ def validate_validate(validate, yaml_name):
                     logger.error(error_msg)
                     raise ValueError(error_msg)
 
+def validate_stream(stream, validate, yaml_name):
+    """
+    校验 stream 字段，以及 body 断言是否开启了流式读取
+    """
+    try:
+        parse_options(stream)
+    except (TypeError, ValueError) as e:
+        error_msg = f"{yaml_name}.yaml测试用例不符合框架的规范！'stream' 字段有误: {e}"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    if not stream and validate and any(assert_type in BODY_ASSERT_TYPES for assert_type in validate):
+        error_msg = f"{yaml_name}.yaml测试用例不符合框架的规范！断言类型 {BODY_ASSERT_TYPES} 需要开启 'stream' 字段。"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+
+def validate_cache(cache, request, stream, yaml_name):
+    """
+    校验 cache 字段：有效期格式正确，请求方法为 GET/HEAD，且没有同时开启 stream
+    """
+    if cache is None or cache is False:
+        return
+    try:
+        parse_ttl(cache)
+    except (TypeError, ValueError) as e:
+        error_msg = f"{yaml_name}.yaml测试用例不符合框架的规范！'cache' 字段有误: {e}"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    method = str(request.get("method", "")).upper() if isinstance(request, dict) else ""
+    if method not in CACHEABLE_METHODS:
+        error_msg = f"{yaml_name}.yaml测试用例不符合框架的规范！'cache' 只能用于 {list(CACHEABLE_METHODS)} 请求，当前为 '{method}'。"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    if stream:
+        error_msg = f"{yaml_name}.yaml测试用例不符合框架的规范！'cache' 和 'stream' 不能同时开启。"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+
+def validate_prefetch(prefetch, request, stream, cache, yaml_name):
+    """
+    校验 prefetch 字段：只能用于 GET/HEAD 请求，且不能与 stream、cache 同时开启
+    """
+    if not prefetch:
+        return
+    method = str(request.get("method", "")).upper() if isinstance(request, dict) else ""
+    if method not in PREFETCH_METHODS:
+        error_msg = f"{yaml_name}.yaml测试用例不符合框架的规范！'prefetch' 只能用于 {list(PREFETCH_METHODS)} 请求，当前为 '{method}'。"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    if stream or cache:
+        error_msg = f"{yaml_name}.yaml测试用例不符合框架的规范！'prefetch' 不能与 'stream' 或 'cache' 同时开启。"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+
 def verify_yaml(caseinfo: dict, yaml_name):
     try:
         new_caseinfo = CaseInfo(**caseinfo)
@@ -49,6 +111,12 @@ def verify_yaml(caseinfo: dict, yaml_name):
         validate_extract(new_caseinfo.extract, yaml_name)
         # 校验 validate 字段
         validate_validate(new_caseinfo.validate, yaml_name)
+        # 校验 stream 字段
+        validate_stream(new_caseinfo.stream, new_caseinfo.validate, yaml_name)
+        # 校验 cache 字段
+        validate_cache(new_caseinfo.cache, new_caseinfo.request, new_caseinfo.stream, yaml_name)
+        # 校验 prefetch 字段
+        validate_prefetch(new_caseinfo.prefetch, new_caseinfo.request, new_caseinfo.stream, new_caseinfo.cache, yaml_name)
         return new_caseinfo
     except ValueError as e:
         # 处理校验失败的异常
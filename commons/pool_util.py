@@ -0,0 +1,174 @@
+"""
+@FileName: pool_util.py
+@Description: 按主机配置 HTTP 连接池、keep-alive、超时和重试策略，并统计连接复用情况。
+配置写在 pytest.ini 中 [base_url] 旁边，[http_pool] 为所有主机的默认值，[http_pool:<别名>] 覆盖 [base_url] 中同名地址的配置：
+
+[http_pool]
+pool_maxsize : 20
+[http_pool:8kqw]
+pool_maxsize : 50
+pool_block : true
+keep_alive : true
+connect_timeout : 5
+read_timeout : 30
+retries : 3
+backoff_factor : 0.5
+retry_statuses : 502, 503, 504
+http2 : false
+"""
+import threading
+
+from urllib3.util.retry import Retry
+
+from config import setting
+from commons.base_url import get_base_url, read_ini
+from commons.logs_util import logger
+
+# 未配置时的默认值，与 requests.adapters.HTTPAdapter 一致，不重试、不设超时
+DEFAULTS = {
+    "pool_connections": 10,
+    "pool_maxsize": 10,
+    "pool_block": False,
+    "keep_alive": True,
+    "connect_timeout": None,
+    "read_timeout": None,
+    "retries": 0,
+    "backoff_factor": 0.0,
+    "retry_statuses": [502, 503, 504],
+    "http2": False,
+}
+
+_TRUE_VALUES = ("1", "true", "yes", "on")
+
+
+def _convert(key, value):
+    default = DEFAULTS[key]
+    text = str(value).strip()
+    if key == "retry_statuses":
+        return [int(item) for item in text.split(",") if item.strip()]
+    if isinstance(default, bool):
+        return text.lower() in _TRUE_VALUES
+    if key.endswith("_timeout"):
+        return float(text) if text.lower() not in ("", "none") else None
+    if isinstance(default, float):
+        return float(text)
+    return int(text)
+
+
+def parse_config(values, base=None):
+    """
+    解析一个 [http_pool] 配置节，未配置的项使用 base 中的值。
+
+    :param values: 配置项字典，值为字符串
+    :param base: 默认配置，默认为 DEFAULTS
+    :return: 配置字典
+    """
+    config = dict(base or DEFAULTS)
+    for key, value in values.items():
+        if key not in DEFAULTS:
+            logger.warning("未知的连接池配置项 %s，可用的配置项有 %s", key, list(DEFAULTS))
+            continue
+        try:
+            config[key] = _convert(key, value)
+        except ValueError:
+            logger.warning("连接池配置项 %s 的值 %s 无效，使用默认值 %s", key, value, config[key])
+    return config
+
+
+def load_configs(config_file_path=None):
+    """
+    读取 pytest.ini 中的连接池配置。
+
+    :param config_file_path: 配置文件路径，默认为 setting.base_url_config
+    :return: (默认配置, {base_url 地址: 配置})
+    """
+    config_file_path = config_file_path or setting.base_url_config
+    default = parse_config(read_ini(config_file_path, "http_pool"))
+    by_prefix = {}
+    for alias, url in get_base_url().items():
+        values = read_ini(config_file_path, f"http_pool:{alias}")
+        if values:
+            by_prefix[url.rstrip("/")] = parse_config(values, default)
+    return default, by_prefix
+
+
+def config_for(url, default, by_prefix):
+    """
+    按最长前缀匹配地址对应的连接池配置，与 requests 挂载适配器时的选择规则一致。
+
+    :param url: 请求地址
+    :param default: 默认配置
+    :param by_prefix: {base_url 地址: 配置}，load_configs 的返回值
+    :return: (配置, 匹配到的地址)，没有匹配时返回 (默认配置, None)
+    """
+    matches = [prefix for prefix in by_prefix if str(url).lower().startswith(prefix.lower())]
+    if not matches:
+        return default, None
+    prefix = max(matches, key=len)
+    return by_prefix[prefix], prefix
+
+
+def build_retry(config):
+    """
+    根据配置创建重试策略。只有幂等方法（GET、HEAD、PUT、DELETE、OPTIONS、TRACE）会在读取失败或
+    返回 retry_statuses 中的状态码时重试；连接建立失败时请求尚未发出，所有方法都会重试。
+
+    :param config: 配置字典
+    :return: urllib3 Retry 对象，不重试时返回 0
+    """
+    if not config["retries"]:
+        return 0
+    return CountingRetry(
+        total=config["retries"],
+        backoff_factor=config["backoff_factor"],
+        status_forcelist=config["retry_statuses"],
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        raise_on_status=False,
+        respect_retry_after_header=True,
+    )
+
+
+class CountingRetry(Retry):
+    """每次重试时记录到连接池统计中"""
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        new_retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        # 重试次数用尽时 super().increment 抛出异常，不计入
+        if _pool is not None:
+            record("retries", _pool.host, _pool.port)
+        return new_retry
+
+
+# 按主机统计请求数、新建连接数、重试次数和因连接池已满被丢弃的连接数
+_stats = {}
+_stats_lock = threading.Lock()
+_COUNTERS = ("requests", "connections", "retries", "discarded")
+
+
+def record(counter, host, port):
+    """
+    累加某个主机的统计计数。
+
+    :param counter: requests / connections / retries / discarded
+    :param host: 主机名
+    :param port: 端口
+    """
+    key = f"{host}:{port}"
+    with _stats_lock:
+        stats = _stats.get(key)
+        if stats is None:
+            stats = _stats[key] = dict.fromkeys(_COUNTERS, 0)
+        stats[counter] += 1
+
+
+def pool_stats():
+    """
+    获取连接池统计，复用率为复用已有连接的请求占比。
+
+    :return: 按请求数倒序的统计列表
+    """
+    with _stats_lock:
+        items = [dict(stats, host=key) for key, stats in _stats.items()]
+    for item in items:
+        item["reuse_ratio"] = round(max(item["requests"] - item["connections"], 0) / item["requests"], 3) if item["requests"] else 0.0
+    return sorted(items, key=lambda item: item["requests"], reverse=True)
@@ -0,0 +1,291 @@
+"""
+@FileName: rate_util.py
+@Description: 按主机的令牌桶限流。配置写在 pytest.ini 中 [base_url] 旁边，[rate_limit] 为所有主机的默认值，
+[rate_limit:<别名>] 覆盖 [base_url] 中同名地址的配置：
+
+[rate_limit:8kqw]
+rate : 20                              # 每秒请求数，整个运行的总速率，并行运行时按 worker 数均分；0 表示不限流
+burst : 5                              # 令牌桶容量，允许的突发请求数
+adaptive : true                        # 自适应：被限流时降速，之后逐步恢复
+min_rate : 1                           # 自适应降速的下限
+backoff : 0.5                          # 被限流时速率乘以该系数
+ramp_step : 1                          # 每秒没有被限流时速率增加的值，最多恢复到 rate
+throttle_statuses : 429                # 视为被限流的 HTTP 状态码
+throttle_json : $.status = 40004       # 视为被限流的 JSON 字段值（jsonpath = 值）
+throttle_message : 操作过于频繁         # 响应文本包含该内容时视为被限流
+throttle_retries : 1                   # 被限流的请求等待后重新发送的次数
+
+同一进程内的线程和异步任务共用一个令牌桶；多个 worker 之间不通信，各自使用均分后的速率并各自调整。
+"""
+import asyncio
+import threading
+import time
+
+from config import setting
+from commons.base_url import get_base_url, read_ini
+from commons.expr_util import compile_jsonpath
+from commons.logs_util import logger
+from commons.worker_util import get_worker_count
+
+# 未配置时的默认值，不限流
+DEFAULTS = {
+    "rate": 0.0,
+    "burst": 1,
+    "adaptive": False,
+    "min_rate": 1.0,
+    "backoff": 0.5,
+    "ramp_step": 1.0,
+    "throttle_statuses": [429],
+    "throttle_json": None,
+    "throttle_message": None,
+    "throttle_retries": 0,
+}
+
+_TRUE_VALUES = ("1", "true", "yes", "on")
+# 两次降速之间的最短间隔（秒），同一时间发出的多个请求同时被限流时只降速一次
+_BACKOFF_INTERVAL = 1.0
+
+
+def _convert(key, value):
+    default = DEFAULTS[key]
+    text = str(value).strip()
+    if key == "throttle_statuses":
+        return [int(item) for item in text.split(",") if item.strip()]
+    if key in ("throttle_json", "throttle_message"):
+        return text or None
+    if isinstance(default, bool):
+        return text.lower() in _TRUE_VALUES
+    if isinstance(default, float):
+        return float(text)
+    return int(text)
+
+
+def parse_config(values, base=None):
+    """
+    解析一个 [rate_limit] 配置节，未配置的项使用 base 中的值。
+
+    :param values: 配置项字典，值为字符串
+    :param base: 默认配置，默认为 DEFAULTS
+    :return: 配置字典
+    """
+    config = dict(base or DEFAULTS)
+    for key, value in values.items():
+        if key not in DEFAULTS:
+            logger.warning(f"未知的限流配置项 {key}，可用的配置项有 {list(DEFAULTS)}")
+            continue
+        try:
+            config[key] = _convert(key, value)
+        except ValueError:
+            logger.warning(f"限流配置项 {key} 的值 {value} 无效，使用默认值 {config[key]}")
+    return config
+
+
+def _parse_json_signature(text):
+    """
+    解析 throttle_json 配置，例如 "$.status = 40004"。
+
+    :param text: 配置值
+    :return: (求值函数, 期望值字符串)，未配置时返回 None
+    """
+    if not text:
+        return None
+    expr, sep, expected = text.partition("=")
+    if not sep or not expr.strip():
+        logger.warning(f"限流配置 throttle_json 的值 {text} 无效，格式为: $.status = 40004")
+        return None
+    return compile_jsonpath(expr.strip()), expected.strip()
+
+
+class RateLimiter:
+    """
+    一个主机的令牌桶，线程安全。按 GCRA 记录下一个令牌的理论发放时间，acquire 预约一个令牌并返回需要等待的时间，
+    同步和异步调用方各自等待，不在持有锁时休眠。
+    """
+
+    def __init__(self, name, config, worker_count=1):
+        self.name = name
+        self.config = config
+        self.worker_count = max(worker_count, 1)
+        self.max_rate = config["rate"] / self.worker_count
+        self.min_rate = min(config["min_rate"] / self.worker_count, self.max_rate)
+        self.rate = self.max_rate
+        self.burst = max(config["burst"], 1)
+        self._json_signature = _parse_json_signature(config["throttle_json"])
+        # 下一个令牌的理论发放时间，比当前时间早 burst 个间隔以上时桶是满的
+        self._tat = time.monotonic()
+        self._last_backoff = self._last_ramp = self._tat
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "waited": 0, "wait_ms": 0.0, "throttled": 0, "lowest_rate": self.rate}
+
+    def reserve(self):
+        """
+        预约一个令牌，桶中还有令牌时不等待，否则等待到理论发放时间。
+
+        :return: 需要等待的秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            interval = 1.0 / self.rate
+            tat = max(self._tat, now)
+            wait = max(tat - (self.burst - 1) * interval - now, 0.0)
+            self._tat = tat + interval
+            self._stats["requests"] += 1
+            if wait > 0:
+                self._stats["waited"] += 1
+                self._stats["wait_ms"] += wait * 1000
+            return wait
+
+    def acquire(self):
+        """
+        同步等待一个令牌。
+
+        :return: 等待的秒数
+        """
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self):
+        """
+        异步等待一个令牌，不阻塞事件循环中的其他请求。
+
+        :return: 等待的秒数
+        """
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def is_throttled(self, response):
+        """
+        判断响应是否表示被限流：状态码在 throttle_statuses 中、JSON 字段等于 throttle_json 中的值，
+        或响应文本包含 throttle_message。流式读取的响应只检查状态码。
+
+        :param response: 响应视图对象
+        :return: 被限流返回 True
+        """
+        if response.status_code in self.config["throttle_statuses"]:
+            return True
+        if response.body is not None:
+            return False
+        if self._json_signature is not None and response.json is not None:
+            evaluate, expected = self._json_signature
+            if any(str(value) == expected for value in evaluate(response.json)):
+                return True
+        message = self.config["throttle_message"]
+        return bool(message) and message in response.text
+
+    def observe(self, response):
+        """
+        根据响应调整速率：被限流时按 backoff 降速，并按 Retry-After 暂停发放令牌；
+        自适应模式下未被限流时每秒增加 ramp_step，最多恢复到配置的速率。
+
+        :param response: 响应视图对象
+        :return: 被限流返回 True
+        """
+        throttled = self.is_throttled(response)
+        with self._lock:
+            now = time.monotonic()
+            if throttled:
+                self._stats["throttled"] += 1
+                retry_after = _retry_after(response)
+                if retry_after:
+                    # Retry-After 之内不再发放令牌，同时被限流的多个请求不会叠加暂停时间
+                    self._tat = max(self._tat, now + retry_after + (self.burst - 1) / self.rate)
+                if self.config["adaptive"] and now - self._last_backoff >= _BACKOFF_INTERVAL:
+                    self.rate = max(self.min_rate, self.rate * self.config["backoff"])
+                    self._last_backoff = self._last_ramp = now
+                    self._stats["lowest_rate"] = min(self._stats["lowest_rate"], self.rate)
+                    logger.warning("%s 触发限流，速率降为 %.2f 次/秒", self.name, self.rate)
+            elif self.config["adaptive"] and self.rate < self.max_rate and now - self._last_ramp >= 1.0:
+                self.rate = min(self.max_rate, self.rate + self.config["ramp_step"] / self.worker_count)
+                self._last_ramp = now
+        return throttled
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, name=self.name, rate=round(self.rate, 2), max_rate=round(self.max_rate, 2),
+                        wait_ms=round(self._stats["wait_ms"], 1), lowest_rate=round(self._stats["lowest_rate"], 2))
+
+
+def _retry_after(response):
+    value = response.headers.get("Retry-After")
+    if not value:
+        return 0.0
+    try:
+        return min(float(value), setting.rate_limit_max_retry_after)
+    except ValueError:
+        return 0.0
+
+
+# 限流配置在第一次使用时读取，键为 [base_url] 中的地址；未匹配任何地址的请求按主机使用 [rate_limit] 的默认配置
+_configs = None
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _load_configs():
+    default = parse_config(read_ini(setting.base_url_config, "rate_limit"))
+    by_prefix = {}
+    for alias, url in get_base_url().items():
+        values = read_ini(setting.base_url_config, f"rate_limit:{alias}")
+        if values:
+            by_prefix[url.rstrip("/")] = parse_config(values, default)
+    # 最长的地址优先匹配
+    return default, sorted(by_prefix.items(), key=lambda item: len(item[0]), reverse=True)
+
+
+def get_limiter(url):
+    """
+    获取请求地址对应的限流器。
+
+    :param url: 请求地址
+    :return: RateLimiter 对象，未配置限流时返回 None
+    """
+    global _configs
+    if _configs is None:
+        with _limiters_lock:
+            if _configs is None:
+                _configs = _load_configs()
+    default, by_prefix = _configs
+    url = str(url or "")
+    name, config = None, default
+    for prefix, prefix_config in by_prefix:
+        if url.startswith(prefix):
+            name, config = prefix, prefix_config
+            break
+    if config["rate"] <= 0:
+        return None
+    if name is None:
+        # 按 scheme://host:port 区分主机
+        scheme, _, rest = url.partition("://")
+        name = f"{scheme}://{rest.split('/', 1)[0]}"
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                limiter = _limiters[name] = RateLimiter(name, config, get_worker_count())
+    return limiter
+
+
+def reset():
+    """
+    清空限流器和已读取的配置，修改 pytest.ini 或切换环境后重新读取。
+    """
+    global _configs
+    with _limiters_lock:
+        _configs = None
+        _limiters.clear()
+
+
+def rate_stats():
+    """
+    获取各主机的限流统计。
+
+    :return: 按请求数倒序的统计列表
+    """
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return sorted((limiter.stats() for limiter in limiters), key=lambda item: item["requests"], reverse=True)
@@ -1,14 +1,139 @@
 import logging
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util import parse_url
 from config import setting
 
-from commons.logs_util import logger
+from commons import cache_util, cassette_util, hotload_util, pool_util, rate_util, stream_util, timing_util, upload_util
+from commons import logs_util
+from commons.logs_util import LogBody, logger
+from commons.response_util import ResponseView
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    """建立 TCP 连接时记录 connect 阶段耗时，并计入连接池统计的新建连接数"""
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            timing_util.record("connect", (time.perf_counter() - start) * 1000)
+            pool_util.record("connections", self.host, self.port)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    """建立 HTTPS 连接时分别记录 connect（TCP）和 tls（握手）阶段耗时，并计入连接池统计的新建连接数"""
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            timing_util.record("connect", (time.perf_counter() - start) * 1000)
+            pool_util.record("connections", self.host, self.port)
+
+    def connect(self):
+        connect_before = timing_util.phase_ms("connect")
+        start = time.perf_counter()
+        super().connect()
+        connect_ms = timing_util.phase_ms("connect") - connect_before
+        timing_util.record("tls", (time.perf_counter() - start) * 1000 - connect_ms)
+
+
+class _PoolStatsMixin:
+    """连接池已满时归还的连接会被关闭丢弃，计入连接池统计"""
+
+    def _put_conn(self, conn):
+        if conn is not None and self.pool is not None and self.pool.full():
+            pool_util.record("discarded", self.host, self.port)
+        super()._put_conn(conn)
+
+
+class _TimedHTTPConnectionPool(_PoolStatsMixin, HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(_PoolStatsMixin, HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    使用带计时连接的适配器，只有新建连接时才会记录 connect 和 tls，复用的连接不产生这两个阶段。
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+class PooledHTTPAdapter(TimedHTTPAdapter):
+    """
+    按 pytest.ini 中 [http_pool] 配置连接池大小、keep-alive、超时和重试策略的适配器。
+    用例中显式配置了 timeout 时以用例为准。
+    """
+
+    def __init__(self, config=None):
+        self.pool_config = config or dict(pool_util.DEFAULTS)
+        super().__init__(
+            pool_connections=self.pool_config["pool_connections"],
+            pool_maxsize=self.pool_config["pool_maxsize"],
+            max_retries=pool_util.build_retry(self.pool_config),
+            pool_block=self.pool_config["pool_block"],
+        )
+
+    def add_headers(self, request, **kwargs):
+        if not self.pool_config["keep_alive"]:
+            request.headers["Connection"] = "close"
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if timeout is None and (self.pool_config["connect_timeout"] or self.pool_config["read_timeout"]):
+            timeout = (self.pool_config["connect_timeout"], self.pool_config["read_timeout"])
+        url = parse_url(request.url)
+        pool_util.record("requests", url.host, url.port or (443 if url.scheme == "https" else 80))
+        return super().send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
 
 
 class RequestUtil:
     def __init__(self):
         # 创建一个会话对象，确保所有请求使用同一个会话
         self.session = requests.Session()
+        self._mount_adapters()
+
+    def _mount_adapters(self):
+        """
+        挂载连接池适配器：[http_pool] 作为所有主机的默认配置，[http_pool:<别名>] 挂载到 [base_url] 中对应的地址上，
+        requests 按最长前缀匹配选择适配器；配置了 http2 : true 的地址使用 HTTP/2 适配器
+        """
+        default, by_prefix = pool_util.load_configs()
+        adapter = self._build_adapter(default)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        for prefix, config in by_prefix.items():
+            self.session.mount(prefix, self._build_adapter(config, prefix))
+
+    def _build_adapter(self, config, prefix=None):
+        """
+        根据连接池配置创建适配器。HTTP/2 依赖 h2，未安装时回落到 HTTP/1.1
+        :param config: 连接池配置
+        :param prefix: 挂载的地址，http:// 开头的地址按 h2c 直接使用 HTTP/2
+        :return: 传输适配器
+        """
+        if config["http2"]:
+            try:
+                from commons.http2_util import HTTP2Adapter
+                return HTTP2Adapter(config, prior_knowledge=bool(prefix) and prefix.lower().startswith("http://"))
+            except ImportError as e:
+                logger.error("%s 开启了 http2，但无法加载 HTTP/2 依赖，使用 HTTP/1.1: %s", prefix or "默认配置", e)
+        return PooledHTTPAdapter(config)
 
     def _update_params(self, kwargs):
         """
@@ -19,81 +144,135 @@ class RequestUtil:
         params = kwargs.get("params", {})
         params.update(setting.global_args)
         kwargs["params"] = params
-        logger.info(f"请求params: {params}")
+        logger.info("请求params: %s", params)
         return kwargs
 
     def _open_files(self, kwargs):
         """
-        打开文件，处理文件上传请求
+        打开文件，处理文件上传请求。files 中的字段可以是文件路径，也可以是包含 path 或 size（生成指定大小的内容）的字典，
+        上传内容与 data 中的表单字段一起编码为流式 multipart 请求体，按块读取发送；请求中配置 chunked: true 时使用分块传输编码
         :param kwargs: 请求参数
         :return: 更新后的请求参数及文件对象列表
         """
-        file_objects = []
-        if "files" in kwargs:
-            new_files = {}
-            for file_key, file_value in kwargs["files"].items():
-                try:
-                    file_obj = open(file_value, "rb")
-                    new_files[file_key] = file_obj
-                    file_objects.append(file_obj)
-                    logger.info(f"请求files - {file_key}: {file_value}")
-                except Exception as e:
-                    logger.error(f"文件路径有误! 错误信息: {e}")
-                    # 关闭已打开的文件
-                    for obj in file_objects:
-                        obj.close()
-                    return kwargs, []
-            kwargs["files"] = new_files
-        return kwargs, file_objects
+        chunked = kwargs.pop("chunked", setting.upload_chunked)
+        if "files" not in kwargs:
+            return kwargs, []
+        try:
+            parts = upload_util.open_parts(kwargs["files"])
+        except Exception as e:
+            logger.error("文件路径有误! 错误信息: %s", e)
+            return kwargs, []
+        for part in parts:
+            logger.info("请求files - %s: %s（%s 字节）", part.name, part.source, part.size)
+        try:
+            return self._encode_files(kwargs, parts, chunked), parts
+        except ValueError as e:
+            logger.error("上传文件参数有误! 错误信息: %s", e)
+            for part in parts:
+                part.close()
+            return kwargs, []
 
-    def _log_request_info(self, kwargs):
+    def _encode_files(self, kwargs, parts, chunked):
         """
-        记录除 params 和 files 之外的其他请求信息
+        把上传内容和表单字段编码为流式 multipart 请求体，不再由 requests 在内存中拼接整个请求体
         :param kwargs: 请求参数
+        :param parts: 上传内容列表
+        :param chunked: 是否使用分块传输编码
+        :return: 更新后的请求参数
         """
-        for key, value in kwargs.items():
-            if key not in ["params", "files"]:
-                logger.info(f"请求{key}: {value}")
+        fields = kwargs.get("data")
+        if fields is not None and not isinstance(fields, dict):
+            raise ValueError("上传文件时 data 必须是表单字段字典")
+        encoder = upload_util.MultipartEncoder(fields, parts)
+        kwargs = dict(kwargs)
+        kwargs.pop("files")
+        # 生成器没有长度，requests 会使用 Transfer-Encoding: chunked 发送
+        kwargs["data"] = iter(encoder) if chunked else encoder
+        headers = {key: value for key, value in (kwargs.get("headers") or {}).items() if key.lower() != "content-type"}
+        headers["Content-Type"] = encoder.content_type
+        kwargs["headers"] = headers
+        return kwargs
 
-    def _log_response_info(self, response):
+    def _log_request_info(self, kwargs, sampled=True):
         """
-        记录响应信息，包括状态码、JSON 数据或文本数据
-        :param response: 请求响应对象
+        记录除 params 和 files 之外的其他请求信息，请求体在日志输出时才格式化，超长部分截断
+        :param kwargs: 请求参数
+        :param sampled: 本次请求的请求体是否被采样输出
         """
-        logger.info(f"响应状态码: {response.status_code}")
-        try:
-            json_data = response.json()
-            logger.info(f"JSON数据是{json_data}")
-        except ValueError:
-            logger.info(f"响应数据不是JSON格式，响应文本: {response.text}")
+        for key, value in kwargs.items():
+            if key == "data" and not isinstance(value, (str, bytes, dict, list, tuple)):
+                # 流式 multipart 请求体，文件信息已在打开文件时记录
+                logger.info("请求%s: <流式请求体>", key)
+            elif key in ("data", "json"):
+                logs_util.remember_body(f"请求{key}", value)
+                logger.info("请求%s: %s", key, LogBody(value, sampled))
+            elif key not in ["params", "files"]:
+                logger.info("请求%s: %s", key, value)
 
-        content_type = response.headers.get("Content-Type", "")
-        if "json" in content_type.lower():
-            try:
-                logger.info(f"响应数据: {response.json()}")
-            except ValueError:
-                logger.info(f"响应数据不是有效的JSON格式，响应文本: {response.text}")
-        else:
-            logger.info(f"响应数据: {response.text}")
+    def _log_response_info(self, response, sampled=True):
+        """
+        记录响应信息，包括状态码和响应文本；响应文本在日志输出时才截断，不会为了日志解析 JSON。
+        流式读取的响应只记录大小、哈希和类型
+        :param response: 响应视图对象
+        :param sampled: 本次请求的响应体是否被采样输出
+        """
+        logger.info("响应状态码: %s", response.status_code)
+        if response.body is not None:
+            logger.info("响应数据: %s", response.body)
+            return
+        logs_util.remember_body("响应数据", response.text)
+        logger.info("响应数据: %s", LogBody(response.text, sampled))
 
-    def send_all_request(self, **kwargs):
+    def send_all_request(self, stream_options=None, cache_ttl=None, **kwargs):
         """
         发送所有类型的请求
+        :param stream_options: 流式读取配置（stream_util.parse_options 的返回值），None 表示一次性读取响应体
+        :param cache_ttl: 响应缓存有效期（秒，cache_util.parse_ttl 的返回值），None 表示不使用缓存
         :param kwargs: 请求参数
-        :return: 请求响应对象
+        :return: 响应视图对象 ResponseView，请求失败时返回 None
         """
         # 更新请求参数
         kwargs = self._update_params(kwargs)
+        # 按采样比例决定本次请求的请求体和响应体是否输出到日志
+        sampled = logs_util.sample_body()
+        # 配置了 cache 的 GET/HEAD 请求先查本次运行的响应缓存，有效期内直接返回，过期后发送条件请求
+        cache, cache_key, cache_entry, response = self._lookup_cache(kwargs, stream_options, cache_ttl,
+                                                                    self.session.cookies)
+        if response is not None:
+            with timing_util.span("log"):
+                self._log_response_info(response, sampled)
+            return response
+        # 录制/回放模式下，已录制的请求直接从磁带返回，不访问网络；流式读取的响应没有保留响应体，不录制
+        cassette = cassette_util.get_cassette() if stream_options is None else None
+        if stream_options is not None:
+            kwargs["stream"] = True
+        if cassette is not None:
+            key, normalized = cassette_util.request_key(kwargs, hotload_util.take_volatile_values())
+            if cassette.replaying:
+                recorded = cassette.play(key)
+                if recorded is not None:
+                    response = ResponseView(recorded)
+                    logger.info("请求从磁带回放: %s %s", normalized["method"], normalized["url"])
+                    with timing_util.span("log"):
+                        self._log_response_info(response, sampled)
+                    return response
+                if not cassette.recording:
+                    logger.error("磁带中没有录制该请求: %s", LogBody(normalized))
+                    return None
         # 打开文件
         kwargs, file_objects = self._open_files(kwargs)
         # 记录其他请求信息
-        self._log_request_info(kwargs)
+        with timing_util.span("log"):
+            self._log_request_info(kwargs, sampled)
 
         try:
-            # 发送请求
-            response = self.session.request(**kwargs)
+            # 按主机限流发送请求，响应只包装一次，后续日志、提取、断言共用
+            response, throttled = self._send_limited(kwargs, stream_options, retry=not file_objects)
+            # 被限流的响应不写入缓存
+            if cache is not None and not throttled:
+                response = self._update_cache(cache, cache_key, cache_entry, response, cache_ttl)
         except requests.RequestException as e:
-            logger.error(f"请求发生错误: {e}")
+            logger.error("请求发生错误: %s", e)
             response = None
         finally:
             # 关闭文件
@@ -101,10 +280,107 @@ class RequestUtil:
                 try:
                     file.close()
                 except Exception as e:
-                    logger.error(f"关闭文件时发生错误: {e}")
+                    logger.error("关闭文件时发生错误: %s", e)
 
-        if response:
+        if response is not None:
             # 记录响应信息
-            self._log_response_info(response)
+            with timing_util.span("log"):
+                self._log_response_info(response, sampled)
+            if cassette is not None and cassette.recording:
+                cassette.record(key, normalized, response)
 
+        return response
+
+    def _send_limited(self, kwargs, stream_options, retry=True):
+        """
+        发送请求，配置了 [rate_limit] 的主机先等待令牌，等待时间记录为 wait 阶段；
+        响应被识别为限流时通知限流器降速，并按 throttle_retries 重新发送。
+        :param kwargs: 请求参数
+        :param stream_options: 流式读取配置，None 表示一次性读取响应体
+        :param retry: 是否允许重新发送，上传文件的请求体只能读取一次，不重新发送
+        :return: (响应视图对象 ResponseView, 最终响应是否被限流)
+        """
+        limiter = rate_util.get_limiter(kwargs.get("url"))
+        attempts = 0
+        while True:
+            if limiter is not None:
+                wait = limiter.acquire()
+                if wait > 0:
+                    timing_util.record("wait", wait * 1000)
+            raw = self._timed_request(kwargs)
+            if stream_options is not None:
+                response = ResponseView(raw, body=stream_util.consume(raw, stream_options))
+            else:
+                response = ResponseView(raw)
+            if limiter is None or not limiter.observe(response):
+                return response, False
+            if not retry or attempts >= limiter.config["throttle_retries"]:
+                logger.warning("请求被限流: %s %s", kwargs.get("method"), kwargs.get("url"))
+                return response, True
+            attempts += 1
+            logger.warning("请求被限流，等待后第 %s 次重新发送: %s %s", attempts, kwargs.get("method"), kwargs.get("url"))
+
+    def _lookup_cache(self, kwargs, stream_options, cache_ttl, cookies):
+        """
+        配置了 cache 的 GET/HEAD 请求查找本次运行的响应缓存；缓存已过期时在请求头中加入条件请求头。
+        :param kwargs: 请求参数
+        :param stream_options: 流式读取配置，流式读取的请求不使用缓存
+        :param cache_ttl: 响应缓存有效期（秒），None 表示不使用缓存
+        :param cookies: 发送请求使用的 CookieJar，参与计算缓存键
+        :return: (响应缓存, 缓存键, 缓存, 有效期内的响应视图对象)，不使用缓存时响应缓存为 None，未命中时响应视图对象为 None
+        """
+        if not cache_ttl or stream_options is not None:
+            return None, None, None, None
+        if str(kwargs.get("method", "")).upper() not in cache_util.CACHEABLE_METHODS:
+            return None, None, None, None
+        cache = cache_util.get_cache()
+        key, normalized = cache_util.cache_key(kwargs, cookies)
+        entry = cache.get(key)
+        if entry is not None and entry.fresh:
+            cache.count("hits")
+            logger.info("请求命中响应缓存: %s %s", normalized["method"], normalized["url"])
+            return cache, key, entry, ResponseView(entry.response)
+        if entry is not None:
+            kwargs["headers"] = dict(kwargs.get("headers") or {}, **entry.conditional_headers())
+        return cache, key, entry, None
+
+    def _update_cache(self, cache, key, entry, response, ttl):
+        """
+        根据响应更新缓存：条件请求返回 304 时刷新有效期并使用缓存的响应，可以缓存的响应写入缓存。
+        :param cache: 响应缓存
+        :param key: 缓存键
+        :param entry: 已过期的缓存，没有缓存时为 None
+        :param response: 响应视图对象 ResponseView
+        :param ttl: 有效期秒数
+        :return: 响应视图对象 ResponseView
+        """
+        if response.status_code == 304 and entry is not None:
+            entry.refresh(ttl)
+            cache.count("revalidated")
+            logger.info("响应未修改(304)，继续使用缓存的响应")
+            return ResponseView(entry.response)
+        cache.count("misses")
+        if cache_util.storable(response):
+            cache.put(key, response.raw_response, ttl)
+        return response
+
+    def _timed_request(self, kwargs):
+        """
+        发送请求并记录 send、ttfb、download 阶段耗时。
+        response.elapsed 是从发出请求到解析完响应头的时间，扣除本次新建连接的 connect 和 tls 即为 ttfb，
+        总耗时减去 elapsed 即为读取响应体的 download 时间。
+        :param kwargs: 请求参数
+        :return: requests 响应对象
+        """
+        before = timing_util.phase_ms("connect") + timing_util.phase_ms("tls")
+        start = time.perf_counter()
+        try:
+            response = self.session.request(**kwargs)
+        finally:
+            total_ms = (time.perf_counter() - start) * 1000
+            timing_util.record("send", total_ms)
+        elapsed_ms = response.elapsed.total_seconds() * 1000
+        handshake_ms = timing_util.phase_ms("connect") + timing_util.phase_ms("tls") - before
+        timing_util.record("ttfb", max(elapsed_ms - handshake_ms, 0.0))
+        timing_util.record("download", max(total_ms - elapsed_ms, 0.0))
         return response
\ No newline at end of file
@@ -0,0 +1,86 @@
+from commons.logs_util import logger
+
+# 尚未解码的标记，区分“未解码”和“解码结果为 None”
+_UNSET = object()
+
+
+class ResponseView:
+    """
+    只读的响应视图，一次请求只创建一个，在日志、提取和断言之间共享。
+    text 和 json 在首次访问时解码并缓存，之后不再重复解析，也不需要深拷贝原始响应。
+    未定义的属性会转发给底层响应对象，因此 status_code、headers、cookies、elapsed 等用法保持不变。
+    流式读取的响应没有保留响应体，text 为空字符串、json 为 None，大小和哈希等信息见 body。
+    """
+    __slots__ = ("_response", "_text", "_json", "_timings", "_body")
+
+    def __init__(self, response, timings=None, body=None):
+        object.__setattr__(self, "_response", response)
+        object.__setattr__(self, "_timings", timings or {})
+        object.__setattr__(self, "_body", body)
+        object.__setattr__(self, "_text", _UNSET)
+        object.__setattr__(self, "_json", _UNSET)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"ResponseView 是只读对象，不能设置属性 {name}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"ResponseView 是只读对象，不能删除属性 {name}")
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def __repr__(self):
+        return f"<ResponseView [{self.status_code}]>"
+
+    @property
+    def raw_response(self):
+        """底层的响应对象"""
+        return self._response
+
+    @property
+    def timings(self):
+        """发送请求时记录的网络阶段耗时（毫秒），并发预执行的响应用它补记到用例步骤中"""
+        return self._timings
+
+    @property
+    def body(self):
+        """流式读取得到的响应体信息 StreamedBody，未开启流式读取时为 None"""
+        return self._body
+
+    @property
+    def status_code(self):
+        return self._response.status_code
+
+    @property
+    def headers(self):
+        return self._response.headers
+
+    @property
+    def content(self):
+        return b"" if self._body is not None else self._response.content
+
+    @property
+    def text(self):
+        """解码后的响应文本，只解码一次"""
+        if self._text is _UNSET:
+            object.__setattr__(self, "_text", "" if self._body is not None else self._response.text)
+        return self._text
+
+    @property
+    def json(self):
+        """解析后的 JSON 数据，只解析一次；响应不是 JSON 时为 None"""
+        if self._json is _UNSET and self._body is not None:
+            object.__setattr__(self, "_json", None)
+        if self._json is _UNSET:
+            try:
+                value = self._response.json()
+            except ValueError:
+                logger.info("响应数据不是JSON格式")
+                value = None
+            object.__setattr__(self, "_json", value)
+        return self._json
+
+    @property
+    def is_json(self):
+        """响应是否为有效的 JSON"""
+        return self.json is not None
@@ -0,0 +1,67 @@
+"""
+@FileName: startup_util.py
+@Description: 框架启动耗时分析。在子进程中以 python -X importtime 导入框架入口模块，
+汇总每个模块的导入耗时，用于发现拖慢冷启动的依赖。
+运行方式（项目根目录）: python -m commons.startup_util [模块 ...]
+"""
+import re
+import subprocess
+import sys
+
+# 框架的入口模块：pytest 钩子和用例收集
+ENTRY_MODULES = ("conftest", "testcases.test_all_case")
+
+_LINE_PATTERN = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile_imports(modules=ENTRY_MODULES):
+    """
+    在子进程中导入指定模块并解析 -X importtime 的输出。
+
+    :param modules: 要导入的模块名
+    :return: (总耗时毫秒数, 模块耗时列表)，列表每项包含 module、self_ms、cumulative_ms、depth，按累计耗时倒序
+    """
+    code = "; ".join(f"import {module}" for module in modules)
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"导入模块失败: {completed.stderr[-2000:]}")
+    stats = []
+    for line in completed.stderr.splitlines():
+        match = _LINE_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            stats.append({
+                "module": module,
+                "self_ms": round(int(self_us) / 1000, 3),
+                "cumulative_ms": round(int(cumulative_us) / 1000, 3),
+                "depth": (len(indent) - 1) // 2,
+            })
+    # 入口模块的累计耗时之和即为框架的导入耗时，不含解释器自身启动时导入的 site 等模块
+    total_ms = round(sum(stat["cumulative_ms"] for stat in stats if stat["depth"] == 0 and stat["module"] in modules), 3)
+    stats.sort(key=lambda stat: stat["cumulative_ms"], reverse=True)
+    return total_ms, stats
+
+
+def format_report(total_ms, stats, top=25):
+    """
+    把分析结果格式化为文本行。
+
+    :param total_ms: 总耗时
+    :param stats: 模块耗时列表
+    :param top: 展示的模块数
+    :return: 文本行列表
+    """
+    lines = [
+        f"框架入口模块导入总耗时: {total_ms} ms",
+        f"{'累计(ms)':>10}{'自身(ms)':>10}  模块",
+    ]
+    for stat in stats[:top]:
+        lines.append(f"{stat['cumulative_ms']:>10}{stat['self_ms']:>10}  {stat['module']}")
+    return lines
+
+
+if __name__ == "__main__":
+    for line in format_report(*profile_imports(tuple(sys.argv[1:]) or ENTRY_MODULES)):
+        print(line)
@@ -0,0 +1,208 @@
+"""
+@FileName: stream_util.py
+@Description: 大响应体的流式读取。用例配置 stream 后，响应体按块读取，边读边计算大小、哈希和内容类型，
+写入临时文件或直接丢弃，内存占用与响应大小无关。计算结果通过 body_equals、body_contains、body_between 断言。
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from config import setting
+from commons import timing_util
+from commons.logs_util import logger
+
+# 支持的哈希算法
+HASH_ALGORITHMS = ("md5", "sha1", "sha256", "sha512")
+# 针对流式读取结果的断言类型，需要用例开启 stream
+BODY_ASSERT_TYPES = ["body_equals", "body_contains", "body_between"]
+# 流式读取后可以断言的属性
+BODY_PROPERTIES = ("size", "md5", "sha1", "sha256", "sha512", "content_type", "detected_type", "path")
+
+# 根据响应体开头的字节识别文件类型，不依赖服务端返回的 Content-Type
+_SIGNATURES = (
+    (b"PK\x03\x04", "application/zip"),
+    (b"%PDF-", "application/pdf"),
+    (b"\x1f\x8b", "application/gzip"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/vnd.ms-excel"),
+    (b"Rar!", "application/x-rar-compressed"),
+    (b"7z\xbc\xaf\x27\x1c", "application/x-7z-compressed"),
+)
+# 识别文件类型需要的字节数
+_SNIFF_SIZE = 16
+
+
+def detect_type(head: bytes):
+    """
+    根据响应体开头的字节识别文件类型。
+
+    :param head: 响应体开头的字节
+    :return: MIME 类型，无法识别时返回 None
+    """
+    for signature, mime in _SIGNATURES:
+        if head.startswith(signature):
+            return mime
+    stripped = head.lstrip()
+    if stripped[:1] in (b"{", b"["):
+        return "application/json"
+    if stripped[:1] == b"<":
+        return "text/xml" if stripped.startswith(b"<?xml") else "text/html"
+    return None
+
+
+def parse_options(stream):
+    """
+    解析用例中的 stream 配置。
+
+    stream: true                       # 丢弃响应体，只计算大小、哈希和类型
+    stream:
+      save: true                       # 写入临时文件，会话结束时删除（setting.stream_keep_files 为 True 时保留）
+      hash: [md5, sha256]              # 需要计算的哈希，默认 setting.stream_hash_algorithms
+      chunk_size: 1048576              # 每次读取的字节数，默认 setting.stream_chunk_size
+
+    :param stream: yaml 中 stream 字段的值
+    :return: 配置字典，未开启时返回 None
+    """
+    if not stream:
+        return None
+    options = stream if isinstance(stream, dict) else {}
+    algorithms = options.get("hash", setting.stream_hash_algorithms) or []
+    if isinstance(algorithms, str):
+        algorithms = [algorithms]
+    unsupported = [name for name in algorithms if name not in HASH_ALGORITHMS]
+    if unsupported:
+        raise ValueError(f"stream 中不支持的哈希算法 {unsupported}，支持的算法有 {list(HASH_ALGORITHMS)}")
+    return {
+        "save": bool(options.get("save", False)),
+        "hash": list(algorithms),
+        "chunk_size": int(options.get("chunk_size", setting.stream_chunk_size)),
+    }
+
+
+class StreamedBody:
+    """
+    流式读取得到的响应体信息。没有计算的哈希为 None；未保存文件时 path 为 None。
+    """
+
+    def __init__(self, size, hashes, content_type, detected_type, path=None):
+        self.size = size
+        self.content_type = content_type
+        self.detected_type = detected_type
+        self.path = path
+        for name in HASH_ALGORITHMS:
+            setattr(self, name, hashes.get(name))
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in BODY_PROPERTIES if getattr(self, name) is not None}
+
+    def __str__(self):
+        return f"<流式响应体 {self.to_dict()}>"
+
+
+# 本次运行生成的临时文件，会话结束时删除
+_temp_files = []
+_temp_lock = threading.Lock()
+
+
+def _open_temp_file():
+    directory = setting.stream_temp_dir
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    f = tempfile.NamedTemporaryFile(prefix="stream_", suffix=".body", dir=directory or None, delete=False)
+    with _temp_lock:
+        _temp_files.append(f.name)
+    return f
+
+
+class _BodyReader:
+    """
+    逐块处理响应体：累计大小、计算哈希、保留开头用于识别类型，按配置写入临时文件。
+    """
+
+    def __init__(self, options):
+        self.hashers = {name: hashlib.new(name) for name in options["hash"]}
+        self.head = b""
+        self.size = 0
+        self.target = _open_temp_file() if options["save"] else None
+
+    def update(self, chunk):
+        if len(self.head) < _SNIFF_SIZE:
+            self.head += chunk[:_SNIFF_SIZE - len(self.head)]
+        self.size += len(chunk)
+        for hasher in self.hashers.values():
+            hasher.update(chunk)
+        if self.target is not None:
+            self.target.write(chunk)
+
+    def close(self):
+        if self.target is not None:
+            self.target.close()
+
+    def result(self, headers):
+        content_type = headers.get("Content-Type", "").split(";")[0].strip() or None
+        return StreamedBody(
+            size=self.size,
+            hashes={name: hasher.hexdigest() for name, hasher in self.hashers.items()},
+            content_type=content_type,
+            detected_type=detect_type(self.head),
+            path=self.target.name if self.target is not None else None,
+        )
+
+
+def consume(response, options):
+    """
+    按块读取以 stream=True 发送的请求的响应体，读取时间记录为 download 阶段。
+
+    :param response: requests 响应对象
+    :param options: parse_options 返回的配置
+    :return: StreamedBody 对象
+    """
+    reader = _BodyReader(options)
+    start = time.perf_counter()
+    try:
+        for chunk in response.iter_content(chunk_size=options["chunk_size"]):
+            reader.update(chunk)
+    finally:
+        response.close()
+        reader.close()
+        timing_util.record("download", (time.perf_counter() - start) * 1000)
+    return reader.result(response.headers)
+
+
+async def consume_async(response, options):
+    """
+    按块读取 httpx 流式响应的响应体，读取时间由请求的 trace 回调记录在响应上。
+
+    :param response: 以 client.stream 发送得到的 httpx 响应对象
+    :param options: parse_options 返回的配置
+    :return: StreamedBody 对象
+    """
+    reader = _BodyReader(options)
+    try:
+        async for chunk in response.aiter_bytes(chunk_size=options["chunk_size"]):
+            reader.update(chunk)
+    finally:
+        await response.aclose()
+        reader.close()
+    return reader.result(response.headers)
+
+
+def cleanup():
+    """
+    删除本次运行生成的临时文件，会话结束时调用。
+    """
+    if setting.stream_keep_files:
+        return
+    with _temp_lock:
+        paths, _temp_files[:] = list(_temp_files), []
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"删除流式响应临时文件 {path} 失败: {e}")
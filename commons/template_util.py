@@ -0,0 +1,203 @@
+import re
+import threading
+from collections import OrderedDict
+
+from config import setting
+from commons.logs_util import logger
+
+# 匹配 ${response.xxx} 或 ${func(args)} 两种占位符，response 分支优先，避免跨占位符误匹配
+HOTLOAD_PATTERN = re.compile(r"\$\{(?:response\.(\w+)|(.*?)\((.*?)\))\}")
+
+
+class Placeholder:
+    """
+    模板中的一个占位符，编译阶段解析得到，执行阶段只需要求值。
+    """
+    __slots__ = ("raw", "kind", "name", "args")
+
+    def __init__(self, raw, kind, name, args=()):
+        self.raw = raw      # 原始表达式文本，例如 ${env(8kqw)}
+        self.kind = kind    # 占位符类型: function / response
+        self.name = name    # 函数名或 response 属性名
+        self.args = args    # 函数参数元组
+
+    def __repr__(self):
+        return f"Placeholder({self.raw!r})"
+
+
+def parse_hotload(match):
+    """
+    把正则匹配结果解析为 Placeholder 对象。
+
+    :param match: HOTLOAD_PATTERN 的匹配对象
+    :return: Placeholder 对象
+    """
+    if match.group(1):
+        return Placeholder(match.group(0), "response", match.group(1))
+    args = match.group(3)
+    return Placeholder(match.group(0), "function", match.group(2), tuple(args.split(",")) if args else ())
+
+
+class _Const:
+    """不含占位符的标量，原样返回。"""
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def render(self, resolve):
+        return self.value
+
+
+class _Text:
+    """含占位符的字符串。整串只有一个占位符时保留返回值的原始类型，否则拼接为字符串。"""
+    __slots__ = ("parts",)
+
+    def __init__(self, parts):
+        self.parts = parts
+
+    def render(self, resolve):
+        if len(self.parts) == 1:
+            return resolve(self.parts[0])
+        return "".join(part if isinstance(part, str) else str(resolve(part)) for part in self.parts)
+
+
+class _List:
+    __slots__ = ("items",)
+
+    def __init__(self, items):
+        self.items = items
+
+    def render(self, resolve):
+        return [item.render(resolve) for item in self.items]
+
+
+class _Dict:
+    __slots__ = ("items",)
+
+    def __init__(self, items):
+        self.items = items
+
+    def render(self, resolve):
+        return {key.render(resolve): value.render(resolve) for key, value in self.items}
+
+
+class Template:
+    """
+    编译后的请求/断言模板。
+    编译时记录所有占位符的位置，渲染时把求值结果直接代入结构的副本，不再经过 yaml 序列化。
+    """
+
+    def __init__(self, source, pattern=HOTLOAD_PATTERN, parse=parse_hotload):
+        self.source = source
+        self.pattern = pattern
+        self.parse = parse
+        self.placeholders = []
+        self._root = self._compile(source)
+
+    def _compile(self, node):
+        if isinstance(node, dict):
+            return _Dict([(self._compile(k), self._compile(v)) for k, v in node.items()])
+        if isinstance(node, list):
+            return _List([self._compile(item) for item in node])
+        if isinstance(node, str):
+            return self._compile_str(node)
+        return _Const(node)
+
+    def _compile_str(self, text):
+        parts = []
+        pos = 0
+        for match in self.pattern.finditer(text):
+            if match.start() > pos:
+                parts.append(text[pos:match.start()])
+            placeholder = self.parse(match)
+            self.placeholders.append(placeholder)
+            parts.append(placeholder)
+            pos = match.end()
+        if not parts:
+            return _Const(text)
+        if pos < len(text):
+            parts.append(text[pos:])
+        return _Text(parts)
+
+    def render(self, resolve):
+        """
+        渲染模板，返回新的数据结构，源数据不会被修改。
+
+        :param resolve: 占位符求值函数，入参为 Placeholder，返回替换后的值
+        :return: 替换后的数据
+        """
+        return self._root.render(resolve)
+
+
+# 收集阶段预编译的模板，以源对象 id 为键，同时持有源对象引用，防止 id 被复用；整个运行期间保留，不会被淘汰
+_compiled = {}
+# 执行时才编译的模板（数据驱动行、压测迭代等运行时生成的数据），按最近使用顺序最多保留 setting.template_cache_size 个
+_template_cache = OrderedDict()
+_template_lock = threading.Lock()
+
+
+def _lookup(cache, data):
+    template = cache.get(id(data))
+    if template is not None and template.source is data:
+        return template
+    return None
+
+
+def get_template(data):
+    """
+    获取数据对应的编译模板：优先使用收集阶段预编译的模板，否则从运行时缓存中获取，首次访问时编译并缓存，
+    运行时缓存超出容量时淘汰最久未使用的模板。
+
+    :param data: request 或 validate 等原始数据
+    :return: Template 对象
+    """
+    key = id(data)
+    with _template_lock:
+        template = _lookup(_compiled, data)
+        if template is not None:
+            return template
+        template = _lookup(_template_cache, data)
+        if template is not None:
+            _template_cache.move_to_end(key)
+            return template
+    template = Template(data)
+    with _template_lock:
+        _template_cache[key] = template
+        _template_cache.move_to_end(key)
+        while len(_template_cache) > setting.template_cache_size:
+            _template_cache.popitem(last=False)
+    return template
+
+
+def release(caseinfo):
+    """
+    移除用例 request 和 validate 的编译缓存，执行时才从数据文件读取的数据驱动用例执行后调用，避免缓存随行数增长。
+
+    :param caseinfo: 用例字典
+    """
+    with _template_lock:
+        for field in ("request", "validate"):
+            data = caseinfo.get(field)
+            for cache in (_compiled, _template_cache):
+                if _lookup(cache, data) is not None:
+                    del cache[id(data)]
+
+
+def compile_case(caseinfo):
+    """
+    在用例收集阶段预编译用例中的 request 和 validate，编译结果在整个运行期间保留，不受运行时缓存容量限制。
+
+    :param caseinfo: 单接口用例字典，或流程用例的字典列表
+    """
+    cases = caseinfo if isinstance(caseinfo, list) else [caseinfo]
+    for case in cases:
+        if not isinstance(case, dict):
+            continue
+        for field in ("request", "validate"):
+            data = case.get(field)
+            if data and _lookup(_compiled, data) is None:
+                template = Template(data)
+                with _template_lock:
+                    _compiled[id(data)] = template
+    logger.debug(f"预编译用例模板完成，共 {len(cases)} 个用例")
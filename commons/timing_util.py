@@ -0,0 +1,215 @@
+import heapq
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from config import setting
+from commons.logs_util import logger
+from commons.worker_util import worker_file
+
+# 当前线程正在执行的用例步骤与所属测试
+_local = threading.local()
+_lock = threading.Lock()
+# 最慢的若干个步骤（小顶堆）以及各阶段的累计耗时，内存占用与步骤数无关
+_slowest = []
+_phase_totals = {}
+_step_count = 0
+_file = None
+# 当前测试已完成的步骤，用于添加 Allure 附件
+_test_steps = []
+
+
+class Step:
+    """
+    一个用例步骤的计时记录，phases 按阶段名累计毫秒数，extra 保存上传速率等附加信息。
+    """
+    __slots__ = ("test", "name", "start", "phases", "extra")
+
+    def __init__(self, test, name):
+        self.test = test
+        self.name = name
+        self.start = time.perf_counter()
+        self.phases = {}
+        self.extra = {}
+
+    def to_dict(self):
+        data = {
+            "test": self.test,
+            "step": self.name,
+            "total_ms": round((time.perf_counter() - self.start) * 1000, 3),
+            "phases": {phase: round(ms, 3) for phase, ms in self.phases.items()},
+        }
+        data.update(self.extra)
+        return data
+
+
+def begin_test(test):
+    """
+    标记当前线程开始执行一个测试，之后的步骤都归属于该测试。
+
+    :param test: 测试的 nodeid
+    """
+    _local.test = test
+    _test_steps.clear()
+
+
+def start_step(name):
+    """
+    开始记录一个用例步骤。
+
+    :param name: 步骤名称，通常为用例标题
+    """
+    if setting.timing_enabled:
+        _local.step = Step(getattr(_local, "test", None), name)
+
+
+def record(phase, ms):
+    """
+    给当前步骤的某个阶段累加耗时，没有进行中的步骤时忽略。
+
+    :param phase: 阶段名称，例如 render、send、connect、tls、ttfb
+    :param ms: 耗时毫秒数
+    """
+    step = getattr(_local, "step", None)
+    if step is not None:
+        step.phases[phase] = step.phases.get(phase, 0.0) + ms
+
+
+def annotate(key, value):
+    """
+    给当前步骤添加附加信息，随阶段耗时一起写入文件和 Allure 附件，没有进行中的步骤时忽略。
+
+    :param key: 信息名称，例如 upload
+    :param value: 可以序列化为 JSON 的值
+    """
+    step = getattr(_local, "step", None)
+    if step is not None:
+        step.extra[key] = value
+
+
+def record_many(phases):
+    """
+    批量累加阶段耗时，例如并发预执行时记录在响应上的网络耗时。
+
+    :param phases: 阶段名到毫秒数的字典
+    """
+    for phase, ms in (phases or {}).items():
+        record(phase, ms)
+
+
+def phase_ms(phase):
+    """
+    获取当前步骤某个阶段已累计的耗时。
+
+    :param phase: 阶段名称
+    :return: 毫秒数，没有进行中的步骤时返回 0
+    """
+    step = getattr(_local, "step", None)
+    return step.phases.get(phase, 0.0) if step is not None else 0.0
+
+
+@contextmanager
+def span(phase):
+    """
+    以上下文管理器的方式统计一个阶段的耗时。
+
+    :param phase: 阶段名称
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase, (time.perf_counter() - start) * 1000)
+
+
+def finish_step():
+    """
+    结束当前步骤，写入 JSONL 文件并更新汇总统计。
+
+    :return: 步骤计时字典，没有进行中的步骤时返回 None
+    """
+    global _step_count
+    step = getattr(_local, "step", None)
+    if step is None:
+        return None
+    _local.step = None
+    data = step.to_dict()
+    with _lock:
+        _step_count += 1
+        for phase, ms in data["phases"].items():
+            total = _phase_totals.setdefault(phase, [0, 0.0])
+            total[0] += 1
+            total[1] += ms
+        entry = (data["total_ms"], _step_count, data)
+        if len(_slowest) < setting.timing_summary_size:
+            heapq.heappush(_slowest, entry)
+        else:
+            heapq.heappushpop(_slowest, entry)
+        # 压测迭代没有所属测试，只计入汇总，不逐条写文件
+        if data["test"] is not None:
+            _test_steps.append(data)
+            _write(data)
+    return data
+
+
+def _write(data):
+    global _file
+    if not setting.timing_file:
+        return
+    try:
+        if _file is None:
+            # 并行运行时每个 worker 写入独立的文件，例如 timing_gw0.jsonl
+            path = worker_file(setting.timing_file)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            _file = open(path, "w", encoding="utf-8")
+        _file.write(json.dumps(data, ensure_ascii=False) + "\n")
+    except OSError as e:
+        logger.error(f"写入计时文件 {setting.timing_file} 时出现错误: {e}")
+
+
+def current_test_steps():
+    """
+    获取当前测试已完成的步骤计时。
+
+    :return: 步骤计时字典列表
+    """
+    return list(_test_steps)
+
+
+def summary():
+    """
+    获取计时汇总：最慢的步骤列表以及各阶段的次数、总耗时和平均耗时。
+
+    :return: (最慢步骤列表, 阶段汇总列表)
+    """
+    with _lock:
+        slowest = [data for _, _, data in sorted(_slowest, reverse=True)]
+        phases = [
+            {"phase": phase, "count": count, "total_ms": round(total, 3), "avg_ms": round(total / count, 3)}
+            for phase, (count, total) in sorted(_phase_totals.items(), key=lambda item: item[1][1], reverse=True)
+        ]
+    return slowest, phases
+
+
+def reset():
+    """
+    清空汇总统计，例如基准测试预热之后调用。
+    """
+    global _step_count
+    with _lock:
+        _slowest.clear()
+        _phase_totals.clear()
+        _step_count = 0
+
+
+def close():
+    """
+    关闭计时文件。
+    """
+    global _file
+    with _lock:
+        if _file is not None:
+            _file.close()
+            _file = None
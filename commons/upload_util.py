@@ -0,0 +1,199 @@
+"""
+@FileName: upload_util.py
+@Description: 文件上传的流式 multipart 编码。请求体按块生成，边读文件边发送，
+内存占用与文件大小无关；支持按指定大小生成上传内容，不需要在磁盘上准备大文件。
+"""
+import mimetypes
+import os
+import re
+import time
+import uuid
+
+from config import setting
+from commons import timing_util
+from commons.logs_util import logger
+
+_SIZE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMG]?B?)?\s*$", re.IGNORECASE)
+_SIZE_UNITS = {"": 1, "B": 1, "K": 1024, "KB": 1024, "M": 1024 ** 2, "MB": 1024 ** 2, "G": 1024 ** 3, "GB": 1024 ** 3}
+
+
+def parse_size(value):
+    """
+    解析大小配置，例如 1024、512KB、100MB、1.5GB。
+
+    :param value: 整数字节数或带单位的字符串
+    :return: 字节数
+    """
+    if isinstance(value, int):
+        return value
+    match = _SIZE_PATTERN.match(str(value))
+    if not match:
+        raise ValueError(f"无法解析的大小: {value}，示例: 1024、512KB、100MB")
+    number, unit = match.groups()
+    return int(float(number) * _SIZE_UNITS[(unit or "").upper()])
+
+
+class GeneratedPayload:
+    """
+    按指定大小生成的上传内容，重复一个随机数据块，像只读文件一样按块读取。
+    """
+
+    def __init__(self, size, block_size=64 * 1024):
+        self.size = size
+        self._block = os.urandom(min(block_size, size) or 1)
+        self._position = 0
+
+    def read(self, n=-1):
+        remaining = self.size - self._position
+        if n is None or n < 0 or n > remaining:
+            n = remaining
+        if n <= 0:
+            return b""
+        offset = self._position % len(self._block)
+        chunk = self._block[offset:offset + n]
+        while len(chunk) < n:
+            chunk += self._block[:n - len(chunk)]
+        self._position += n
+        return chunk
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        base = {os.SEEK_SET: 0, os.SEEK_CUR: self._position, os.SEEK_END: self.size}[whence]
+        self._position = max(0, min(self.size, base + offset))
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    def close(self):
+        pass
+
+
+class UploadPart:
+    """
+    一个上传文件字段：字段名、文件名、内容类型、大小和可按块读取的文件对象。
+    """
+
+    def __init__(self, name, filename, content_type, size, fileobj, source):
+        self.name = name
+        self.filename = filename
+        self.content_type = content_type
+        self.size = size
+        self.fileobj = fileobj
+        self.source = source
+
+    def close(self):
+        self.fileobj.close()
+
+
+def _open_part(name, spec):
+    """
+    按 files 中一个字段的配置打开上传内容。
+
+    avatar: ./data/avatar.png          # 文件路径
+    report:
+      path: ./data/report.zip          # 文件路径，或者使用 size 生成内容
+      size: 100MB
+      filename: report.zip             # 可选，默认取路径中的文件名
+      content_type: application/zip    # 可选，默认按文件名推断
+
+    :param name: 字段名
+    :param spec: 字段配置
+    :return: UploadPart 对象
+    """
+    if not isinstance(spec, dict):
+        spec = {"path": spec}
+    path = spec.get("path")
+    if path is not None:
+        filename = spec.get("filename") or os.path.basename(str(path))
+        size = os.path.getsize(path)
+        fileobj = open(path, "rb")
+        source = str(path)
+    elif "size" in spec:
+        filename = spec.get("filename") or f"{name}.bin"
+        size = parse_size(spec["size"])
+        fileobj = GeneratedPayload(size)
+        source = f"生成内容 {size} 字节"
+    else:
+        raise ValueError(f"上传字段 {name} 需要配置 path 或 size")
+    content_type = spec.get("content_type") or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    return UploadPart(name, filename, content_type, size, fileobj, source)
+
+
+def open_parts(files):
+    """
+    打开 files 中的所有上传内容，任一字段出错时关闭已经打开的文件。
+
+    :param files: yaml 中 files 字段的值
+    :return: UploadPart 列表
+    """
+    parts = []
+    try:
+        for name, spec in files.items():
+            parts.append(_open_part(name, spec))
+    except Exception:
+        for part in parts:
+            part.close()
+        raise
+    return parts
+
+
+def _quote(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\r", "%0D").replace("\n", "%0A")
+
+
+class MultipartEncoder:
+    """
+    流式 multipart/form-data 请求体。迭代时依次生成各字段的分隔符、头部和内容，
+    文件内容每次读取 setting.upload_chunk_size 字节；长度可以预先计算，因此默认带 Content-Length 发送。
+    每次迭代结束时记录 upload 阶段耗时和上传速率。
+    """
+
+    def __init__(self, fields, parts, chunk_size=None):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self.chunk_size = chunk_size or setting.upload_chunk_size
+        self._fields = []
+        for key, values in (fields or {}).items():
+            for value in values if isinstance(values, (list, tuple)) else [values]:
+                self._fields.append((self._header(key), str(value).encode("utf-8")))
+        self._parts = [(self._header(part.name, part.filename, part.content_type), part) for part in parts]
+        self._trailer = f"--{self.boundary}--\r\n".encode()
+
+    def _header(self, name, filename=None, content_type=None):
+        disposition = f'form-data; name="{_quote(name)}"'
+        if filename is not None:
+            disposition += f'; filename="{_quote(filename)}"'
+        header = f"--{self.boundary}\r\nContent-Disposition: {disposition}\r\n"
+        if content_type:
+            header += f"Content-Type: {content_type}\r\n"
+        return (header + "\r\n").encode("utf-8")
+
+    def __len__(self):
+        fields = sum(len(header) + len(value) + 2 for header, value in self._fields)
+        parts = sum(len(header) + part.size + 2 for header, part in self._parts)
+        return fields + parts + len(self._trailer)
+
+    def __iter__(self):
+        start = time.perf_counter()
+        sent = 0
+        for header, value in self._fields:
+            yield header + value + b"\r\n"
+        for header, part in self._parts:
+            yield header
+            # 重定向等需要重新发送请求体时从头读取
+            part.fileobj.seek(0)
+            while True:
+                chunk = part.fileobj.read(self.chunk_size)
+                if not chunk:
+                    break
+                sent += len(chunk)
+                yield chunk
+            yield b"\r\n"
+        yield self._trailer
+        self._report(sent, (time.perf_counter() - start) * 1000)
+
+    def _report(self, sent, ms):
+        throughput = round(sent / 1024 / 1024 / (ms / 1000), 2) if ms > 0 else None
+        timing_util.record("upload", ms)
+        timing_util.annotate("upload", {"bytes": sent, "ms": round(ms, 3), "mb_per_sec": throughput})
+        logger.info("上传文件 %s 字节，耗时 %.1f ms，速率 %s MB/s", sent, ms, throughput)
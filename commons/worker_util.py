@@ -0,0 +1,41 @@
+import os
+
+
+def get_worker_id():
+    """
+    获取当前 pytest-xdist worker 的编号，例如 gw0；非并行运行时返回 master。
+
+    :return: worker 编号
+    """
+    return os.environ.get("PYTEST_XDIST_WORKER", "master")
+
+
+def get_worker_count():
+    """
+    获取并行运行的 worker 总数，非并行运行时返回 1。
+
+    :return: worker 总数
+    """
+    return int(os.environ.get("PYTEST_XDIST_WORKER_COUNT", "1"))
+
+
+def is_worker():
+    """
+    判断当前进程是否为 pytest-xdist 的 worker 进程。
+
+    :return: 是 worker 返回 True
+    """
+    return "PYTEST_XDIST_WORKER" in os.environ
+
+
+def worker_file(path):
+    """
+    为 worker 生成独立的文件名，例如 extract.yaml -> extract_gw0.yaml；非并行运行时原样返回。
+
+    :param path: 原始文件路径
+    :return: 当前 worker 使用的文件路径
+    """
+    if not is_worker():
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}_{get_worker_id()}{ext}"
@@ -1,7 +1,21 @@
+import threading
+
 import yaml
 import logging
 from config import setting
 from commons.logs_util import logger
+from commons.worker_util import worker_file
+
+# 会话级的中间变量存储，读写都在内存中完成，定期或会话结束时整体落盘到 extract.yaml
+# 存储按进程隔离，并行运行时每个 worker 拥有独立的变量命名空间
+_store = {}
+_loaded = False
+_dirty = False
+_writes_since_flush = 0
+_lock = threading.RLock()
+# 线程级的独立变量命名空间，压测时每个虚拟用户一个，不落盘
+_local = threading.local()
+
 
 def _open_yaml_file(mode):
     """
@@ -9,62 +23,130 @@ def _open_yaml_file(mode):
     :param mode: 文件打开模式
     :return: 文件对象
     """
+    # 并行运行时每个 worker 使用独立的文件，例如 extract_gw0.yaml
+    path = worker_file(setting.extract_name)
     try:
-        return open(setting.extract_name, encoding='utf-8', mode=mode)
+        return open(path, encoding='utf-8', mode=mode)
     except FileNotFoundError:
-        logging.error(f"未找到 extract.yaml 文件: {setting.extract_name}")
+        logging.error(f"未找到 extract.yaml 文件: {path}")
         return None
     except Exception as e:
         logging.error(f"打开 extract.yaml 文件时出现错误: {e}")
         return None
 
+
+def _ensure_loaded():
+    """
+    内部方法，首次访问时把 extract.yaml 中已有的数据加载到内存，重复的键以最后一次的值为准。
+    """
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    f = _open_yaml_file('r')
+    if f is None:
+        return
+    with f:
+        try:
+            _store.update(yaml.safe_load(f) or {})
+        except yaml.YAMLError as e:
+            logging.error(f"解析 extract.yaml 文件时出现错误: {e}")
+
+
 def read_yaml(key):
     """
-    读取 extract.yaml 文件中指定键的值。
+    读取指定键的最新值。
     :param key: 要读取的键
-    :return: 指定键的值，如果键不存在或出现错误则返回 None
+    :return: 指定键的值，如果键不存在则返回 None
     """
-    with _open_yaml_file('r') as f:
-        if f:
-            try:
-                value = yaml.safe_load(f)
-                if value and key in value:
-                    return value[key]
-                else:
-                    logging.warning(f"未找到键 '{key}' 或 extract.yaml 文件为空。")
-            except yaml.YAMLError as e:
-                logging.error(f"解析 extract.yaml 文件时出现错误: {e}")
+    namespace = getattr(_local, "store", None)
+    if namespace is not None:
+        return namespace.get(key)
+    with _lock:
+        _ensure_loaded()
+        if key in _store:
+            return _store[key]
+    logging.warning(f"未找到键 '{key}' 或 extract.yaml 文件为空。")
     return None
 
+
 def read_all():
     """
-    读取 extract.yaml 文件中的所有值。
-    :return: extract.yaml 文件中的所有值，如果出现错误则返回 None
+    读取所有中间变量。
+    :return: 所有中间变量组成的字典副本
     """
-    with _open_yaml_file('r') as f:
-        if f:
-            try:
-                return yaml.safe_load(f)
-            except yaml.YAMLError as e:
-                logging.error(f"解析 extract.yaml 文件时出现错误: {e}")
-    return None
+    namespace = getattr(_local, "store", None)
+    if namespace is not None:
+        return dict(namespace)
+    with _lock:
+        _ensure_loaded()
+        return dict(_store)
+
 
 def write_yaml(data):
     """
-    将数据写入 extract.yaml 文件。
+    写入中间变量，同名键直接覆盖；累计写入次数达到 setting.extract_flush_interval 时落盘一次。
     :param data: 要写入的数据
     """
-    with _open_yaml_file('a') as f:
-        if f:
+    global _dirty, _writes_since_flush
+    namespace = getattr(_local, "store", None)
+    if namespace is not None:
+        namespace.update(data)
+        return
+    with _lock:
+        _ensure_loaded()
+        _store.update(data)
+        _dirty = True
+        _writes_since_flush += 1
+        logging.info("中间变量已保存到内存，稍后写入 extract.yaml 文件: %s", data)
+        if setting.extract_flush_interval and _writes_since_flush >= setting.extract_flush_interval:
+            flush_yaml()
+
+
+def flush_yaml():
+    """
+    把内存中去重后的变量快照整体写入 extract.yaml 文件。
+    """
+    global _dirty, _writes_since_flush
+    with _lock:
+        if not _dirty:
+            return
+        f = _open_yaml_file('w')
+        if f is None:
+            return
+        with f:
             try:
-                yaml.safe_dump(data, f, allow_unicode=True)
-                logging.info(f"成功将数据写入 extract.yaml 文件: {data}")
+                yaml.safe_dump(_store, f, allow_unicode=True)
+                _dirty = False
+                _writes_since_flush = 0
             except yaml.YAMLError as e:
                 logging.error(f"写入 extract.yaml 文件时出现错误: {e}")
 
+
 def clean_yaml():
     """
-    清空 extract.yaml 文件的内容。
+    清空内存中的变量以及 extract.yaml 文件的内容。
+    """
+    global _loaded, _dirty, _writes_since_flush
+    with _lock:
+        _store.clear()
+        _loaded = True
+        _dirty = False
+        _writes_since_flush = 0
+        f = _open_yaml_file('w')
+        if f is not None:
+            f.close()
+
+
+def use_thread_namespace():
+    """
+    为当前线程开启独立的变量命名空间，初始值为会话变量的副本；之后当前线程的读写互不影响其他线程，也不会落盘。
+    """
+    _local.store = read_all()
+
+
+def drop_thread_namespace():
+    """
+    关闭当前线程的独立变量命名空间，恢复使用会话变量。
     """
-    with _open_yaml_file('w') as f:
-        pass
\ No newline at end of file
+    _local.store = None
@@ -10,6 +10,16 @@ db_password="123456"
 db_host="localhost"
 db_port=3306
 db_database="test"
+# 数据库连接池大小（每个 worker 独立）
+db_pool_size=5
+# 连接池已满时获取连接的最长等待秒数
+db_pool_timeout=10
+# 连接空闲超过该秒数后，取出时先 ping 做健康检查
+db_pool_ping_interval=30
+# 同一用例内相同的 SELECT 是否只查询一次
+db_query_cache=True
+# 是否把一个用例 validate 中的所有 SELECT 合并为一次数据库往返，批量执行使用单独的多语句连接
+db_batch_queries=True
 
 # 全局参数
 global_args={
@@ -17,8 +27,86 @@ global_args={
     "application_client_type": "h5"
 }
 
+# 是否使用用例收集缓存，未修改过的 yaml 文件不再重新解析
+collect_cache = True
+# 用例收集缓存文件，可通过 python -m commons.collect_cache_util 预先构建
+collect_cache_file = "./.cache/collect_cache.pickle"
+# 增量运行（--incremental）的用例运行历史文件
+incremental_history_file = "./.cache/run_history.json"
+# 执行时才编译的请求/断言模板最多缓存的个数，超出时淘汰最久未使用的模板；收集阶段预编译的模板不计入
+template_cache_size = 2048
+
 #保存中间变量的文件名
 extract_name = "extract.yaml"
+#中间变量累计写入多少次后落盘一次，0 表示只在会话结束时落盘
+extract_flush_interval = 50
+
+# base_url 配置所在文件
+base_url_config = "./pytest.ini"
+# 默认环境，对应 pytest.ini 中的 [base_url:<环境名>]，可通过 --env-profile 覆盖；None 表示只使用 [base_url]
+base_url_profile = None
+# 配置文件修改后是否自动重新加载 base_url
+base_url_auto_reload = False
+
+# 异步并发模式（--async-run）下同时在途的最大请求数，可通过 --async-concurrency 覆盖
+async_concurrency = 20
+
+# run.py 并行运行的 worker 数，0 表示串行运行，"auto" 表示使用全部 CPU 核心
+parallel_workers = 0
+
+# 压测模式（--load-users / --load-rate）的默认持续秒数
+load_duration = 60
+# 开环模型下执行迭代的最大线程数
+load_max_workers = 200
+# 压测报告输出目录
+load_report_dir = "./reports/load"
+# 压测错误率超过该值时用例失败，None 表示不校验
+load_max_error_rate = None
+
+# 是否记录每个用例步骤各阶段（render、wait、send、connect、tls、ttfb、download、log、extract、assert、db）的耗时
+timing_enabled = True
+# 阶段耗时的 JSONL 输出文件，None 表示不写文件；并行运行时每个 worker 写入独立文件
+timing_file = "./logs/timing.jsonl"
+# 测试报告末尾展示最慢的步骤数
+timing_summary_size = 10
+
+# 框架日志是否通过队列由后台线程写出，调用方不再同步写控制台和文件
+log_async = True
+# 日志中请求体/响应体的最大字符数，超出部分截断；0 表示不截断
+log_body_max_size = 2048
+# 输出请求体/响应体的请求比例，1 表示全部输出，0.1 表示只输出约 10% 的请求，其余只记录长度
+log_body_sample_rate = 1
+# 每个线程保留最近多少个完整的请求体/响应体，用例失败时完整输出；0 表示不保留
+log_failure_bodies = 10
+
+# 配置了 stream 的用例每次从响应中读取的字节数
+stream_chunk_size = 1024 * 1024
+# 流式读取时默认计算的哈希，可在用例的 stream.hash 中覆盖
+stream_hash_algorithms = ["md5", "sha256"]
+# stream.save 为 true 时临时文件的目录，None 表示系统临时目录
+stream_temp_dir = None
+# 会话结束后是否保留流式读取的临时文件
+stream_keep_files = False
+
+# 上传文件时每次读取并发送的字节数
+upload_chunk_size = 256 * 1024
+# 上传文件时是否默认使用分块传输编码（Transfer-Encoding: chunked），可在请求中用 chunked 覆盖
+upload_chunked = False
+
+# 被限流的响应带有 Retry-After 时最多暂停发送的秒数
+rate_limit_max_retry_after = 60
+
+# 用例配置 cache: true 时的响应缓存有效期（秒）
+response_cache_ttl = 300
+# 本次运行内最多缓存的响应个数，超出时淘汰最久未使用的响应
+response_cache_max_entries = 256
+
+# 请求录制/回放（--record-mode）使用的磁带文件，可通过 --cassette 覆盖
+cassette_path = "./cassettes/default.json.gz"
+# 默认录制模式：None 关闭，record 录制，replay 回放，auto 已录制的回放、未录制的补录
+cassette_mode = None
+# 返回值随机的热加载函数，生成请求磁带的键时屏蔽这些函数生成的值
+cassette_volatile_functions = ["random_name", "random_mobile", "random_str_name", "get_random_nmber"]
 
 # allure项目名称
 allure_project_name = "XXXX电商接口自动化测试平台:欧莎"
\ No newline at end of file
@@ -1,7 +1,17 @@
+import json
+import sys
+import time
 import pytest
 import logging
 import requests
-from commons.yaml_util import clean_yaml
+from commons.yaml_util import clean_yaml, flush_yaml
+from commons.hotload_util import registry_stats
+from commons import cache_util, cassette_util, db_util, incremental_util, load_util, logs_util, pool_util, rate_util
+from commons import stream_util, timing_util
+from commons.base_url import set_profile
+from commons.collect_cache_util import save_cache
+from commons.worker_util import get_worker_id, is_worker
+from config import setting
 from commons.logs_util import logger
 
 # 企业微信机器人的 Webhook 地址
@@ -11,10 +21,101 @@ WECOM_WEBHOOK = "https://qyapi.weixin.qq.com/cgi-bin/webhook/send?key=ea5dc04e-f
 ALLURE_REPORT_URL = "https://github.com/s1mple96/PytestAPIFramework"
 
 
+def pytest_addoption(parser):
+    """
+    注册框架的命令行参数
+    """
+    parser.addoption(
+        "--env-profile", action="store", default=None,
+        help="选择 pytest.ini 中 [base_url:<环境名>] 对应的环境，例如 dev、staging、prod",
+    )
+    parser.addoption(
+        "--async-run", action="store_true", default=False,
+        help="会话开始时在一个事件循环中并发发送所有独立单接口用例的请求",
+    )
+    parser.addoption(
+        "--async-concurrency", action="store", type=int, default=setting.async_concurrency,
+        help="--async-run 模式下的最大并发请求数",
+    )
+    parser.addoption(
+        "--framework-startup-profile", action="store_true", default=False,
+        help="在测试报告末尾输出框架入口模块的导入耗时（python -X importtime）",
+    )
+    parser.addoption(
+        "--load-users", action="store", type=int, default=0,
+        help="压测模式（闭环模型）：虚拟用户数，每个虚拟用户循环执行选中的 yaml 用例",
+    )
+    parser.addoption(
+        "--load-rate", action="store", type=float, default=0,
+        help="压测模式（开环模型）：每秒发起的迭代数",
+    )
+    parser.addoption(
+        "--cassette", action="store", default=setting.cassette_path,
+        help="请求录制/回放使用的磁带文件",
+    )
+    parser.addoption(
+        "--record-mode", action="store", default=setting.cassette_mode, choices=cassette_util.RECORD_MODES,
+        help="record 录制真实响应；replay 只从磁带回放，不访问网络；auto 已录制的回放、未录制的补录",
+    )
+    parser.addoption(
+        "--load-duration", action="store", type=float, default=None,
+        help="压测持续秒数，默认使用 setting.load_duration",
+    )
+    parser.addoption(
+        "--incremental", action="store_true", default=False,
+        help="增量运行：只执行修改过的、新增的和上次失败的用例，其余沿用上次通过的结果",
+    )
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    """
+    根据命令行参数加载 base_url 配置快照。
+    并行运行时只由主进程清空 allure 结果目录，避免 worker 之间互相删除结果文件。
+    """
+    config.addinivalue_line("markers", "xdist_group(name): 并行运行时同一分组的用例调度到同一个 worker")
+    if is_worker() and getattr(config.option, "clean_alluredir", False):
+        config.option.clean_alluredir = False
+    set_profile(config.getoption("--env-profile") or setting.base_url_profile)
+    load_util.configure(
+        config.getoption("--load-users"), config.getoption("--load-rate"), config.getoption("--load-duration")
+    )
+    cassette_util.configure(config.getoption("--cassette"), config.getoption("--record-mode"))
+    incremental = config.getoption("--incremental")
+    if incremental and load_util.is_enabled():
+        logger.warning("压测模式下所有用例都需要执行，已忽略 --incremental。")
+        incremental = False
+    incremental_util.configure(incremental)
+
+
+def pytest_collection_modifyitems(session, config, items):
+    """
+    增量运行时计算本次需要执行的用例，指纹未变且上次通过的用例在执行时直接按通过处理
+    """
+    if not incremental_util.is_enabled():
+        return
+    try:
+        run, cached = incremental_util.select(items)
+    except Exception as e:
+        logger.error(f"计算增量运行的用例时出现错误，所有用例都会执行: {e}")
+        incremental_util.configure(False)
+        return
+    logger.info(f"增量运行：执行 {run} 个用例，{cached} 个用例未修改且上次通过，沿用上次结果")
+
+
+def pytest_collection_finish(session):
+    """
+    收集完成后保存用例收集缓存；并行运行时主进程不收集用例，各 worker 收集到的用例相同，只由 gw0 保存
+    """
+    if not is_worker() or get_worker_id() == "gw0":
+        save_cache()
+
+
 @pytest.fixture(scope="session", autouse=True)
 def clean_extract():
     """
-    作为 pytest 的固件，在整个测试会话开始前自动执行，用于清空 extract.yaml 文件。
+    作为 pytest 的固件，在整个测试会话开始前自动执行，用于清空 extract.yaml 文件；
+    会话结束时把内存中的中间变量快照写回 extract.yaml，并删除流式读取生成的临时文件。
     此固件的作用范围是整个测试会话，并且会自动使用。
 
     在执行清空操作时，会捕获可能出现的异常，并记录相应的日志信息。
@@ -25,6 +126,113 @@ def clean_extract():
         logging.info("成功清空 extract.yaml 文件。")
     except Exception as e:
         logging.error(f"清空 extract.yaml 文件时出现错误: {e}")
+    yield
+    db_util.close_pool()
+    # 只在开启过 http2 时关闭共享的 HTTP/2 连接，未开启时不导入 httpx
+    if "commons.http2_util" in sys.modules:
+        sys.modules["commons.http2_util"].close_transports()
+    timing_util.close()
+    stream_util.cleanup()
+    cache_util.report()
+    try:
+        flush_yaml()
+        logging.info("成功将中间变量写入 extract.yaml 文件。")
+    except Exception as e:
+        logging.error(f"写入 extract.yaml 文件时出现错误: {e}")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def async_prefetch(request, clean_extract):
+    """
+    开启 --async-run 时，在第一个用例执行前并发发送所有配置了 prefetch: true 的单接口 GET/HEAD 用例的请求。
+    其他用例仍然在执行时按顺序发送。
+    """
+    if not request.config.getoption("--async-run") or load_util.is_enabled():
+        return
+    if cassette_util.get_cassette() is not None:
+        logger.warning("录制/回放模式下请求按顺序发送，已忽略 --async-run 预执行。")
+        return
+    if is_worker():
+        logger.warning("并行运行时各 worker 动态分配用例，已忽略 --async-run 预执行。")
+        return
+    from commons.async_runner import prefetch
+    from commons.main_util import extract_util
+
+    # 增量运行中沿用上次结果的用例不会执行，也不提前发送
+    caseinfo_list = [
+        item.callspec.params["caseinfo"]
+        for item in request.session.items
+        if hasattr(item, "callspec") and "caseinfo" in item.callspec.params
+        and not incremental_util.is_cached(item.nodeid)
+    ]
+    try:
+        prefetch(caseinfo_list, extract_util, request.config.getoption("--async-concurrency"))
+    except Exception as e:
+        logger.error(f"并发预执行用例请求时出现错误: {e}")
+
+
+@pytest.fixture(autouse=True)
+def case_timing(request):
+    """
+    把用例步骤的阶段耗时归属到当前测试，测试结束后作为 JSON 附件添加到 Allure 报告。
+    """
+    timing_util.begin_test(request.node.nodeid)
+    yield
+    steps = timing_util.current_test_steps()
+    if not steps:
+        return
+    try:
+        import allure
+        allure.attach(json.dumps(steps, ensure_ascii=False, indent=2), name="阶段耗时",
+                      attachment_type=allure.attachment_type.JSON)
+    except Exception as e:
+        logger.warning(f"添加 Allure 阶段耗时附件失败: {e}")
+
+
+def pytest_runtest_setup(item):
+    """
+    每个测试开始前清空上一个测试保留的完整请求/响应体和步骤失败标记
+    """
+    from commons.main_util import begin_case
+
+    logs_util.clear_bodies()
+    begin_case()
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """
+    增量运行时，沿用上次结果的用例不执行用例函数，在 Allure 中标记为沿用上次通过的结果
+    """
+    if not incremental_util.is_cached(pyfuncitem.nodeid):
+        return None
+    last_run = incremental_util.last_run(pyfuncitem.nodeid) or {}
+    logger.info(f"用例 {pyfuncitem.name} 未修改且上次通过，沿用上次结果")
+    try:
+        import allure
+        title = pyfuncitem.function.__name__
+        caseinfo = getattr(pyfuncitem, "callspec", None) and pyfuncitem.callspec.params.get("caseinfo")
+        step = caseinfo[-1] if isinstance(caseinfo, list) and caseinfo else caseinfo
+        if isinstance(step, dict):
+            allure.dynamic.feature(step.get("feature"))
+            allure.dynamic.story(step.get("story"))
+            title = step.get("title") or title
+        allure.dynamic.title(f"{title}（沿用上次结果）")
+        allure.dynamic.tag("incremental-cached")
+        ran_at = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(last_run.get("time", 0)))
+        allure.dynamic.description(f"增量运行：yaml 文件和依赖未修改，沿用 {ran_at} 通过的结果，耗时 {last_run.get('duration')} 秒。")
+    except Exception as e:
+        logger.warning(f"添加 Allure 增量运行标记失败: {e}")
+    return True
+
+
+@pytest.hookimpl(hookwrapper=True, trylast=True)
+def pytest_runtest_call(item):
+    """
+    测试执行完毕后等待后台线程写完日志，保证日志归属于当前测试的报告
+    """
+    yield
+    logs_util.flush()
 
 
 def pytest_runtest_teardown(item, nextitem):
@@ -42,9 +250,116 @@ def pytest_runtest_makereport(item, call):
     """
     捕获每个测试用例的执行报告
     """
+    from commons.main_util import case_failed
+
     outcome = yield
     report = outcome.get_result()
     setattr(item, "report", report)
+    # 请求失败或执行出错的步骤只记录日志，测试仍然通过，这种用例同样视为失败
+    failed = report.failed or (report.when == "call" and case_failed())
+    # 增量运行时记录用例结果，setup 失败也视为失败
+    if report.when == "call" or (report.when == "setup" and report.failed):
+        incremental_util.record(item.nodeid, "failed" if failed else "passed", report.duration)
+    # 日志中的请求/响应体会被截断，用例失败时输出并附加完整内容
+    if report.when == "call" and failed:
+        bodies = logs_util.dump_bodies()
+        if bodies:
+            try:
+                import allure
+                for label, body in bodies:
+                    allure.attach(body, name=f"完整{label}", attachment_type=allure.attachment_type.TEXT)
+            except Exception as e:
+                logger.warning(f"添加 Allure 完整请求/响应体附件失败: {e}")
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    """
+    在测试报告末尾输出热加载函数的调用统计、SQL 执行耗时、连接池统计、限流统计、响应缓存统计、日志量、用例步骤的阶段耗时以及框架启动耗时
+    """
+    stats = registry_stats()
+    if stats:
+        terminalreporter.section("热加载函数调用统计")
+        terminalreporter.write_line(f"{'函数':<24}{'次数':>8}{'总耗时(ms)':>14}{'平均(ms)':>12}{'最大(ms)':>12}")
+        for stat in stats:
+            terminalreporter.write_line(
+                f"{stat['name']:<24}{stat['count']:>8}{stat['total_ms']:>14}{stat['avg_ms']:>12}{stat['max_ms']:>12}"
+            )
+
+    queries = db_util.query_stats()
+    if queries:
+        totals = db_util.query_totals()
+        terminalreporter.section(f"SQL 执行耗时（共 {totals['count']} 条，命中缓存 {totals['cached']} 条）")
+        for query in queries:
+            terminalreporter.write_line(f"{query['ms']:>10} ms  {'[缓存] ' if query['cached'] else ''}{query['sql']}")
+
+    pools = pool_util.pool_stats()
+    if pools:
+        terminalreporter.section("连接池统计")
+        terminalreporter.write_line(f"{'主机':<32}{'请求数':>8}{'新建连接':>10}{'复用率':>8}{'重试':>8}{'丢弃连接':>10}")
+        for pool in pools:
+            terminalreporter.write_line(
+                f"{pool['host']:<32}{pool['requests']:>8}{pool['connections']:>10}{pool['reuse_ratio']:>8}"
+                f"{pool['retries']:>8}{pool['discarded']:>10}"
+            )
+
+    limits = rate_util.rate_stats()
+    if limits:
+        terminalreporter.section("限流统计")
+        terminalreporter.write_line(
+            f"{'主机':<32}{'请求数':>8}{'等待次数':>10}{'等待(ms)':>12}{'被限流':>8}{'最低速率':>10}{'当前速率':>10}"
+        )
+        for limit in limits:
+            terminalreporter.write_line(
+                f"{limit['name']:<32}{limit['requests']:>8}{limit['waited']:>10}{limit['wait_ms']:>12}"
+                f"{limit['throttled']:>8}{limit['lowest_rate']:>10}{limit['rate']:>10}"
+            )
+
+    cache = cache_util.cache_stats()
+    if cache:
+        terminalreporter.section("响应缓存统计")
+        terminalreporter.write_line(
+            f"命中 {cache['hits']} 次，304 重新验证 {cache['revalidated']} 次，未命中 {cache['misses']} 次，"
+            f"命中率 {cache['hit_ratio']}；缓存 {cache['entries']} 个响应，淘汰 {cache['evictions']} 个"
+        )
+
+    logs_util.flush()
+    volume = logs_util.log_volume()
+    if volume["records"]:
+        terminalreporter.section("日志量统计")
+        terminalreporter.write_line(f"共 {volume['records']} 条日志，{volume['chars']} 个字符")
+        for level, (count, chars) in volume["by_level"].items():
+            terminalreporter.write_line(f"  {level:<10}{count:>8} 条{chars:>12} 字符")
+        terminalreporter.write_line("字符数最多的来源文件:")
+        for filename, chars in volume["top_files"]:
+            terminalreporter.write_line(f"  {filename:<28}{chars:>12} 字符")
+        truncated, truncated_chars = volume["truncated"]
+        sampled_out, sampled_out_chars = volume["sampled_out"]
+        terminalreporter.write_line(
+            f"截断请求/响应体 {truncated} 次，省去 {truncated_chars} 字符；未采样 {sampled_out} 次，省去 {sampled_out_chars} 字符"
+        )
+
+    if config.getoption("--framework-startup-profile"):
+        from commons.startup_util import format_report, profile_imports
+        terminalreporter.section("框架启动耗时")
+        try:
+            for line in format_report(*profile_imports()):
+                terminalreporter.write_line(line)
+        except Exception as e:
+            terminalreporter.write_line(f"分析框架启动耗时失败: {e}")
+
+    slowest, phases = timing_util.summary()
+    if phases:
+        terminalreporter.section("用例步骤阶段耗时")
+        terminalreporter.write_line(f"{'阶段':<12}{'次数':>8}{'总耗时(ms)':>14}{'平均(ms)':>12}")
+        for phase in phases:
+            terminalreporter.write_line(
+                f"{phase['phase']:<12}{phase['count']:>8}{phase['total_ms']:>14}{phase['avg_ms']:>12}"
+            )
+        terminalreporter.write_line("")
+        terminalreporter.write_line("最慢的用例步骤:")
+        for step in slowest:
+            detail = ", ".join(f"{name}={ms}" for name, ms in step["phases"].items())
+            terminalreporter.write_line(f"{step['total_ms']:>10} ms  {step['step']}  ({detail})")
 
 
 def pytest_sessionfinish(session, exitstatus):
@@ -53,22 +368,29 @@ def pytest_sessionfinish(session, exitstatus):
     :param session: pytest 会话对象
     :param exitstatus: 测试会话的退出状态
     """
+    # 保存请求磁带，并行运行时由主进程合并各 worker 的磁带
+    try:
+        cassette_util.save()
+    except Exception as e:
+        logger.error(f"保存请求磁带时出现错误: {e}")
+    # 保存增量运行历史，并行运行时由主进程合并各 worker 的结果
+    try:
+        incremental_util.save()
+    except Exception as e:
+        logger.error(f"保存增量运行历史时出现错误: {e}")
+    # 并行运行时只由主进程汇总结果并发送通知
+    if is_worker():
+        logs_util.flush()
+        return
     try:
-        # 获取测试结果统计信息
-        total = 0
-        passed = 0
-        failed = 0
-        skipped = 0
-
-        for item in session.items:
-            total += 1
-            if hasattr(item, "report"):
-                if item.report.outcome == 'passed':
-                    passed += 1
-                elif item.report.outcome == 'failed':
-                    failed += 1
-                elif item.report.outcome == 'skipped':
-                    skipped += 1
+        # 获取测试结果统计信息。并行运行时主进程不收集用例，session.items 为空，
+        # 而终端报告插件会收到各 worker 上报的结果，因此从它的统计中计数
+        reporter = session.config.pluginmanager.get_plugin("terminalreporter")
+        stats = reporter.stats if reporter is not None else {}
+        passed = len(stats.get("passed", []))
+        failed = len(stats.get("failed", [])) + len(stats.get("error", []))
+        skipped = len(stats.get("skipped", []))
+        total = passed + failed + skipped
 
         # 构造企业微信消息
         message = {
@@ -93,3 +415,5 @@ def pytest_sessionfinish(session, exitstatus):
         logger.error(f"发送 Allure 报告链接及测试结果到企业微信时出现错误: {e}")
     except Exception as e:
         logger.error(f"未知错误: {e}")
+    # pytest 在本钩子结束后移除日志文件处理器，先等待后台线程写完日志
+    logs_util.flush()
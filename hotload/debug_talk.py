@@ -1,50 +1,44 @@
 import random
 import time
 import hashlib
-import yaml
-from commons.base_url import read_ini
-from faker import Faker
-from config import setting
+from commons import yaml_util
+from commons.base_url import get_base_url
 from commons.logs_util import logger
 
 class DebugTalk:
     def __init__(self):
-        # 初始化 Faker 实例
-        self.fake = Faker('zh_CN')
+        # Faker 导入较慢，第一次生成随机数据时再创建实例
+        self._fake = None
+
+    @property
+    def fake(self):
+        if self._fake is None:
+            from faker import Faker
+            self._fake = Faker('zh_CN')
+        return self._fake
 
     def read_yaml(self, key):
         """
-        读取 YAML 文件中指定键的值。
+        读取中间变量中指定键的最新值（由 yaml_util 的内存存储提供）。
 
         :param key: 要读取的键
         :return: 指定键的值，如果键不存在或出现错误则返回 None
         """
         # logger.info(f"调用 read_yaml 方法，参数 key: {key}")
-        try:
-            with open(setting.extract_name, encoding="utf-8") as f:
-                value = yaml.safe_load(f)
-                if value and key in value:
-                    # logger.info(f"read_yaml 方法成功获取键 {key} 的值: {value[key]}")
-                    return value[key]
-                else:
-                    logger.warning(f"未找到键 '{key}' 或 YAML 文件为空。")
-        except FileNotFoundError:
-            logger.error(f"未找到 YAML 文件: {setting.extract_name}")
-        except yaml.YAMLError as e:
-            logger.error(f"解析 YAML 文件时出现错误: {e}")
-        logger.info(f"read_yaml 方法返回值: None")
-        return None
+        value = yaml_util.read_yaml(key)
+        # logger.info(f"read_yaml 方法返回值: {value}")
+        return value
 
     def env(self, key):
         """
-        从 INI 配置文件中获取指定键的值。
+        从 base_url 配置快照中获取指定键的值。
 
         :param key: 要获取的键
         :return: 指定键的值，如果键不存在或出现错误则返回 None
         """
         # logger.info(f"调用 env 方法，参数 key: {key}")
         try:
-            ini_config = read_ini()
+            ini_config = get_base_url()
             if key in ini_config:
                 # logger.info(f"env 方法成功获取键 {key} 的值: {ini_config[key]}")
                 return ini_config[key]
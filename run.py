@@ -2,7 +2,13 @@
 import pytest
 import os
 
+from config import setting
+
 if __name__ == "__main__":
-    pytest.main()
+    args = []
+    if setting.parallel_workers:
+        # 每个 yaml 文件是一个调度单元，流程用例在同一个 worker 内按顺序执行
+        args = ["-n", str(setting.parallel_workers), "--dist", "loadgroup"]
+    pytest.main(args)
     os.system("allure generate ./temps -o ./reports --clean")
     os.system("allure open ./reports")
\ No newline at end of file
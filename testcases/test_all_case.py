@@ -8,10 +8,13 @@ from pathlib import Path
 import allure
 import pytest
 
-from commons.ddt_util import read_testcase
+from commons import load_util
+from commons.collect_cache_util import load_testcase
+from commons.ddt_util import DdtCase
 from commons.extract_util import ExtractUtil
 from commons.main_util import stand_case_flow
 from commons.model_util import verify_yaml
+from commons.template_util import compile_case, release
 from config import setting
 from commons.logs_util import logger
 
@@ -27,31 +30,56 @@ class TestAllCase:
 """
 目的:传进来用例文件路径，创建一个函数去读取yaml文件内容,返回这个函数的地址引用
 yaml_path:用例文件路径
-read_testcase(yaml_path):读取yaml用例的值，并且返回来给到caseinfo变量
+load_testcase(yaml_path):读取yaml用例的值（未修改的文件使用收集缓存），并且返回来给到caseinfo变量
 caseinfo: 将yaml中的测试用例，放到字典中进行返回
 *value:解包之后相当于json,"$.access_token",0,分别传给extract后三个变量
 
 """
 def create_testcase(yaml_path):
-    @pytest.mark.parametrize("caseinfo", read_testcase(yaml_path))
+    # 未修改过的 yaml 文件直接使用收集缓存中解析好的用例
+    caseinfo_list = load_testcase(yaml_path)
+    # 收集阶段预编译 request/validate 模板，执行时只做值代入
+    for caseinfo in caseinfo_list:
+        compile_case(caseinfo)
+
+    # 并行运行(-n --dist loadgroup)时，同一个 yaml 文件的用例作为一个整体调度到同一个 worker
+    @pytest.mark.xdist_group(name=yaml_path.relative_to(testcase_path).as_posix())
+    @pytest.mark.parametrize("caseinfo", caseinfo_list)
     def func(self,caseinfo):
         global case_obj
-        if isinstance(caseinfo,list):
-            for case in caseinfo: #流程用例
+        # 引用 CSV/JSONL 数据文件的数据驱动用例，执行时才读取该行数据
+        lazy_row = isinstance(caseinfo, DdtCase)
+        if lazy_row:
+            caseinfo = caseinfo.load()
+        try:
+            if load_util.is_enabled():
+                # 压测模式：整个 yaml 文件作为一次迭代，按目标速率或虚拟用户数反复执行
+                case_objs = [verify_yaml(case, yaml_path.stem) for case in (caseinfo if isinstance(caseinfo, list) else [caseinfo])]
+                case_obj = case_objs[-1]
+                load_util.run_load(case_objs, yaml_path.stem)
+            elif isinstance(caseinfo,list):
+                for case in caseinfo: #流程用例
+                    # 校验yaml中的数据
+                    case_obj = verify_yaml(case,yaml_path.stem)
+                    # 用例标准化流程
+                    stand_case_flow(case_obj)
+            else: #单接口用例
                 # 校验yaml中的数据
-                case_obj = verify_yaml(case,yaml_path.stem)
+                case_obj = verify_yaml(caseinfo,yaml_path.stem)
                 # 用例标准化流程
                 stand_case_flow(case_obj)
-        else: #单接口用例
-            # 校验yaml中的数据
-            case_obj = verify_yaml(caseinfo,yaml_path.stem)
-            # 用例标准化流程
-            stand_case_flow(case_obj)
+        finally:
+            if lazy_row:
+                # 该行用例只执行一次，移除它的模板缓存
+                release(caseinfo)
         # 定制Al1ure报告
         allure.dynamic.feature(case_obj.feature)
         allure.dynamic.story(case_obj.story)
         allure.dynamic.title(case_obj.title)
 
+    # 增量运行时根据 yaml 文件计算指纹和变量依赖
+    func.yaml_path = yaml_path
+    func.caseinfo_list = caseinfo_list
     return func
 
 """
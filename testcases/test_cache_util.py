@@ -0,0 +1,51 @@
+"""
+响应缓存（parse_ttl、ResponseCache）的单元测试，不访问网络。
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from commons.cache_util import ResponseCache, parse_ttl
+from config import setting
+
+
+def _response(headers=None):
+    return SimpleNamespace(status_code=200, headers=headers or {})
+
+
+@pytest.mark.parametrize("cache, expected", [
+    (None, None),
+    (False, None),
+    (True, float(setting.response_cache_ttl)),
+    (30, 30.0),
+    (2.5, 2.5),
+    ("300", 300.0),
+    ("300s", 300.0),
+    ("5m", 300.0),
+    (" 1H ", 3600.0),
+])
+def test_parse_ttl(cache, expected):
+    assert parse_ttl(cache) == expected
+
+
+@pytest.mark.parametrize("cache", ["abc", "5d", "-1", 0])
+def test_parse_ttl_invalid(cache):
+    with pytest.raises(ValueError):
+        parse_ttl(cache)
+
+
+def test_response_cache_lru_eviction():
+    """
+    超出容量时淘汰最久未使用的响应，get 会刷新使用顺序
+    """
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", _response(), 60)
+    cache.put("b", _response(), 60)
+    assert cache.get("a") is not None
+
+    cache.put("c", _response(), 60)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["stores"] == 3 and stats["evictions"] == 1
@@ -0,0 +1,55 @@
+"""
+数据驱动数据文件（DdtSource）的单元测试。
+数据文件写在 pytest 的临时目录中，testcases 目录下的 yaml 会被当作用例收集。
+"""
+import pytest
+
+from commons.ddt_util import DdtSource
+
+
+def test_ddt_csv_quoted_fields(tmp_path):
+    """
+    CSV 引号内的逗号和换行属于同一个字段，表头不计入行数
+    """
+    path = tmp_path / "users.csv"
+    path.write_bytes('name,desc,age\nalice,"hello, world",3\nbob,"line1\nline2",4\n\n'.encode("utf-8"))
+    source = DdtSource(str(path), "csv", {"request": {"params": {"name": "$ddt{name}"}}})
+
+    assert len(source) == 2
+    assert source.row(0) == {"name": "alice", "desc": "hello, world", "age": "3"}
+    assert source.row(1) == {"name": "bob", "desc": "line1\nline2", "age": "4"}
+
+
+def test_ddt_csv_column_mismatch(tmp_path):
+    """
+    CSV 某一行的列数与表头不一致时，读取该行报错，其他行不受影响
+    """
+    path = tmp_path / "users.csv"
+    path.write_text("name,age\nalice,3\nbob\n", encoding="utf-8")
+    source = DdtSource(str(path), "csv", {})
+
+    assert source.row(0) == {"name": "alice", "age": "3"}
+    with pytest.raises(ValueError, match="列数与表头不一致"):
+        source.row(1)
+
+
+def test_ddt_jsonl_keeps_types(tmp_path):
+    """
+    JSONL 保留数字、布尔、空值和列表的类型，整个字符串只有一个占位符时渲染结果也保留类型
+    """
+    path = tmp_path / "orders.jsonl"
+    path.write_text('{"id": 1, "ok": true, "price": 9.5, "tags": ["a"], "note": null}\n\n[1, 2]\n', encoding="utf-8")
+    source = DdtSource(str(path), "jsonl", {"title": "订单 $ddt{id}", "request": {"json": {"id": "$ddt{id}", "ok": "$ddt{ok}"}}})
+
+    assert len(source) == 2
+    assert source.row(0) == {"id": 1, "ok": True, "price": 9.5, "tags": ["a"], "note": None}
+    assert source.render(0) == {"title": "订单 1", "request": {"json": {"id": 1, "ok": True}}}
+    with pytest.raises(ValueError, match="不是 JSON 对象"):
+        source.row(1)
+
+
+def test_ddt_unsupported_format(tmp_path):
+    path = tmp_path / "users.txt"
+    path.write_text("", encoding="utf-8")
+    with pytest.raises(ValueError, match="不支持的数据文件格式"):
+        DdtSource(str(path), "txt", {})
@@ -0,0 +1,119 @@
+"""
+按主机限流（RateLimiter）的单元测试，使用手动推进的时钟，不访问网络。
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from commons import rate_util
+
+
+class FakeClock:
+    """
+    替换 rate_util 中的 time 模块，手动推进 monotonic 时间。
+    """
+
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def _response(status_code=200, headers=None, json=None, text=""):
+    return SimpleNamespace(status_code=status_code, headers=headers or {}, body=None, json=json, text=text)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_util, "time", fake)
+    return fake
+
+
+def _limiter(worker_count=1, **values):
+    config = rate_util.parse_config({key: str(value) for key, value in values.items()})
+    return rate_util.RateLimiter("http://stub", config, worker_count)
+
+
+def test_rate_limiter_reserve_burst(clock):
+    """
+    桶满时 burst 个请求不等待，之后每个请求按 1/rate 间隔排队；时间推进后桶重新装满
+    """
+    limiter = _limiter(rate=10, burst=2)
+
+    waits = [limiter.reserve() for _ in range(4)]
+    assert waits == pytest.approx([0.0, 0.0, 0.1, 0.2])
+
+    clock.now += 1
+    assert limiter.reserve() == 0.0
+    stats = limiter.stats()
+    assert stats["requests"] == 5 and stats["waited"] == 2 and stats["wait_ms"] == pytest.approx(300.0)
+
+
+def test_rate_limiter_split_by_workers(clock):
+    """
+    并行运行时每个 worker 使用均分后的速率
+    """
+    limiter = _limiter(worker_count=2, rate=10, min_rate=4)
+
+    assert limiter.max_rate == 5 and limiter.min_rate == 2
+    limiter.reserve()
+    assert limiter.reserve() == pytest.approx(0.2)
+
+
+def test_rate_limiter_observe_backoff_and_ramp(clock):
+    """
+    自适应模式下被限流时按 backoff 降速（1 秒内只降一次，不低于 min_rate），之后每秒增加 ramp_step，最多恢复到 rate
+    """
+    limiter = _limiter(rate=10, adaptive="true", min_rate=2, backoff=0.5, ramp_step=1)
+    throttled = _response(429)
+
+    clock.now += 1
+    assert limiter.observe(throttled) is True
+    assert limiter.rate == 5
+    assert limiter.observe(throttled) is True
+    assert limiter.rate == 5
+
+    for _ in range(3):
+        clock.now += 1
+        limiter.observe(throttled)
+    assert limiter.rate == 2
+    assert limiter.stats()["lowest_rate"] == 2
+
+    clock.now += 0.5
+    assert limiter.observe(_response()) is False
+    assert limiter.rate == 2
+    clock.now += 0.5
+    limiter.observe(_response())
+    assert limiter.rate == 3
+    for _ in range(10):
+        clock.now += 1
+        limiter.observe(_response())
+    assert limiter.rate == 10
+
+
+def test_rate_limiter_retry_after(clock):
+    """
+    响应带 Retry-After 时该时间内不发放令牌，同时被限流的多个请求不叠加暂停时间
+    """
+    limiter = _limiter(rate=10, burst=1)
+    limiter.observe(_response(429, {"Retry-After": "2"}))
+    limiter.observe(_response(429, {"Retry-After": "2"}))
+
+    assert limiter.reserve() == pytest.approx(2.0)
+    assert limiter.reserve() == pytest.approx(2.1)
+
+
+def test_rate_limiter_throttle_signatures(clock):
+    """
+    状态码之外，JSON 字段值和响应文本也可以识别为被限流
+    """
+    limiter = _limiter(rate=10, throttle_json="$.status = 40004", throttle_message="操作过于频繁")
+
+    assert limiter.is_throttled(_response(json={"status": 40004}))
+    assert limiter.is_throttled(_response(text="操作过于频繁，请稍后再试"))
+    assert not limiter.is_throttled(_response(json={"status": 0}, text="ok"))